@@ -44,11 +44,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # ASGI: streaming por bloques en lugar de juntar el cuerpo (core/middleware.py)
+    'core.middleware.StreamingASGIMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Conteo/tiempo de SQL por petición y aviso de N+1 (core/services/perfil_sql.py)
+    'core.middleware.PresupuestoSQLMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # ?perfilar=1 / X-Perfilar: 1 (solo staff) → cProfile (core/services/perfilador.py)
+    'core.middleware.PerfilPythonMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -109,6 +115,16 @@ if ACTIVE_DB not in DATABASES:
 
 DATABASES['default'] = DATABASES[ACTIVE_DB]
 
+# Caché (estadísticas y reportes). CACHE_URL admite p. ej. redis://… o
+# filecache://…; por defecto, memoria local del proceso.
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+# Con la caché en memoria local cada worker tiene sus propias versiones de
+# datos (ver core/services/estadisticas.py): vencen a los N segundos para que
+# un cambio hecho en otro worker se vea a más tardar entonces
+CACHE_VERSION_TTL = env.int('CACHE_VERSION_TTL', default=30)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -151,4 +167,50 @@ STATICFILES_DIRS = [
 
 # Configuración de archivos de medios (si los usas)
 MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
\ No newline at end of file
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Caché en disco de los estados de cuenta en PDF (core/services/pdf_periodos.py)
+PDF_CACHE_DIR = env('PDF_CACHE_DIR', default=os.path.join(BASE_DIR, 'cache', 'estados_pdf'))
+PDF_CACHE_MAX_MB = env.int('PDF_CACHE_MAX_MB', default=200)
+
+# Presupuesto de SQL por petición (core.middleware.PresupuestoSQLMiddleware):
+# las peticiones que lo exceden se registran en SQL_LOG_FILE (rotativo)
+SQL_PRESUPUESTO_CONSULTAS = env.int('SQL_PRESUPUESTO_CONSULTAS', default=50)
+SQL_PRESUPUESTO_MS = env.int('SQL_PRESUPUESTO_MS', default=500)
+SQL_PRESUPUESTO_REPETICIONES = env.int('SQL_PRESUPUESTO_REPETICIONES', default=10)
+SQL_LOG_FILE = env('SQL_LOG_FILE', default=os.path.join(BASE_DIR, 'logs', 'sql_presupuesto.log'))
+os.makedirs(os.path.dirname(SQL_LOG_FILE), exist_ok=True)
+
+# Perfilado bajo demanda (core.middleware.PerfilPythonMiddleware), apagado
+# salvo con PERFIL_HABILITADO=True; se conservan los PERFIL_MAX_ARCHIVOS más
+# recientes con menos de PERFIL_DIAS días
+PERFIL_HABILITADO = env.bool('PERFIL_HABILITADO', default=False)
+PERFIL_DIR = env('PERFIL_DIR', default=os.path.join(BASE_DIR, 'profiles'))
+PERFIL_MAX_ARCHIVOS = env.int('PERFIL_MAX_ARCHIVOS', default=50)
+PERFIL_DIAS = env.int('PERFIL_DIAS', default=7)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {'format': '%(asctime)s %(levelname)s %(message)s'},
+    },
+    'handlers': {
+        'sql_presupuesto': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': SQL_LOG_FILE,
+            'maxBytes': 5 * 1024 * 1024,
+            'backupCount': 5,
+            'encoding': 'utf-8',
+            'delay': True,
+            'formatter': 'simple',
+        },
+    },
+    'loggers': {
+        'core.sql': {
+            'handlers': ['sql_presupuesto'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
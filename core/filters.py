@@ -2,7 +2,8 @@
 import django_filters
 from django import forms
 from .models import (
-    Transaccion, Cuenta, Categoria, TipoCuenta            # ← importamos TipoCuenta
+    Transaccion, Cuenta, Categoria, TipoCuenta,           # ← importamos TipoCuenta
+    q_movimientos,
 )
 
 class TransaccionFilter(django_filters.FilterSet):
@@ -36,8 +37,11 @@ class TransaccionFilter(django_filters.FilterSet):
     def filter_by_cuenta(self, queryset, name, value):
         """Filtra transacciones donde la cuenta aparece como origen O destino"""
         if value:
-            from django.db.models import Q
-            return queryset.filter(Q(cuenta_origen=value) | Q(cuenta_destino=value))
+            # El rango de fechas va dentro de cada rama para usar los índices (cuenta_*, fecha)
+            datos = self.form.cleaned_data
+            return queryset.filter(
+                q_movimientos(value, datos.get("fecha_desde"), datos.get("fecha_hasta"))
+            )
         return queryset
 
     # ------------ rellenamos los queryset en tiempo de ejecución -------
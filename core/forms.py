@@ -234,6 +234,25 @@ class EstadoCuentaForm(forms.Form):
     desde  = forms.DateField(widget=forms.DateInput(attrs={"type": "date"}), initial=date.today().replace(day=1))
     hasta  = forms.DateField(widget=forms.DateInput(attrs={"type": "date"}), initial=date.today())
 
+    def clean(self):
+        cleaned = super().clean()
+        if cleaned.get("desde") and cleaned.get("hasta") and cleaned["desde"] > cleaned["hasta"]:
+            raise forms.ValidationError("La fecha inicial no puede ser posterior a la final.")
+        return cleaned
+
+
+class BalanzaForm(forms.Form):
+    desde = forms.DateField(widget=forms.DateInput(attrs={"type": "date"}))
+    hasta = forms.DateField(widget=forms.DateInput(attrs={"type": "date"}))
+    solo_con_movimientos = forms.BooleanField(required=False,
+                                              label="Ocultar cuentas sin saldo ni movimientos")
+
+    def clean(self):
+        cleaned = super().clean()
+        if cleaned.get("desde") and cleaned.get("hasta") and cleaned["desde"] > cleaned["hasta"]:
+            raise forms.ValidationError("La fecha inicial no puede ser posterior a la final.")
+        return cleaned
+
 
 # Archivo: core/forms.py
 class PeriodoForm(forms.ModelForm):
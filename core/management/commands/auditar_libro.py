@@ -0,0 +1,82 @@
+import json
+from collections import Counter
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services.auditoria import REPARABLES, auditar, rango_del_libro, reparar
+
+
+class Command(BaseCommand):
+    help = (
+        "Audita la integridad del libro contable (asientos descuadrados o vacíos, "
+        "partidas inválidas o huérfanas, transacciones sin asiento) con consultas "
+        "agrupadas por bloques de fechas. Emite un reporte JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--desde", type=date.fromisoformat,
+                            help="Fecha inicial AAAA-MM-DD (por defecto, la primera del libro)")
+        parser.add_argument("--hasta", type=date.fromisoformat,
+                            help="Fecha final AAAA-MM-DD (por defecto, la última del libro)")
+        parser.add_argument("--dias-por-bloque", type=int, default=90,
+                            help="Tamaño de cada bloque de fechas")
+        parser.add_argument("--hilos", type=int, default=1,
+                            help="Bloques a procesar en paralelo")
+        parser.add_argument("--reparar", nargs="?", const=",".join(sorted(REPARABLES)),
+                            help="Aplica reparaciones seguras; opcionalmente, lista de "
+                                 f"tipos separados por coma ({', '.join(sorted(REPARABLES))})")
+        parser.add_argument("--salida", help="Escribe el reporte en este archivo en vez de stdout")
+        parser.add_argument("--jsonl", action="store_true",
+                            help="Una anomalía por línea en lugar de un solo documento")
+
+    def handle(self, *args, **options):
+        primera, ultima = rango_del_libro()
+        desde = options["desde"] or primera
+        hasta = options["hasta"] or ultima
+        if desde is None or hasta is None:
+            self.stderr.write("El libro está vacío.")
+            return
+
+        rangos, anomalias = auditar(
+            desde, hasta, dias=options["dias_por_bloque"], hilos=options["hilos"]
+        )
+        reporte = {
+            "desde": desde.isoformat(),
+            "hasta": hasta.isoformat(),
+            "bloques": len(rangos),
+            "resumen": dict(Counter(a["tipo"] for a in anomalias)),
+            "anomalias": anomalias,
+            "reparaciones": [],
+        }
+
+        restantes = anomalias
+        if options["reparar"] and anomalias:
+            tipos = set(options["reparar"].split(",")) & REPARABLES
+            reporte["reparaciones"] = reparar(anomalias, tipos)
+            # Volver a auditar para reportar lo que quedó pendiente
+            _, restantes = auditar(
+                desde, hasta, dias=options["dias_por_bloque"], hilos=options["hilos"]
+            )
+            reporte["pendientes"] = dict(Counter(a["tipo"] for a in restantes))
+
+        self._escribir(reporte, options)
+
+        if restantes:
+            resumen = Counter(a["tipo"] for a in restantes)
+            raise CommandError(f"{len(restantes)} anomalías sin reparar ({dict(resumen)}).")
+
+    def _escribir(self, reporte, options):
+        if options["jsonl"]:
+            lineas = [json.dumps(a, ensure_ascii=False) for a in reporte["anomalias"]]
+            lineas += [json.dumps(r, ensure_ascii=False) for r in reporte["reparaciones"]]
+            texto = "\n".join(lineas)
+        else:
+            texto = json.dumps(reporte, ensure_ascii=False, indent=2)
+
+        if options["salida"]:
+            with open(options["salida"], "w", encoding="utf-8") as archivo:
+                archivo.write(texto + "\n")
+            self.stderr.write(f"Reporte escrito en {options['salida']}: {reporte['resumen']}")
+        else:
+            self.stdout.write(texto)
@@ -0,0 +1,130 @@
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from uuid import uuid4
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Q, Sum
+
+from core.models import AsientoContable, Cuenta, PartidaContable, TipoCuenta
+from core.services.balanza import balanza_comprobacion, filas_csv, totales_balanza
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la balanza de comprobación sobre un libro sintético (por defecto "
+        "1M de partidas). Los datos se crean dentro de una transacción que se "
+        "revierte al terminar, salvo --conservar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--partidas", type=int, default=1_000_000,
+                            help="Número de partidas a generar (se redondea a par)")
+        parser.add_argument("--cuentas", type=int, default=500,
+                            help="Número de cuentas sintéticas")
+        parser.add_argument("--dias", type=int, default=730,
+                            help="Días de historia hacia atrás desde hoy")
+        parser.add_argument("--lote", type=int, default=20_000,
+                            help="Tamaño de lote para bulk_create")
+        parser.add_argument("--comparar", action="store_true",
+                            help="Mide también el cálculo ingenuo (4 agregados por cuenta)")
+        parser.add_argument("--conservar", action="store_true",
+                            help="No revertir los datos sintéticos")
+        parser.add_argument("--semilla", type=int, default=42)
+
+    def handle(self, *args, **options):
+        random.seed(options["semilla"])
+        with transaction.atomic():
+            cuentas = self._generar(options)
+
+            hasta = date.today()
+            desde = hasta.replace(day=1) - timedelta(days=90)
+            ids = [c.pk for c in cuentas]
+
+            inicio = time.perf_counter()
+            filas = list(balanza_comprobacion(desde, hasta, cuenta_ids=ids))
+            t_balanza = time.perf_counter() - inicio
+            totales = totales_balanza(filas)
+            self.stdout.write(
+                f"Balanza ({len(filas)} cuentas, 1 consulta): {t_balanza:.2f}s — "
+                f"débitos {totales['debitos_periodo']} / créditos {totales['creditos_periodo']}"
+            )
+
+            inicio = time.perf_counter()
+            lineas = sum(1 for _ in filas_csv(balanza_comprobacion(desde, hasta, cuenta_ids=ids)))
+            self.stdout.write(f"CSV en streaming ({lineas} líneas): {time.perf_counter() - inicio:.2f}s")
+
+            if options["comparar"]:
+                inicio = time.perf_counter()
+                self._ingenuo(cuentas, desde, hasta)
+                t_ingenuo = time.perf_counter() - inicio
+                self.stdout.write(
+                    f"Ingenuo ({4 * len(cuentas)} consultas): {t_ingenuo:.2f}s "
+                    f"(x{t_ingenuo / t_balanza:.1f})"
+                )
+
+            if totales["diferencia"]:
+                self.stdout.write(self.style.ERROR(f"Descuadre: {totales['diferencia']}"))
+
+            if not options["conservar"]:
+                transaction.set_rollback(True)
+                self.stdout.write(self.style.NOTICE("Datos sintéticos revertidos."))
+
+    # ------------------------------------------------------------------
+    def _generar(self, options):
+        n_asientos = max(options["partidas"] // 2, 1)
+        lote = options["lote"]
+        marca = uuid4().hex[:8]
+
+        tipo, _ = TipoCuenta.objects.get_or_create(
+            codigo="BENCH", defaults={"nombre": "Benchmark", "grupo": "DEB"}
+        )
+        cuentas = Cuenta.objects.bulk_create([
+            Cuenta(
+                nombre=f"BENCH {marca} {i:05d}",
+                tipo=tipo,
+                naturaleza="ACREEDORA" if i % 3 == 0 else "DEUDORA",
+            )
+            for i in range(options["cuentas"])
+        ])
+        if cuentas[0].pk is None:
+            cuentas = list(Cuenta.objects.filter(nombre__startswith=f"BENCH {marca} "))
+        ids = [c.pk for c in cuentas]
+
+        self.stdout.write(
+            f"Generando {n_asientos} asientos / {2 * n_asientos} partidas en {len(ids)} cuentas…"
+        )
+        inicio = time.perf_counter()
+        hoy = date.today()
+        siguiente_id = (AsientoContable.objects.aggregate(m=Max("id"))["m"] or 0) + 1
+        # bulk_create no dispara señales: SaldoDiario no se toca
+        for base in range(0, n_asientos, lote):
+            asientos, partidas = [], []
+            for n in range(base, min(base + lote, n_asientos)):
+                asiento = AsientoContable(
+                    id=siguiente_id + n,
+                    fecha=hoy - timedelta(days=random.randrange(options["dias"])),
+                    descripcion="benchmark",
+                )
+                importe = Decimal(random.randrange(100, 500_000)) / 100
+                debe, haber = random.sample(ids, 2)
+                asientos.append(asiento)
+                partidas.append(PartidaContable(asiento=asiento, cuenta_id=debe, debito=importe))
+                partidas.append(PartidaContable(asiento=asiento, cuenta_id=haber, credito=importe))
+            AsientoContable.objects.bulk_create(asientos)
+            PartidaContable.objects.bulk_create(partidas)
+        self.stdout.write(f"Datos generados en {time.perf_counter() - inicio:.1f}s")
+        return cuentas
+
+    def _ingenuo(self, cuentas, desde, hasta):
+        """Equivalente a sumar cuenta por cuenta (lo que se hacía antes)."""
+        for cuenta in cuentas:
+            base = PartidaContable.objects.filter(cuenta=cuenta)
+            previas = Q(asiento__fecha__lt=desde)
+            rango = Q(asiento__fecha__range=(desde, hasta))
+            base.filter(previas).aggregate(Sum("debito"))
+            base.filter(previas).aggregate(Sum("credito"))
+            base.filter(rango).aggregate(Sum("debito"))
+            base.filter(rango).aggregate(Sum("credito"))
@@ -0,0 +1,80 @@
+import random
+import statistics
+import time
+from uuid import uuid4
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Cuenta, TipoCuenta
+from core.services.busqueda_cuentas import buscar_cuentas, indice
+from core.services.estadisticas import invalidar
+
+PALABRAS = ["Banco", "Tarjeta", "Crédito", "Débito", "Ahorro", "Nómina", "Servicio",
+            "Luz", "Agua", "Gas", "Internet", "Teléfono", "Préstamo", "Inversión", "Efectivo"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la búsqueda type-ahead de cuentas (cuentas_autocomplete?q=): "
+        "construcción del índice en memoria y latencia por consulta al teclear "
+        "prefijos. Las cuentas sintéticas se revierten al terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cuentas", type=int, default=5000)
+        parser.add_argument("--consultas", type=int, default=500)
+        parser.add_argument("--semilla", type=int, default=42)
+
+    def handle(self, *args, **options):
+        random.seed(options["semilla"])
+        with transaction.atomic():
+            self._generar(options["cuentas"])
+            # bulk_create no dispara señales: rotar la versión a mano
+            invalidar("cuentas")
+
+            inicio = time.perf_counter()
+            filas = indice()[0]
+            construccion = time.perf_counter() - inicio
+            self.stdout.write(f"Índice y saldos de {len(filas)} cuentas cargados en {construccion * 1000:.1f} ms")
+
+            # Simula teclear: cada consulta es un prefijo de 1 a 6 letras de una palabra
+            consultas = []
+            for _ in range(options["consultas"]):
+                palabra = random.choice(PALABRAS)
+                consultas.append(palabra[:random.randint(1, 6)])
+            consultas += ["nom 0", "ahorro 12", "zzz"]
+
+            tiempos = []
+            for consulta in consultas:
+                inicio = time.perf_counter()
+                buscar_cuentas(consulta)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            tiempos.sort()
+            self.stdout.write(
+                f"{len(tiempos)} consultas: mediana {statistics.median(tiempos):.2f} ms, "
+                f"p95 {tiempos[int(len(tiempos) * 0.95)]:.2f} ms, máx {tiempos[-1]:.2f} ms "
+                f"(índice y saldos ya cargados)"
+            )
+
+            transaction.set_rollback(True)
+            invalidar("cuentas")
+            self.stdout.write(self.style.NOTICE("Datos sintéticos revertidos."))
+
+    def _generar(self, total):
+        tipo, _ = TipoCuenta.objects.get_or_create(
+            codigo="BENCH", defaults={"nombre": "Benchmark", "grupo": "DEB"}
+        )
+        sufijo = uuid4().hex[:6]
+        Cuenta.objects.bulk_create(
+            (
+                Cuenta(
+                    nombre=f"{' '.join(random.sample(PALABRAS, 2))} {n} {sufijo}",
+                    referencia=f"{random.randint(0, 10**10):010d}",
+                    no_cliente=f"C{n:06d}",
+                    tipo=tipo,
+                )
+                for n in range(total)
+            ),
+            batch_size=1000,
+        )
@@ -0,0 +1,135 @@
+import http.client
+import itertools
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from core.models import Cuenta
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga de los endpoints AJAX contra uno o más servidores ya "
+        "levantados (p. ej. WSGI en :8000 y ASGI/uvicorn en :8001, ver "
+        "guias/despliegue-asgi.md): peticiones por segundo y latencias p50/p95/p99 "
+        "con N clientes concurrentes (conexiones keep-alive)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--servidor", action="append", metavar="NOMBRE=URL", required=True,
+            help="Servidor a medir, p. ej. wsgi=http://127.0.0.1:8000 (repetible)",
+        )
+        parser.add_argument(
+            "--ruta", action="append",
+            help="Ruta a pedir (repetible); por defecto los catálogos JSON y cuenta_movimientos",
+        )
+        parser.add_argument("--concurrencia", type=int, default=50)
+        parser.add_argument("--peticiones", type=int, default=2000)
+        parser.add_argument("--usuario", help="Usuario con el que se crea una sesión para las peticiones")
+        parser.add_argument("--timeout", type=float, default=30)
+
+    def handle(self, *args, **options):
+        servidores = []
+        for valor in options["servidor"]:
+            nombre, _, url = valor.partition("=")
+            if not url or not urlsplit(url).hostname:
+                raise CommandError(f"--servidor debe ser NOMBRE=URL: {valor!r}")
+            servidores.append((nombre, urlsplit(url)))
+
+        rutas = options["ruta"] or self._rutas_por_defecto()
+        cabeceras = {"Accept": "application/json", "X-Requested-With": "XMLHttpRequest"}
+        if options["usuario"]:
+            cabeceras["Cookie"] = f"{settings.SESSION_COOKIE_NAME}={self._sesion(options['usuario'])}"
+
+        self.stdout.write(
+            f"{options['peticiones']} peticiones, {options['concurrencia']} concurrentes, "
+            f"rutas: {', '.join(rutas)}"
+        )
+        base = None
+        for nombre, url in servidores:
+            resultado = self._medir(url, rutas, cabeceras, options)
+            if resultado is None:
+                self.stdout.write(self.style.ERROR(f"{nombre}: sin respuestas correctas"))
+                continue
+            por_segundo, latencias, errores = resultado
+            base = base or por_segundo
+            self.stdout.write(
+                f"{nombre:>8}: {por_segundo:8.1f} pet/s ({por_segundo / base:4.2f}×)  "
+                f"p50 {self._percentil(latencias, 50):7.1f} ms  "
+                f"p95 {self._percentil(latencias, 95):7.1f} ms  "
+                f"p99 {self._percentil(latencias, 99):7.1f} ms  "
+                f"errores {errores}"
+            )
+
+    def _rutas_por_defecto(self):
+        rutas = [
+            reverse("core:refresh_categorias"),
+            reverse("core:refresh_cuentas"),
+            reverse("core:refresh_medios_pago"),
+        ]
+        cuenta = Cuenta.objects.order_by("pk").values_list("pk", flat=True).first()
+        if cuenta:
+            rutas.append(f"{reverse('core:cuenta_movimientos')}?cuenta={cuenta}")
+        return rutas
+
+    def _sesion(self, usuario):
+        """Clave de una sesión nueva ya autenticada como ``usuario``."""
+        try:
+            user = get_user_model().objects.get(username=usuario)
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No existe el usuario {usuario!r}")
+        sesion = SessionStore()
+        sesion[SESSION_KEY] = str(user.pk)
+        sesion[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        sesion[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        sesion.create()
+        return sesion.session_key
+
+    def _medir(self, url, rutas, cabeceras, options):
+        local = threading.local()
+        prefijo = url.path.rstrip("/")
+
+        def pedir(ruta):
+            # Una conexión keep-alive por hilo; se reabre si el servidor la cierra
+            conexion = getattr(local, "conexion", None)
+            if conexion is None:
+                clase = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+                conexion = local.conexion = clase(url.hostname, url.port, timeout=options["timeout"])
+            inicio = time.perf_counter()
+            try:
+                conexion.request("GET", prefijo + ruta, headers=cabeceras)
+                respuesta = conexion.getresponse()
+                respuesta.read()
+                correcta = respuesta.status < 400
+            except (OSError, http.client.HTTPException):
+                conexion.close()
+                local.conexion = None
+                correcta = False
+            return correcta, (time.perf_counter() - inicio) * 1000
+
+        with ThreadPoolExecutor(options["concurrencia"]) as pool:
+            # Calentamiento: abre las conexiones y llena las cachés
+            list(pool.map(pedir, itertools.islice(itertools.cycle(rutas), options["concurrencia"])))
+            inicio = time.perf_counter()
+            resultados = list(pool.map(pedir, itertools.islice(itertools.cycle(rutas), options["peticiones"])))
+            duracion = time.perf_counter() - inicio
+
+        latencias = sorted(ms for correcta, ms in resultados if correcta)
+        if not latencias:
+            return None
+        return len(latencias) / duracion, latencias, len(resultados) - len(latencias)
+
+    @staticmethod
+    def _percentil(valores, p):
+        if len(valores) == 1:
+            return valores[0]
+        return statistics.quantiles(valores, n=100)[p - 1]
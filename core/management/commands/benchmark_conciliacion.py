@@ -0,0 +1,184 @@
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from uuid import uuid4
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F
+
+from core.models import Cuenta, ImportacionBancaria, MovimientoBancario, TipoCuenta, Transaccion
+from core.services.conciliacion import MODOS, ORDEN, SECUENCIAL, conciliar_importacion
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el matching masivo de una importación bancaria: "
+        "aplicar_match_automatico movimiento por movimiento (sobre una muestra, "
+        "extrapolado) contra conciliar_importacion en modo secuencial y global. "
+        "Cuenta cuántos movimientos quedan con la transacción de la que salieron; "
+        "con pocos --montos hay muchos montos repetidos en días contiguos. Con "
+        "--verificar el método por movimiento corre sobre todos y se comprueba que "
+        "el modo secuencial dé los mismos matches. Los datos sintéticos se revierten."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--movimientos", type=int, default=5000)
+        parser.add_argument("--dias", type=int, default=90)
+        parser.add_argument("--montos", type=int, default=400,
+                            help="Montos distintos (menos = más montos repetidos)")
+        parser.add_argument("--muestra", type=int, default=200,
+                            help="Movimientos medidos con el método por movimiento")
+        parser.add_argument("--umbral", type=int, default=95)
+        parser.add_argument("--verificar", action="store_true")
+        parser.add_argument("--semilla", type=int, default=42)
+
+    def handle(self, *args, **options):
+        random.seed(options["semilla"])
+        with transaction.atomic():
+            importacion = self._generar(options)
+            total = importacion.movimientos.count()
+
+            with transaction.atomic():
+                limite = total if options["verificar"] else options["muestra"]
+                esperados, segundos, consultas = self._por_movimiento(importacion, limite, options["umbral"])
+                transaction.set_rollback(True)
+            por_linea = segundos / max(limite, 1)
+            self.stdout.write(
+                f"Por movimiento: {limite} movimientos en {segundos:.2f}s "
+                f"({por_linea * 1000:.1f} ms y {consultas / max(limite, 1):.1f} consultas c/u) "
+                f"→ {total} movimientos ≈ {por_linea * total:.1f}s"
+            )
+
+            for modo in MODOS:
+                with transaction.atomic():
+                    consultas_lote = []
+                    with connection.execute_wrapper(self._contar(consultas_lote)):
+                        inicio = time.perf_counter()
+                        conciliados, procesados = conciliar_importacion(importacion, options["umbral"], modo)
+                        segundos_lote = time.perf_counter() - inicio
+                    obtenidos = self._matches(
+                        importacion.movimientos.filter(conciliado=True).select_related("transaccion_conciliada")
+                    )
+                    aciertos = importacion.movimientos.filter(
+                        conciliado=True, transaccion_conciliada__descripcion=F("descripcion")
+                    ).count()
+                    distintas = (
+                        importacion.movimientos.filter(conciliado=True)
+                        .values("transaccion_conciliada").distinct().count()
+                    )
+                    transaction.set_rollback(True)
+                self.stdout.write(
+                    f"Por lote ({modo}): {procesados} movimientos, {conciliados} conciliados "
+                    f"({aciertos} con su transacción de origen) en {segundos_lote:.2f}s "
+                    f"con {len(consultas_lote)} consultas ({por_linea * total / segundos_lote:.0f}× más rápido)"
+                )
+                if distintas != conciliados:
+                    self.stdout.write(self.style.ERROR(
+                        f"{conciliados - distintas} transacciones conciliadas con más de un movimiento."
+                    ))
+                if options["verificar"] and modo == SECUENCIAL:
+                    if obtenidos == esperados:
+                        self.stdout.write(self.style.SUCCESS(f"Mismos {len(obtenidos)} matches que por movimiento."))
+                    else:
+                        distintos = {k for k in esperados.keys() | obtenidos.keys()
+                                     if esperados.get(k) != obtenidos.get(k)}
+                        self.stdout.write(self.style.ERROR(f"{len(distintos)} movimientos con match distinto."))
+
+            transaction.set_rollback(True)
+            self.stdout.write(self.style.NOTICE("Datos sintéticos revertidos."))
+
+    def _por_movimiento(self, importacion, limite, umbral):
+        """Matching original, en el mismo orden que el lote; ``{movimiento: transacción}``."""
+        movimientos = list(
+            importacion.movimientos.filter(conciliado=False)
+            .select_related("importacion").order_by(*ORDEN)[:limite]
+        )
+        consultas = []
+        with connection.execute_wrapper(self._contar(consultas)):
+            inicio = time.perf_counter()
+            for movimiento in movimientos:
+                movimiento.aplicar_match_automatico(umbral)
+            segundos = time.perf_counter() - inicio
+        return self._matches(m for m in movimientos if m.conciliado), segundos, len(consultas)
+
+    @staticmethod
+    def _contar(consultas):
+        def envoltura(execute, sql, params, many, context):
+            consultas.append(sql)
+            return execute(sql, params, many, context)
+        return envoltura
+
+    @staticmethod
+    def _matches(movimientos):
+        """
+        ``{movimiento: (fecha, monto)}`` de la transacción conciliada: entre
+        candidatas con la misma fecha y monto ``buscar_coincidencias`` no fija
+        un orden, así que se compara qué se concilió y no el id elegido.
+        """
+        return {m.pk: (m.transaccion_conciliada.fecha, m.transaccion_conciliada.monto) for m in movimientos}
+
+    def _generar(self, options):
+        """
+        Una cuenta con transacciones pendientes y una importación cuyos
+        movimientos las reflejan con ±1 día de diferencia; algunos no tienen
+        transacción y algunas transacciones no tienen movimiento.
+        """
+        marca = uuid4().hex[:8]
+        tipo, _ = TipoCuenta.objects.get_or_create(
+            codigo="BENCH", defaults={"nombre": "Benchmark", "grupo": "DEB"}
+        )
+        cuenta, destino = Cuenta.objects.bulk_create([
+            Cuenta(nombre=f"BENCH {marca} banco", tipo=tipo),
+            Cuenta(nombre=f"BENCH {marca} destino", tipo=tipo),
+        ])
+        if cuenta.pk is None:
+            cuenta = Cuenta.objects.get(nombre=f"BENCH {marca} banco")
+            destino = Cuenta.objects.get(nombre=f"BENCH {marca} destino")
+
+        hasta = date.today()
+        montos = [Decimal(random.randrange(100, 500_000)) / 100 for _ in range(options["montos"])]
+        total = options["movimientos"]
+        # bulk_create de Manager no genera asientos ni dispara señales
+        transacciones = Transaccion.objects.bulk_create([
+            Transaccion(
+                fecha=hasta - timedelta(days=random.randrange(options["dias"])),
+                descripcion=f"benchmark {n}",
+                monto=random.choice(montos),
+                cuenta_origen=cuenta,
+                cuenta_destino=destino,
+                tipo="TRANSFERENCIA",
+            )
+            for n in range(int(total * 1.05))
+        ])
+
+        importacion = ImportacionBancaria.objects.create(
+            cuenta=cuenta,
+            archivo_nombre=f"benchmark_{marca}.csv",
+            periodo_inicio=hasta - timedelta(days=options["dias"]),
+            periodo_fin=hasta,
+        )
+        movimientos = []
+        for t in random.sample(transacciones, int(total * 0.95)):
+            movimientos.append(MovimientoBancario(
+                importacion=importacion,
+                fecha=t.fecha + timedelta(days=random.choice((0, 0, 0, 1, -1))),
+                descripcion=t.descripcion,
+                referencia=f"REF{len(movimientos):06d}",
+                monto=-t.monto,
+            ))
+        while len(movimientos) < total:
+            movimientos.append(MovimientoBancario(
+                importacion=importacion,
+                fecha=hasta - timedelta(days=random.randrange(options["dias"])),
+                descripcion="sin transacción",
+                referencia=f"REF{len(movimientos):06d}",
+                monto=-random.choice(montos),
+            ))
+        MovimientoBancario.objects.bulk_create(movimientos, batch_size=1000)
+        self.stdout.write(
+            f"Generados {len(transacciones)} transacciones pendientes y {total} movimientos "
+            f"({options['montos']} montos distintos)"
+        )
+        return importacion
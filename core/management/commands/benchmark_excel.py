@@ -0,0 +1,120 @@
+import io
+import time
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+from uuid import uuid4
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Cuenta, TipoCuenta, Transaccion
+from core.services.exportacion import excel_estado_cuenta
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara la exportación Excel del estado de cuenta: openpyxl write_only "
+        "(actual) contra la ruta anterior con pandas (lista de dicts → DataFrame "
+        "→ ExcelWriter → BytesIO). Mide tiempo y memoria pico (tracemalloc). "
+        "Los datos sintéticos se revierten al terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--filas", type=int, default=100_000)
+        parser.add_argument("--sin-pandas", action="store_true",
+                            help="Medir solo la exportación actual")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            cuenta = self._generar(options["filas"])
+            hasta = date.today()
+            desde = hasta - timedelta(days=3650)
+
+            resultados = {}
+            resultados["write_only"] = self._medir(
+                lambda: self._write_only(cuenta, desde, hasta)
+            )
+            if not options["sin_pandas"]:
+                resultados["pandas"] = self._medir(
+                    lambda: self._pandas(cuenta, desde, hasta)
+                )
+
+            for nombre, (segundos, pico, tamano) in resultados.items():
+                self.stdout.write(
+                    f"{nombre:>10}: {segundos:.2f}s, pico {pico / 1e6:.1f} MB, "
+                    f"archivo {tamano / 1e6:.1f} MB"
+                )
+            if "pandas" in resultados:
+                actual, anterior = resultados["write_only"], resultados["pandas"]
+                self.stdout.write(
+                    f"write_only vs pandas: x{anterior[0] / actual[0]:.1f} en tiempo, "
+                    f"x{anterior[1] / actual[1]:.1f} en memoria"
+                )
+
+            transaction.set_rollback(True)
+            self.stdout.write(self.style.NOTICE("Datos sintéticos revertidos."))
+
+    def _generar(self, filas):
+        tipo, _ = TipoCuenta.objects.get_or_create(
+            codigo="BENCH", defaults={"nombre": "Benchmark", "grupo": "DEB"}
+        )
+        cuenta = Cuenta.objects.create(nombre=f"BENCH {uuid4().hex[:8]}", tipo=tipo)
+        hoy = date.today()
+        self.stdout.write(f"Generando {filas} transacciones…")
+        # bulk_create de Manager no genera asientos ni dispara señales
+        Transaccion.objects.bulk_create(
+            (
+                Transaccion(
+                    fecha=hoy - timedelta(days=n % 3650),
+                    descripcion=f"Movimiento de prueba {n}",
+                    monto=Decimal(n % 100_000) / 100,
+                    cuenta_origen=cuenta,
+                    tipo="GASTO",
+                )
+                for n in range(filas)
+            ),
+            batch_size=5000,
+        )
+        return cuenta
+
+    def _medir(self, funcion):
+        """Tiempo en una corrida limpia y memoria pico en otra (tracemalloc la hace lenta)."""
+        inicio = time.perf_counter()
+        tamano = funcion()
+        segundos = time.perf_counter() - inicio
+        tracemalloc.start()
+        funcion()
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return segundos, pico, tamano
+
+    def _write_only(self, cuenta, desde, hasta):
+        with excel_estado_cuenta(cuenta, desde, hasta, Decimal("0"), Decimal("0")) as archivo:
+            return len(archivo.read())
+
+    def _pandas(self, cuenta, desde, hasta):
+        """La ruta anterior de EstadoCuentaView._export_excel."""
+        import pandas as pd
+
+        movs = (
+            Transaccion.objects.de_cuenta(cuenta, desde, hasta)
+            .select_related("categoria")
+            .order_by("fecha")
+        )
+        data = [{
+            "Fecha": m.fecha,
+            "Descripción": m.descripcion,
+            "Categoría": m.categoria.nombre if m.categoria else "",
+            "Monto": m.monto,
+        } for m in movs]
+        df = pd.DataFrame(data)
+        buf = io.BytesIO()
+        with pd.ExcelWriter(buf, engine="openpyxl") as writer:
+            df.to_excel(writer, index=False, sheet_name="Movimientos")
+            pd.DataFrame({
+                "Concepto": ["Saldo inicial", "Saldo final"],
+                "Valor": [Decimal("0"), Decimal("0")],
+            }).to_excel(writer, index=False, sheet_name="Resumen")
+        buf.seek(0)
+        return len(buf.read())
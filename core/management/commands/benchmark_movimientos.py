@@ -0,0 +1,160 @@
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from uuid import uuid4
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q, Sum
+
+from core.models import Cuenta, TipoCuenta, Transaccion
+
+# Índices compuestos que añade la migración 0046
+CAMPOS_COMPUESTOS = (["cuenta_origen", "fecha"], ["cuenta_destino", "fecha"])
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara las consultas de movimientos por cuenta antes (OR de dos "
+        "columnas sin índices compuestos) y después (Transaccion.objects."
+        "de_cuenta con índices (cuenta, fecha)): plan EXPLAIN y tiempos. Los "
+        "datos sintéticos se revierten al terminar, salvo --conservar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--transacciones", type=int, default=300_000)
+        parser.add_argument("--cuentas", type=int, default=200)
+        parser.add_argument("--dias", type=int, default=1095,
+                            help="Días de historia hacia atrás desde hoy")
+        parser.add_argument("--muestras", type=int, default=50,
+                            help="Cuentas consultadas por escenario")
+        parser.add_argument("--lote", type=int, default=20_000)
+        parser.add_argument("--conservar", action="store_true",
+                            help="No revertir los datos sintéticos")
+        parser.add_argument("--semilla", type=int, default=42)
+
+    def handle(self, *args, **options):
+        random.seed(options["semilla"])
+        hasta = date.today()
+        desde = hasta - timedelta(days=30)
+
+        with transaction.atomic():
+            ids = self._generar(options)
+            muestra = random.sample(ids, min(options["muestras"], len(ids)))
+
+            despues = self._medir("Después (de_cuenta + índices compuestos)",
+                                  self._consultas_nuevas, muestra, desde, hasta)
+
+            if connection.features.can_rollback_ddl:
+                with transaction.atomic():
+                    self._quitar_indices()
+                    antes = self._medir("Antes (OR + índices de una columna)",
+                                        self._consultas_anteriores, muestra, desde, hasta)
+                    transaction.set_rollback(True)
+                self._resumen(antes, despues)
+            else:
+                self.stdout.write(self.style.WARNING(
+                    "El motor no revierte DDL: se omite la medición sin índices compuestos."
+                ))
+
+            if not options["conservar"]:
+                transaction.set_rollback(True)
+                self.stdout.write(self.style.NOTICE("Datos sintéticos revertidos."))
+
+    # ------------------------------------------------------------------
+    def _generar(self, options):
+        marca = uuid4().hex[:8]
+        tipo, _ = TipoCuenta.objects.get_or_create(
+            codigo="BENCH", defaults={"nombre": "Benchmark", "grupo": "DEB"}
+        )
+        cuentas = Cuenta.objects.bulk_create([
+            Cuenta(nombre=f"BENCH {marca} {i:05d}", tipo=tipo)
+            for i in range(options["cuentas"])
+        ])
+        if cuentas[0].pk is None:
+            cuentas = list(Cuenta.objects.filter(nombre__startswith=f"BENCH {marca} "))
+        ids = [c.pk for c in cuentas]
+
+        total = options["transacciones"]
+        self.stdout.write(f"Generando {total} transacciones en {len(ids)} cuentas…")
+        inicio = time.perf_counter()
+        hoy = date.today()
+        # bulk_create de Manager no genera asientos ni dispara señales
+        for base in range(0, total, options["lote"]):
+            lote = []
+            for _ in range(base, min(base + options["lote"], total)):
+                origen, destino = random.sample(ids, 2)
+                lote.append(Transaccion(
+                    fecha=hoy - timedelta(days=random.randrange(options["dias"])),
+                    descripcion="benchmark",
+                    monto=Decimal(random.randrange(100, 500_000)) / 100,
+                    cuenta_origen_id=origen,
+                    cuenta_destino_id=destino,
+                    tipo="TRANSFERENCIA",
+                ))
+            Transaccion.objects.bulk_create(lote)
+        self.stdout.write(f"Datos generados en {time.perf_counter() - inicio:.1f}s")
+        return ids
+
+    def _quitar_indices(self):
+        nombres = [
+            indice.name for indice in Transaccion._meta.indexes
+            if list(indice.fields) in CAMPOS_COMPUESTOS
+        ]
+        with connection.cursor() as cursor:
+            for nombre in nombres:
+                sql = f"DROP INDEX {connection.ops.quote_name(nombre)}"
+                if connection.vendor == "mysql":
+                    sql += f" ON {connection.ops.quote_name(Transaccion._meta.db_table)}"
+                cursor.execute(sql)
+
+    # Mismas tres consultas que hacen las vistas de cuenta, periodo y estado de cuenta
+    def _consultas_anteriores(self, cuenta, desde, hasta):
+        ambas = Q(cuenta_origen=cuenta) | Q(cuenta_destino=cuenta)
+        return {
+            "pagina": Transaccion.objects.filter(ambas).order_by("-fecha")[:50],
+            "rango": Transaccion.objects.filter(ambas, fecha__range=(desde, hasta)).order_by("-fecha", "-id"),
+            "saldo_previo": Transaccion.objects.filter(ambas, fecha__lt=desde),
+        }
+
+    def _consultas_nuevas(self, cuenta, desde, hasta):
+        return {
+            "pagina": Transaccion.objects.de_cuenta(cuenta).order_by("-fecha")[:50],
+            "rango": Transaccion.objects.de_cuenta(cuenta, desde, hasta).order_by("-fecha", "-id"),
+            "saldo_previo": Transaccion.objects.de_cuenta(cuenta, antes_de=desde),
+        }
+
+    def _medir(self, titulo, consultas, muestra, desde, hasta):
+        self.stdout.write(self.style.MIGRATE_HEADING(titulo))
+        ejemplo = consultas(muestra[0], desde, hasta)
+        for nombre, qs in ejemplo.items():
+            plan = qs.explain() if nombre != "saldo_previo" else qs.order_by().values("monto").explain()
+            self.stdout.write(f"  EXPLAIN {nombre}:")
+            for linea in plan.splitlines():
+                self.stdout.write(f"    {linea}")
+
+        tiempos = dict.fromkeys(ejemplo, 0.0)
+        for cuenta in muestra:
+            for nombre, qs in consultas(cuenta, desde, hasta).items():
+                inicio = time.perf_counter()
+                if nombre == "saldo_previo":
+                    qs.aggregate(total=Sum("monto"))
+                else:
+                    list(qs.values_list("id", "fecha", "monto"))
+                tiempos[nombre] += time.perf_counter() - inicio
+
+        for nombre, segundos in tiempos.items():
+            self.stdout.write(
+                f"  {nombre}: {segundos:.3f}s total, "
+                f"{1000 * segundos / len(muestra):.2f} ms por cuenta"
+            )
+        return tiempos
+
+    def _resumen(self, antes, despues):
+        self.stdout.write(self.style.MIGRATE_HEADING("Resumen"))
+        for nombre in antes:
+            factor = antes[nombre] / despues[nombre] if despues[nombre] else float("inf")
+            self.stdout.write(
+                f"  {nombre}: {antes[nombre]:.3f}s → {despues[nombre]:.3f}s (x{factor:.1f})"
+            )
@@ -0,0 +1,89 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.models import Periodo
+from core.services.pdf_periodos import generar_periodo, inicializar_proceso
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera (o deja en caché) los PDF de todos los estados de cuenta con "
+        "fecha de corte en un mes, repartidos en procesos de trabajo. Los que "
+        "ya estén en la caché con el mismo contenido no se vuelven a dibujar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--mes", required=True, help="Mes de corte AAAA-MM")
+        parser.add_argument("--cuenta", dest="cuentas", type=int, action="append",
+                            help="ID de cuenta (se puede repetir). Si se omite, todas.")
+        parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1,
+                            help="Procesos de trabajo (1 = en este mismo proceso)")
+
+    def handle(self, *args, **options):
+        try:
+            desde = date.fromisoformat(f"{options['mes']}-01")
+        except ValueError:
+            raise CommandError("--mes debe tener el formato AAAA-MM")
+        hasta = desde + relativedelta(months=1)
+
+        periodos = Periodo.objects.filter(fecha_corte__gte=desde, fecha_corte__lt=hasta)
+        if options["cuentas"]:
+            periodos = periodos.filter(cuenta_id__in=options["cuentas"])
+        ids = list(periodos.order_by("cuenta_id", "fecha_corte").values_list("pk", flat=True))
+        if not ids:
+            self.stdout.write(self.style.WARNING(f"Sin periodos con corte en {options['mes']}."))
+            return
+
+        procesos = max(1, min(options["procesos"], len(ids)))
+        self.stdout.write(self.style.NOTICE(
+            f"Generando {len(ids)} estados de cuenta en {procesos} proceso(s)…"
+        ))
+        inicio = time.perf_counter()
+        generados = errores = 0
+
+        if procesos == 1:
+            resultados = (self._ejecutar(generar_periodo, pk) for pk in ids)
+        else:
+            # Los procesos hijos abren sus propias conexiones: no heredar las del padre
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=procesos, initializer=inicializar_proceso)
+            futuros = {pool.submit(generar_periodo, pk): pk for pk in ids}
+            resultados = (self._resultado(futuro, futuros[futuro]) for futuro in as_completed(futuros))
+
+        try:
+            for pk, archivo, generado, error in resultados:
+                if error:
+                    errores += 1
+                    self.stderr.write(f"  periodo {pk}: {error}")
+                    continue
+                generados += generado
+                if options["verbosity"] > 1:
+                    estado = "generado" if generado else "en caché"
+                    self.stdout.write(f"  periodo {pk}: {archivo} ({estado})")
+        finally:
+            if procesos > 1:
+                pool.shutdown()
+
+        segundos = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"Listo en {segundos:.1f}s: {generados} generados, "
+            f"{len(ids) - generados - errores} ya en caché, {errores} con error."
+        ))
+
+    def _ejecutar(self, funcion, pk):
+        try:
+            return (*funcion(pk), None)
+        except Exception as exc:
+            return pk, None, False, exc
+
+    def _resultado(self, futuro, pk):
+        try:
+            return (*futuro.result(), None)
+        except Exception as exc:
+            return pk, None, False, exc
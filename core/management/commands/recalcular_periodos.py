@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from core.services.periodos import recalcular_cuentas
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula los saldos persistidos (inicial, cargos, abonos, final) de "
+        "las cadenas de periodos, de la raíz hacia adelante en una sola pasada."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cuenta", dest="cuentas", type=int, action="append",
+                            help="ID de cuenta a recalcular (se puede repetir). "
+                                 "Si se omite, se recalculan todas.")
+        parser.add_argument("--incluir-cerrados", action="store_true",
+                            help="Recalcula también los periodos cerrados (normalmente congelados)")
+
+    def handle(self, *args, **options):
+        cuentas = options["cuentas"]
+        alcance = f"cuentas {cuentas}" if cuentas else "todas las cuentas"
+        self.stdout.write(self.style.NOTICE(f"Recalculando periodos de {alcance}…"))
+
+        total = recalcular_cuentas(cuentas, incluir_cerrados=options["incluir_cerrados"])
+
+        self.stdout.write(self.style.SUCCESS(f"Proceso completado: {total} periodos recalculados."))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from core.services.saldos import reconstruir_saldos
+
+
+class Command(BaseCommand):
+    help = (
+        "Regenera la tabla de saldos diarios (SaldoDiario) a partir de las "
+        "partidas contables. Útil después de cargas masivas o si se detecta desfase."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cuenta", dest="cuentas", type=int, action="append",
+                            help="ID de cuenta a reconstruir (se puede repetir). "
+                                 "Si se omite, se reconstruyen todas.")
+        parser.add_argument("--batch-size", type=int, default=1000,
+                            help="Tamaño de lote para bulk_create")
+
+    def handle(self, *args, **options):
+        cuentas = options["cuentas"]
+        alcance = f"cuentas {cuentas}" if cuentas else "todas las cuentas"
+        self.stdout.write(self.style.NOTICE(f"Reconstruyendo saldos diarios de {alcance}…"))
+
+        total = reconstruir_saldos(cuentas, batch_size=options["batch_size"])
+
+        self.stdout.write(self.style.SUCCESS(f"Proceso completado: {total} snapshots generados."))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services.saldos import reconstruir_saldos, verificar_saldos
+
+
+class Command(BaseCommand):
+    help = (
+        "Verifica que los saldos diarios (SaldoDiario) coincidan con las partidas "
+        "contables y, opcionalmente, reconstruye las cuentas con diferencias."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cuenta", dest="cuentas", type=int, action="append",
+                            help="ID de cuenta a verificar (se puede repetir)")
+        parser.add_argument("--reparar", action="store_true",
+                            help="Reconstruye las cuentas con diferencias")
+        parser.add_argument("--limite", type=int, default=20,
+                            help="Máximo de diferencias a mostrar")
+
+    def handle(self, *args, **options):
+        diferencias = verificar_saldos(options["cuentas"])
+
+        if not diferencias:
+            self.stdout.write(self.style.SUCCESS("Saldos diarios consistentes."))
+            return
+
+        cuentas_afectadas = sorted({d["cuenta_id"] for d in diferencias})
+        self.stdout.write(self.style.WARNING(
+            f"{len(diferencias)} diferencias en {len(cuentas_afectadas)} cuentas."
+        ))
+        for d in diferencias[:options["limite"]]:
+            self.stdout.write(
+                f"  cuenta={d['cuenta_id']} fecha={d['fecha']} {d['campo']}: "
+                f"esperado={d['esperado']} guardado={d['guardado']}"
+            )
+
+        if options["reparar"]:
+            total = reconstruir_saldos(cuentas_afectadas)
+            self.stdout.write(self.style.SUCCESS(
+                f"Reparado: {total} snapshots regenerados para {len(cuentas_afectadas)} cuentas."
+            ))
+        else:
+            raise CommandError("Saldos desfasados; ejecute con --reparar o use reconstruir_saldos.")
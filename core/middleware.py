@@ -0,0 +1,196 @@
+"""
+Middleware de la app core.
+"""
+import cProfile
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from .services import perfilador
+from .services.exportacion import en_bloques_async
+from .services.perfil_sql import SIN_RESOLVER, RegistroSQL, abreviar, presupuesto, registrar
+
+logger = logging.getLogger('core.sql')
+
+# Tomado mientras una petición corre bajo cProfile (ver PerfilPythonMiddleware)
+_perfilando = threading.Lock()
+
+
+def _instalar(registro):
+    # ``connection`` se resuelve en el hilo que llama: debe ser el del ORM
+    connection.execute_wrappers.append(registro)
+
+
+class StreamingASGIMiddleware:
+    """
+    Bajo ASGI convierte las respuestas en streaming con iterador síncrono
+    (exportaciones CSV, ``FileResponse``) en iteradores async por bloques
+    (``exportacion.en_bloques_async``): sin esto Django lee el cuerpo completo
+    en memoria antes de enviar el primer byte. Bajo WSGI no hace nada. Va
+    primero en ``MIDDLEWARE`` para envolver lo que agreguen los demás.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if response.streaming and not response.is_async:
+            response.streaming_content = en_bloques_async(response.streaming_content)
+        return response
+
+
+class PresupuestoSQLMiddleware:
+    """
+    Mide el SQL de cada petición (conteo, tiempo en la base y sentencias
+    repetidas) sobre la conexión por defecto. Las peticiones que exceden
+    el presupuesto (``SQL_PRESUPUESTO_*``) se registran en el logger
+    ``core.sql``; todas suman al resumen por vista (``diagnostico/sql/``).
+    Lo que una respuesta en streaming (CSV) consulta al enviarse queda fuera.
+
+    En ASGI las conexiones son por hilo y el ORM async consulta desde el
+    hilo ``thread_sensitive`` de la petición: el registro se instala y se
+    quita en ese hilo (``sync_to_async``), no en el del event loop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        registro = RegistroSQL()
+        with connection.execute_wrapper(registro):
+            response = self.get_response(request)
+        self._registrar(request, registro)
+        return response
+
+    async def __acall__(self, request):
+        registro = RegistroSQL()
+        await sync_to_async(_instalar)(registro)
+        try:
+            response = await self.get_response(request)
+        finally:
+            # Quitarlo, el log (archivo) y el resumen (caché), fuera del event loop
+            await sync_to_async(self._cerrar)(request, registro)
+        return response
+
+    def _cerrar(self, request, registro):
+        connection.execute_wrappers.remove(registro)
+        self._registrar(request, registro)
+
+    def _registrar(self, request, registro):
+        match = getattr(request, 'resolver_match', None)
+        vista = match.view_name if match else SIN_RESOLVER
+        excesos = registro.excesos()
+        if excesos:
+            _, _, max_repeticiones = presupuesto()
+            repetidas = "".join(
+                f"\n    {veces}× {abreviar(sql)}"
+                for sql, veces in registro.repetidas(max_repeticiones)[:5]
+            )
+            logger.warning(
+                "%s %s [%s] %s: %d consultas, %.1f ms%s",
+                request.method, request.get_full_path(), vista, "; ".join(excesos),
+                registro.consultas, registro.milisegundos, repetidas,
+            )
+        registrar(vista, registro, excesos)
+
+
+class PerfilPythonMiddleware:
+    """
+    Corre bajo ``cProfile`` las peticiones de usuarios staff que lo piden
+    con ``?perfilar=1`` o ``X-Perfilar: 1`` y guarda el perfil (``.prof`` y
+    pilas colapsadas) en ``PERFIL_DIR``; el nombre va en la cabecera
+    ``X-Perfil`` de la respuesta y se listan en ``diagnostico/perfiles/``.
+    Sin la señal la petición pasa directo, igual que si ya hay otra
+    petición perfilándose. Está apagado salvo con ``PERFIL_HABILITADO=True``:
+    si no, el middleware se descarta al arrancar. Va después de
+    ``AuthenticationMiddleware`` (necesita ``request.user``).
+
+    Bajo ASGI se perfila el hilo del event loop: lo que el ORM async corre
+    en su hilo aparece solo como la espera del ``await``.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PERFIL_HABILITADO:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not (perfilador.solicitado(request) and request.user.is_staff):
+            return self.get_response(request)
+        perfilado = self._iniciar()
+        if perfilado is None:
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            self._detener(perfilado)
+        return self._guardar(request, response, perfilado)
+
+    async def __acall__(self, request):
+        if not (perfilador.solicitado(request) and (await request.auser()).is_staff):
+            return await self.get_response(request)
+        perfilado = self._iniciar()
+        if perfilado is None:
+            return await self.get_response(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            self._detener(perfilado)
+        return await sync_to_async(self._guardar)(request, response, perfilado)
+
+    def _iniciar(self):
+        # Un solo perfil a la vez: un segundo ``enable()`` en el mismo hilo (el
+        # event loop bajo ASGI) reemplaza en silencio el gancho del primero
+        if not _perfilando.acquire(blocking=False):
+            return None
+        perfil = cProfile.Profile()
+        perfil.enable()
+        muestreo = perfilador.Muestreo()
+        muestreo.start()
+        return perfil, muestreo, time.perf_counter()
+
+    def _detener(self, perfilado):
+        perfil, muestreo, _ = perfilado
+        try:
+            perfil.disable()
+            muestreo.detener()
+        finally:
+            _perfilando.release()
+
+    def _guardar(self, request, response, perfilado):
+        perfil, muestreo, inicio = perfilado
+        segundos = time.perf_counter() - inicio
+        match = getattr(request, 'resolver_match', None)
+        vista = match.view_name if match else SIN_RESOLVER
+        response['X-Perfil'] = perfilador.guardar(perfil, muestreo, vista, segundos)
+        return response
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def poblar_saldos_diarios(apps, schema_editor):
+    """Genera los snapshots iniciales a partir de las partidas existentes"""
+    PartidaContable = apps.get_model('core', 'PartidaContable')
+    SaldoDiario = apps.get_model('core', 'SaldoDiario')
+
+    filas = (
+        PartidaContable.objects
+        .values('cuenta_id', 'asiento__fecha')
+        .annotate(debitos=Sum('debito'), creditos=Sum('credito'))
+        .order_by('cuenta_id', 'asiento__fecha')
+    )
+    nuevos = []
+    cuenta_actual = None
+    acumulado = 0
+    for fila in filas:
+        if fila['cuenta_id'] != cuenta_actual:
+            cuenta_actual = fila['cuenta_id']
+            acumulado = 0
+        debitos = fila['debitos'] or 0
+        creditos = fila['creditos'] or 0
+        acumulado += debitos - creditos
+        nuevos.append(SaldoDiario(
+            cuenta_id=cuenta_actual,
+            fecha=fila['asiento__fecha'],
+            debitos=debitos,
+            creditos=creditos,
+            saldo_acumulado=acumulado,
+        ))
+    SaldoDiario.objects.bulk_create(nuevos, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0043_add_ajuste_field'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaldoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('debitos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('creditos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('saldo_acumulado', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cuenta', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saldos_diarios', to='core.cuenta')),
+            ],
+            options={
+                'verbose_name': 'saldo diario',
+                'verbose_name_plural': 'saldos diarios',
+                'ordering': ['cuenta', 'fecha'],
+                'unique_together': {('cuenta', 'fecha')},
+            },
+        ),
+        migrations.RunPython(poblar_saldos_diarios, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:58
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F, Q, Sum
+
+
+def poblar_saldos_periodos(apps, schema_editor):
+    """Calcula los saldos de todas las cadenas de periodos, de la raíz hacia adelante"""
+    Periodo = apps.get_model('core', 'Periodo')
+    Transaccion = apps.get_model('core', 'Transaccion')
+    cero = Decimal('0.00')
+
+    totales = {
+        fila['periodo_id']: fila
+        for fila in Transaccion.objects.filter(periodo__isnull=False)
+        .values('periodo_id')
+        .annotate(
+            salidas=Sum('monto', filter=Q(cuenta_origen_id=F('periodo__cuenta_id'))),
+            entradas=Sum('monto', filter=Q(cuenta_destino_id=F('periodo__cuenta_id'))),
+        )
+        .order_by()
+    }
+    por_id = {p.pk: p for p in Periodo.objects.select_related('cuenta')}
+    hijos = defaultdict(list)
+    for periodo in por_id.values():
+        hijos[periodo.periodo_anterior_id].append(periodo)
+
+    pendientes = [p for p in por_id.values() if p.periodo_anterior_id not in por_id]
+    vistos = set()
+    while pendientes:
+        periodo = pendientes.pop(0)
+        if periodo.pk in vistos:
+            continue
+        vistos.add(periodo.pk)
+
+        if periodo.saldo_inicial_manual is not None:
+            inicial = periodo.saldo_inicial_manual
+        elif not periodo.usar_saldo_prev:
+            inicial = cero
+        elif periodo.periodo_anterior_id in por_id:
+            inicial = por_id[periodo.periodo_anterior_id].saldo_final_calc or cero
+        elif periodo.fecha_corte:
+            inicial = Transaccion.objects.filter(
+                Q(cuenta_origen_id=periodo.cuenta_id) | Q(cuenta_destino_id=periodo.cuenta_id),
+                fecha__lt=periodo.fecha_corte,
+            ).aggregate(total=Sum('monto'))['total'] or cero
+        else:
+            inicial = cero
+
+        fila = totales.get(periodo.pk, {})
+        salidas = fila.get('salidas') or cero
+        entradas = fila.get('entradas') or cero
+        if periodo.cuenta.naturaleza == 'ACREEDORA':
+            cargos, abonos = entradas, salidas
+            final = inicial + (abonos - cargos)
+        else:
+            cargos, abonos = salidas, entradas
+            final = inicial + (cargos - abonos)
+        periodo.saldo_inicial_calc = inicial
+        periodo.total_cargos_calc = cargos
+        periodo.total_abonos_calc = abonos
+        periodo.saldo_final_calc = final
+        pendientes.extend(hijos.get(periodo.pk, ()))
+
+    Periodo.objects.bulk_update(
+        [por_id[pk] for pk in vistos],
+        ['saldo_inicial_calc', 'total_cargos_calc', 'total_abonos_calc', 'saldo_final_calc'],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0044_saldodiario'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='periodo',
+            name='saldo_final_calc',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='periodo',
+            name='saldo_inicial_calc',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='periodo',
+            name='total_abonos_calc',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='periodo',
+            name='total_cargos_calc',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=14, null=True),
+        ),
+        migrations.RunPython(poblar_saldos_periodos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0045_periodo_saldos_calc'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='transaccion',
+            name='core_transa_cuenta__f5965e_idx',
+        ),
+        migrations.AddIndex(
+            model_name='transaccion',
+            index=models.Index(fields=['cuenta_origen', 'fecha'], name='core_transa_cuenta__04f542_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaccion',
+            index=models.Index(fields=['cuenta_destino', 'fecha'], name='core_transa_cuenta__f489b0_idx'),
+        ),
+    ]
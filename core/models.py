@@ -1,11 +1,15 @@
 # <!-- file: core/models.py -->
-from django.db import models, transaction
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+from django.db import connections, models, transaction
 from django.utils.translation import gettext_lazy as _
 from decimal import Decimal
 from uuid import uuid4
 from django.conf import settings
 from django.utils import timezone
-from django.db.models import Sum, F, Case, When
+from django.db.models import Sum, F, Case, Count, When, Value, ExpressionWrapper, OuterRef, Subquery, Window
+from django.db.models.functions import Coalesce
 from django.views.generic import View
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.mixins import LoginRequiredMixin
@@ -45,7 +49,60 @@ class TipoCuenta(models.Model):
     def __str__(self):
         return self.nombre  # Return only the name without grupo code
 
-class CuentaManager(models.Manager):
+class CuentaQuerySet(models.QuerySet):
+    def with_saldos(self, as_of_date=None):
+        """
+        Anota el saldo de cada cuenta en una sola consulta agrupada sobre
+        ``PartidaContable``:
+
+        - ``saldo_debitos`` / ``saldo_creditos``: sumas del debe y del haber
+        - ``saldo_actual``: ``saldo_inicial`` ± (débitos − créditos) según la
+          naturaleza de la cuenta (mismo criterio que ``Cuenta.saldo()``)
+        """
+        filtro = Q(partidas_contables__asiento__fecha__lte=as_of_date) if as_of_date else Q()
+        importe = models.DecimalField(max_digits=14, decimal_places=2)
+        cero = Value(Decimal('0.00'), output_field=importe)
+        return self.annotate(
+            saldo_debitos=Coalesce(Sum('partidas_contables__debito', filter=filtro), cero),
+            saldo_creditos=Coalesce(Sum('partidas_contables__credito', filter=filtro), cero),
+        ).annotate(
+            saldo_actual=ExpressionWrapper(
+                F('saldo_inicial') + Case(
+                    When(naturaleza="ACREEDORA", then=F('saldo_creditos') - F('saldo_debitos')),
+                    default=F('saldo_debitos') - F('saldo_creditos'),
+                ),
+                output_field=importe,
+            )
+        )
+
+    def with_saldo_diario(self):
+        """
+        Anota ``saldo_actual`` leyendo el ``SaldoDiario`` más reciente de cada
+        cuenta (una búsqueda por el índice ``(cuenta, fecha)`` por fila, sin
+        agregar partidas). Mismo criterio de naturaleza que ``with_saldos``;
+        conviene para pocas cuentas sueltas (p. ej. resultados de búsqueda).
+        """
+        importe = models.DecimalField(max_digits=14, decimal_places=2)
+        acumulado = Coalesce(
+            Subquery(
+                SaldoDiario.objects.filter(cuenta=OuterRef('pk'))
+                .order_by('-fecha')
+                .values('saldo_acumulado')[:1]
+            ),
+            Value(Decimal('0.00'), output_field=importe),
+        )
+        return self.annotate(
+            saldo_actual=ExpressionWrapper(
+                F('saldo_inicial') + Case(
+                    When(naturaleza="ACREEDORA", then=-acumulado),
+                    default=acumulado,
+                ),
+                output_field=importe,
+            )
+        )
+
+
+class CuentaManager(models.Manager.from_queryset(CuentaQuerySet)):
     def medios_pago(self):
         return self.filter(tipo__grupo__in=["DEB", "CRE", "EFE"])
 
@@ -118,7 +175,16 @@ class Cuenta(models.Model):
     def saldo(self, as_of_date=None):
         """
         Calcula el saldo usando las partidas contables (doble partida).
-        Más preciso que el método anterior basado en transacciones unificadas.
+        Lee el snapshot diario (``SaldoDiario``) más reciente ≤ ``as_of_date``
+        en lugar de sumar todas las partidas de la cuenta.
+        """
+        from .services.saldos import saldo_acumulado
+        return self._saldo_con_naturaleza(saldo_acumulado(self.pk, as_of_date))
+
+    def saldo_partidas(self, as_of_date=None):
+        """
+        Saldo calculado directamente sobre todas las partidas (sin snapshots).
+        Se conserva como referencia para verificar la tabla ``SaldoDiario``.
         """
         qs = self.partidas_contables.all()
         if as_of_date:
@@ -135,6 +201,9 @@ class Cuenta(models.Model):
             )
         )['balance'] or Decimal('0.00')
         
+        return self._saldo_con_naturaleza(balance)
+
+    def _saldo_con_naturaleza(self, balance):
         # Para cuentas deudoras: débitos positivos, créditos negativos
         # Para cuentas acreedoras: invertir el signo 
         if self.naturaleza == "ACREEDORA":
@@ -265,6 +334,183 @@ class TransaccionEstado(models.TextChoices):
     VERIFICADA = 'verified', _('Verificada')
 
 
+def q_movimientos(cuenta, desde=None, hasta=None, antes_de=None):
+    """
+    Movimientos de ``cuenta`` (como origen o destino) con el rango de fechas
+    repetido dentro de cada rama del OR. Así cada rama es un rango sobre su
+    índice compuesto ``(cuenta_origen, fecha)`` / ``(cuenta_destino, fecha)``
+    y el planificador puede unir ambos rangos en vez de recorrer la tabla.
+
+    ``desde`` / ``hasta`` son inclusivos; ``antes_de`` es exclusivo.
+    """
+    rango = {}
+    if desde:
+        rango['fecha__gte'] = desde
+    if hasta:
+        rango['fecha__lte'] = hasta
+    if antes_de:
+        rango['fecha__lt'] = antes_de
+    return Q(cuenta_origen=cuenta, **rango) | Q(cuenta_destino=cuenta, **rango)
+
+
+def importe_en_cuenta(cuenta, naturaleza=None):
+    """
+    Expresión con el efecto de cada movimiento en el saldo de ``cuenta``,
+    con el mismo criterio que ``Cuenta.saldo()``: lo que entra (destino) es
+    débito y lo que sale (origen) crédito; un ajuste es débito si es GASTO y
+    crédito si no, y solo afecta a su cuenta ajustada (destino, o el origen
+    si no hay destino). Para naturaleza ACREEDORA se invierte el signo.
+    """
+    cuenta_id = getattr(cuenta, 'pk', cuenta)
+    naturaleza = naturaleza or cuenta.naturaleza
+    importe = models.DecimalField(max_digits=14, decimal_places=2)
+    debito = Case(
+        When(Q(ajuste=True, cuenta_destino__isnull=False) & ~Q(cuenta_destino_id=cuenta_id),
+             then=Value(Decimal('0.00'))),
+        When(ajuste=True, tipo=TransaccionTipo.GASTO, then=F('monto')),
+        When(ajuste=True, then=-F('monto')),
+        When(cuenta_destino_id=cuenta_id, then=F('monto')),
+        default=-F('monto'),
+        output_field=importe,
+    )
+    return -debito if naturaleza == "ACREEDORA" else debito
+
+
+class TransaccionQuerySet(models.QuerySet):
+    def de_cuenta(self, cuenta, desde=None, hasta=None, antes_de=None):
+        """Transacciones donde ``cuenta`` es origen o destino (ver ``q_movimientos``)."""
+        return self.filter(q_movimientos(cuenta, desde, hasta, antes_de))
+
+    def fuera_de_cuenta(self, cuenta, desde=None, hasta=None, antes_de=None):
+        """Complemento de ``de_cuenta``: lo que no es movimiento de la cuenta en el rango."""
+        return self.exclude(q_movimientos(cuenta, desde, hasta, antes_de))
+
+    def con_saldo_corrido(self, cuenta, saldo_base=Decimal('0.00'), naturaleza=None):
+        """
+        Anota ``importe_cuenta`` (ver ``importe_en_cuenta``) y
+        ``saldo_corrido = saldo_base + SUM(importe_cuenta) OVER (ORDER BY
+        fecha, id)`` sobre las filas de este queryset. ``saldo_base`` es el
+        saldo justo antes de la primera de ellas.
+        """
+        importe = models.DecimalField(max_digits=14, decimal_places=2)
+        return self.annotate(
+            importe_cuenta=importe_en_cuenta(cuenta, naturaleza),
+        ).annotate(
+            saldo_corrido=ExpressionWrapper(
+                Value(saldo_base, output_field=importe)
+                + Window(Sum('importe_cuenta'), order_by=[F('fecha').asc(), F('id').asc()]),
+                output_field=importe,
+            ),
+        )
+
+
+class TransaccionManager(models.Manager.from_queryset(TransaccionQuerySet)):
+    def validar_lote(self, transacciones):
+        """
+        Prepara y valida en memoria un lote de transacciones (instancias o
+        diccionarios de campos). Carga cuentas y categorías en bloque para que
+        la inferencia de tipo no haga una consulta por fila.
+
+        Devuelve ``(validas, errores)`` donde ``errores`` es una lista de
+        ``(transaccion, ValidationError)``.
+        """
+        transacciones = [
+            t if isinstance(t, Transaccion) else Transaccion(**t)
+            for t in transacciones
+        ]
+
+        cuenta_ids = {
+            cid for t in transacciones
+            for cid in (t.cuenta_origen_id, t.cuenta_destino_id) if cid
+        }
+        categoria_ids = {t.categoria_id for t in transacciones if t.categoria_id}
+        cuentas = Cuenta.objects.select_related('tipo').in_bulk(cuenta_ids)
+        categorias = Categoria.objects.in_bulk(categoria_ids)
+
+        validas, errores = [], []
+        for t in transacciones:
+            if t.cuenta_origen_id:
+                t.cuenta_origen = cuentas[t.cuenta_origen_id]
+            if t.cuenta_destino_id:
+                t.cuenta_destino = cuentas[t.cuenta_destino_id]
+            if t.categoria_id:
+                t.categoria = categorias[t.categoria_id]
+            try:
+                t.validar_para_asiento()
+            except ValidationError as e:
+                errores.append((t, e))
+            else:
+                validas.append(t)
+        return validas, errores
+
+    def bulk_create_con_asientos(self, transacciones, batch_size=500):
+        """
+        Inserta transacciones junto con sus asientos y partidas usando
+        ``bulk_create`` por lotes, dentro de una sola transacción atómica.
+
+        Equivale a llamar ``save()`` en cada una, pero sin ``full_clean`` ni
+        ``get_or_create`` por fila. Si alguna transacción es inválida no se
+        inserta ninguna.
+        """
+        from .services.estadisticas import invalidar_transacciones
+        from .services.periodos import recalcular_periodos
+        from .services.saldos import aplicar_movimientos
+
+        validas, errores = self.validar_lote(transacciones)
+        if errores:
+            raise ValidationError([
+                f"{t.fecha} {t.descripcion[:40]}: {'; '.join(e.messages)}"
+                for t, e in errores
+            ])
+
+        cuentas_categoria = {}
+        movimientos = []
+        # El balance de todos los asientos se comprueba una vez al cerrar el lote
+        with lote_contable(using=self.db):
+            for inicio in range(0, len(validas), batch_size):
+                lote = validas[inicio:inicio + batch_size]
+                _bulk_insertar(Transaccion, lote, self.db)
+
+                asientos = [
+                    AsientoContable(
+                        fecha=t.fecha,
+                        descripcion=t._descripcion_asiento(),
+                        transaccion_origen=t,
+                        estado=t.estado,
+                    )
+                    for t in lote
+                ]
+                _bulk_insertar(AsientoContable, asientos, self.db)
+
+                partidas = [
+                    partida
+                    for t, asiento in zip(lote, asientos)
+                    for partida in t._construir_partidas(asiento, cuentas_categoria)
+                ]
+                PartidaContable.objects.using(self.db).bulk_create(partidas)
+                _registrar_en_lote(*(a.pk for a in asientos))
+                movimientos.extend(
+                    (p.cuenta_id, p.asiento.fecha, p.debito, p.credito) for p in partidas
+                )
+
+            # bulk_create no dispara señales: actualizar snapshots en bloque
+            aplicar_movimientos(movimientos)
+            recalcular_periodos({t.periodo_id for t in validas})
+            invalidar_transacciones()
+
+        return validas
+
+
+def _bulk_insertar(modelo, objetos, using):
+    """bulk_create con PKs de vuelta; en backends sin RETURNING guarda uno a uno."""
+    if connections[using].features.can_return_rows_from_bulk_insert:
+        return modelo._default_manager.using(using).bulk_create(objetos)
+    for obj in objetos:
+        # models.Model.save evita el save() personalizado (tipo/asiento/full_clean)
+        models.Model.save(obj, using=using)
+    return objetos
+
+
 class Transaccion(models.Model):
     """Modelo simplificado v0.6.0 - Un registro por transacción"""
     monto = models.DecimalField(
@@ -384,11 +630,15 @@ class Transaccion(models.Model):
         help_text="Saldo reportado por BBVA después de esta transacción"
     )
 
+    objects = TransaccionManager()
+
     class Meta:
         indexes = [
             models.Index(fields=["fecha"]),
             models.Index(fields=["categoria"]),
-            models.Index(fields=["cuenta_origen"]),
+            # Movimientos de una cuenta por rango de fechas (ver q_movimientos)
+            models.Index(fields=["cuenta_origen", "fecha"]),
+            models.Index(fields=["cuenta_destino", "fecha"]),
             models.Index(fields=["tipo"]),
             models.Index(fields=["estado"]),
         ]
@@ -405,9 +655,8 @@ class Transaccion(models.Model):
         if self.cuenta_origen == self.cuenta_destino:
             raise models.ValidationError("Las cuentas origen y destino deben ser diferentes")
 
-    def save(self, *args, **kwargs):
-        """Inferir tipo y generar asientos contables automáticamente"""
-        # Inferir tipo automáticamente basado en el tipo de cuenta_origen
+    def _inferir_tipo(self):
+        """Inferir tipo automáticamente basado en el tipo de cuenta_origen"""
         if self.cuenta_origen and self.cuenta_origen.tipo.codigo == 'ING':
             # Si viene de una cuenta de ingresos, es un INGRESO
             self.tipo = TransaccionTipo.INGRESO
@@ -428,6 +677,10 @@ class Transaccion(models.Model):
                 self.tipo = TransaccionTipo.GASTO
             else:
                 self.tipo = TransaccionTipo.INGRESO
+
+    def save(self, *args, **kwargs):
+        """Inferir tipo y generar asientos contables automáticamente"""
+        self._inferir_tipo()
         
         # Asegurar monto positivo
         self.monto = abs(self.monto)
@@ -440,97 +693,141 @@ class Transaccion(models.Model):
         if is_new:
             self._crear_asiento_contable()
 
+    def validar_para_asiento(self):
+        """
+        Validación en memoria (sin consultas) usada por la carga masiva:
+        infiere el tipo y comprueba que existan las cuentas/categoría que
+        requieren sus partidas.
+        """
+        self._inferir_tipo()
+        self.monto = abs(self.monto)
+        self.clean_fields(exclude=[
+            'cuenta_origen', 'cuenta_destino', 'categoria', 'periodo', 'importacion_bbva'
+        ])
+
+        if not self.monto:
+            raise ValidationError("El monto debe ser mayor a cero")
+        if self.ajuste:
+            if not (self.cuenta_destino_id or self.cuenta_origen_id):
+                raise ValidationError("Para ajustes debe especificar cuenta_destino o cuenta_origen")
+        elif self.tipo == TransaccionTipo.TRANSFERENCIA:
+            if not (self.cuenta_origen_id and self.cuenta_destino_id):
+                raise ValidationError("Una transferencia requiere cuenta_origen y cuenta_destino")
+        elif self.tipo == TransaccionTipo.GASTO:
+            if not (self.cuenta_origen_id and self.categoria_id):
+                raise ValidationError("Un gasto requiere cuenta_origen y categoría")
+        elif self.tipo == TransaccionTipo.INGRESO:
+            if not (self.cuenta_destino_id and self.categoria_id):
+                raise ValidationError("Un ingreso requiere cuenta_destino y categoría")
+
+    def _descripcion_asiento(self):
+        return self.descripcion + (" - AJUSTE" if self.ajuste else "")
+
     def _crear_asiento_contable(self):
         """Crea automáticamente el asiento contable de doble partida o ajuste simple"""
-        with transaction.atomic():
+        # Partidas cuadradas por construcción: validar el balance una sola vez
+        with lote_contable():
             # Crear el asiento principal
             asiento = AsientoContable.objects.create(
                 fecha=self.fecha,
-                descripcion=self.descripcion + (" - AJUSTE" if self.ajuste else ""),
+                descripcion=self._descripcion_asiento(),
                 transaccion_origen=self,
                 estado=self.estado
             )
             
-            if self.ajuste:
-                # AJUSTE: Crear solo 1 partida sin contrapartida
-                self._crear_partida_ajuste(asiento)
-            else:
-                # DOBLE PARTIDA NORMAL
-                if self.tipo == TransaccionTipo.TRANSFERENCIA:
-                    self._crear_partidas_transferencia(asiento)
-                elif self.tipo == TransaccionTipo.GASTO:
-                    self._crear_partidas_gasto(asiento)
-                elif self.tipo == TransaccionTipo.INGRESO:
-                    self._crear_partidas_ingreso(asiento)
-
-    def _crear_partidas_transferencia(self, asiento):
-        """Crear partidas para transferencia entre cuentas"""
-        # Debitar cuenta destino (dinero que entra)
-        PartidaContable.objects.create(
-            asiento=asiento,
-            cuenta=self.cuenta_destino,
-            debito=self.monto,
-            descripcion=f"Transferencia de {self.cuenta_origen.nombre}",
-            transaccion_referencia=self
-        )
-        
-        # Acreditar cuenta origen (dinero que sale)
-        PartidaContable.objects.create(
-            asiento=asiento,
-            cuenta=self.cuenta_origen,
-            credito=self.monto,
-            descripcion=f"Transferencia a {self.cuenta_destino.nombre}",
-            transaccion_referencia=self
-        )
+            for partida in self._construir_partidas(asiento):
+                partida.save()
+
+    def _construir_partidas(self, asiento, cuentas_categoria=None):
+        """
+        Devuelve (sin guardar) las partidas del asiento según el tipo.
+        ``cuentas_categoria`` permite reutilizar las cuentas de gastos/ingresos
+        ya resueltas durante una carga masiva.
+        """
+        if self.ajuste:
+            # AJUSTE: Crear solo 1 partida sin contrapartida
+            return [self._partida_ajuste(asiento)]
+
+        # DOBLE PARTIDA NORMAL
+        if self.tipo == TransaccionTipo.TRANSFERENCIA:
+            return self._partidas_transferencia(asiento)
+        elif self.tipo == TransaccionTipo.GASTO:
+            return self._partidas_gasto(asiento, cuentas_categoria)
+        elif self.tipo == TransaccionTipo.INGRESO:
+            return self._partidas_ingreso(asiento, cuentas_categoria)
+        return []
+
+    def _partidas_transferencia(self, asiento):
+        """Partidas para transferencia entre cuentas"""
+        return [
+            # Debitar cuenta destino (dinero que entra)
+            PartidaContable(
+                asiento=asiento,
+                cuenta=self.cuenta_destino,
+                debito=self.monto,
+                descripcion=f"Transferencia de {self.cuenta_origen.nombre}",
+                transaccion_referencia=self
+            ),
+            # Acreditar cuenta origen (dinero que sale)
+            PartidaContable(
+                asiento=asiento,
+                cuenta=self.cuenta_origen,
+                credito=self.monto,
+                descripcion=f"Transferencia a {self.cuenta_destino.nombre}",
+                transaccion_referencia=self
+            ),
+        ]
 
-    def _crear_partidas_gasto(self, asiento):
-        """Crear partidas para gasto"""
+    def _partidas_gasto(self, asiento, cuentas_categoria=None):
+        """Partidas para gasto"""
         # Necesitamos una cuenta de gastos - crear si no existe
-        cuenta_gastos = self._obtener_cuenta_gastos()
-        
-        # Debitar cuenta de gastos (aumenta el gasto)
-        PartidaContable.objects.create(
-            asiento=asiento,
-            cuenta=cuenta_gastos,
-            debito=self.monto,
-            descripcion=f"Gasto: {self.categoria.nombre}",
-            transaccion_referencia=self
-        )
+        cuenta_gastos = self._cuenta_categoria("GAST", self._obtener_cuenta_gastos, cuentas_categoria)
         
-        # Acreditar cuenta origen (dinero que sale)
-        PartidaContable.objects.create(
-            asiento=asiento,
-            cuenta=self.cuenta_origen,
-            credito=self.monto,
-            descripcion=f"Pago: {self.descripcion}",
-            transaccion_referencia=self
-        )
+        return [
+            # Debitar cuenta de gastos (aumenta el gasto)
+            PartidaContable(
+                asiento=asiento,
+                cuenta=cuenta_gastos,
+                debito=self.monto,
+                descripcion=f"Gasto: {self.categoria.nombre}",
+                transaccion_referencia=self
+            ),
+            # Acreditar cuenta origen (dinero que sale)
+            PartidaContable(
+                asiento=asiento,
+                cuenta=self.cuenta_origen,
+                credito=self.monto,
+                descripcion=f"Pago: {self.descripcion}",
+                transaccion_referencia=self
+            ),
+        ]
 
-    def _crear_partidas_ingreso(self, asiento):
-        """Crear partidas para ingreso"""
+    def _partidas_ingreso(self, asiento, cuentas_categoria=None):
+        """Partidas para ingreso"""
         # Necesitamos una cuenta de ingresos - crear si no existe
-        cuenta_ingresos = self._obtener_cuenta_ingresos()
+        cuenta_ingresos = self._cuenta_categoria("ING", self._obtener_cuenta_ingresos, cuentas_categoria)
         
-        # Debitar cuenta destino (dinero que entra)  
-        PartidaContable.objects.create(
-            asiento=asiento,
-            cuenta=self.cuenta_destino,
-            debito=self.monto,
-            descripcion=f"Ingreso: {self.categoria.nombre}",
-            transaccion_referencia=self
-        )
-        
-        # Acreditar cuenta de ingresos (aumenta el ingreso)
-        PartidaContable.objects.create(
-            asiento=asiento,
-            cuenta=cuenta_ingresos,
-            credito=self.monto,
-            descripcion=f"Ingreso: {self.descripcion}",
-            transaccion_referencia=self
-        )
+        return [
+            # Debitar cuenta destino (dinero que entra)  
+            PartidaContable(
+                asiento=asiento,
+                cuenta=self.cuenta_destino,
+                debito=self.monto,
+                descripcion=f"Ingreso: {self.categoria.nombre}",
+                transaccion_referencia=self
+            ),
+            # Acreditar cuenta de ingresos (aumenta el ingreso)
+            PartidaContable(
+                asiento=asiento,
+                cuenta=cuenta_ingresos,
+                credito=self.monto,
+                descripcion=f"Ingreso: {self.descripcion}",
+                transaccion_referencia=self
+            ),
+        ]
 
-    def _crear_partida_ajuste(self, asiento):
-        """Crear una sola partida para ajustes (sin contrapartida)"""
+    def _partida_ajuste(self, asiento):
+        """Una sola partida para ajustes (sin contrapartida)"""
         # Para ajustes, usar la cuenta_destino como la cuenta a ajustar
         cuenta_ajuste = self.cuenta_destino or self.cuenta_origen
         
@@ -539,70 +836,37 @@ class Transaccion(models.Model):
         
         # Determinar si es débito o crédito según la naturaleza de la cuenta
         # y si el tipo de transacción es GASTO (débito) o INGRESO (crédito)
+        partida = PartidaContable(
+            asiento=asiento,
+            cuenta=cuenta_ajuste,
+            descripcion=f"Ajuste: {self.descripcion}",
+            transaccion_referencia=self
+        )
         if self.tipo == TransaccionTipo.GASTO:
             # Ajuste de gasto - siempre débito
-            PartidaContable.objects.create(
-                asiento=asiento,
-                cuenta=cuenta_ajuste,
-                debito=self.monto,
-                descripcion=f"Ajuste: {self.descripcion}",
-                transaccion_referencia=self
-            )
+            partida.debito = self.monto
         else:
             # Ajuste de ingreso - siempre crédito
-            PartidaContable.objects.create(
-                asiento=asiento,
-                cuenta=cuenta_ajuste,
-                credito=self.monto,
-                descripcion=f"Ajuste: {self.descripcion}",
-                transaccion_referencia=self
-            )
+            partida.credito = self.monto
+        return partida
+
+    def _cuenta_categoria(self, codigo, obtener, cuentas_categoria=None):
+        if cuentas_categoria is None:
+            return obtener()
+        clave = (codigo, self.categoria_id, self.moneda)
+        if clave not in cuentas_categoria:
+            cuentas_categoria[clave] = obtener()
+        return cuentas_categoria[clave]
 
     def _obtener_cuenta_gastos(self):
-        """Obtiene o crea cuenta de gastos para la categoría"""
-        # Buscar tipo de cuenta de gastos
-        tipo_gastos, _ = TipoCuenta.objects.get_or_create(
-            codigo="GAST",
-            defaults={
-                'nombre': 'Gastos',
-                'grupo': 'SER'
-            }
-        )
-        
-        # Buscar o crear cuenta específica para esta categoría
-        nombre_cuenta = f"Gastos - {self.categoria.nombre}"
-        cuenta_gastos, _ = Cuenta.objects.get_or_create(
-            nombre=nombre_cuenta,
-            defaults={
-                'tipo': tipo_gastos,
-                'naturaleza': 'DEUDORA',  # Los gastos son deudores
-                'moneda': self.moneda
-            }
-        )
-        return cuenta_gastos
+        """Obtiene o crea cuenta de gastos para la categoría (memoizada por proceso)"""
+        from .services.cuentas_categoria import resolver_cuenta_categoria
+        return resolver_cuenta_categoria("GAST", self.categoria, self.moneda)
 
     def _obtener_cuenta_ingresos(self):
-        """Obtiene o crea cuenta de ingresos para la categoría"""
-        # Buscar tipo de cuenta de ingresos  
-        tipo_ingresos, _ = TipoCuenta.objects.get_or_create(
-            codigo="ING",
-            defaults={
-                'nombre': 'Ingresos',
-                'grupo': 'ING'
-            }
-        )
-        
-        # Buscar o crear cuenta específica para esta categoría
-        nombre_cuenta = f"Ingresos - {self.categoria.nombre}"
-        cuenta_ingresos, _ = Cuenta.objects.get_or_create(
-            nombre=nombre_cuenta,
-            defaults={
-                'tipo': tipo_ingresos,
-                'naturaleza': 'ACREEDORA',  # Los ingresos son acreedores
-                'moneda': self.moneda
-            }
-        )
-        return cuenta_ingresos
+        """Obtiene o crea cuenta de ingresos para la categoría (memoizada por proceso)"""
+        from .services.cuentas_categoria import resolver_cuenta_categoria
+        return resolver_cuenta_categoria("ING", self.categoria, self.moneda)
 
     def __str__(self):
         if self.tipo == TransaccionTipo.TRANSFERENCIA:
@@ -797,6 +1061,38 @@ def generar_movs_recibo(
 
 
 # --- MODELO ÚNICO FLEXIBLE PARA PERÍODOS ------------------------------
+class PeriodoQuerySet(models.QuerySet):
+    def with_totales(self):
+        """
+        Anota ``cargos_periodo`` / ``abonos_periodo`` de muchos periodos con
+        un solo agregado condicional sobre sus transacciones. Para cuentas
+        ACREEDORA (tarjetas) los cargos son lo que entra a la cuenta y los
+        abonos lo que sale; para DEUDORA, al revés (mismo criterio que
+        ``Periodo.total_cargos`` / ``total_abonos``).
+        """
+        importe = models.DecimalField(max_digits=14, decimal_places=2)
+        cero = Value(Decimal('0.00'), output_field=importe)
+        return self.annotate(
+            periodo_salidas=Coalesce(
+                Sum('transacciones__monto', filter=Q(transacciones__cuenta_origen_id=F('cuenta_id'))), cero
+            ),
+            periodo_entradas=Coalesce(
+                Sum('transacciones__monto', filter=Q(transacciones__cuenta_destino_id=F('cuenta_id'))), cero
+            ),
+        ).annotate(
+            cargos_periodo=Case(
+                When(cuenta__naturaleza="ACREEDORA", then=F('periodo_entradas')),
+                default=F('periodo_salidas'),
+                output_field=importe,
+            ),
+            abonos_periodo=Case(
+                When(cuenta__naturaleza="ACREEDORA", then=F('periodo_salidas')),
+                default=F('periodo_entradas'),
+                output_field=importe,
+            ),
+        )
+
+
 class Periodo(models.Model):
     TIPO_CHOICES = (
         ('TDC',  'Tarjeta de Crédito'),
@@ -892,77 +1188,51 @@ class Periodo(models.Model):
         related_name='periodo_siguiente'
     )
 
+    # Saldos persistidos (ver core/services/periodos.py): se recalculan hacia
+    # adelante al cambiar un periodo abierto y quedan congelados al cerrarlo
+    saldo_inicial_calc = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True, editable=False)
+    total_cargos_calc = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True, editable=False)
+    total_abonos_calc = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True, editable=False)
+    saldo_final_calc = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True, editable=False)
+
+    objects = PeriodoQuerySet.as_manager()
+
     class Meta:
         ordering = ["-fecha_corte"]
 
     def __str__(self):
         return f"{self.cuenta} {self.fecha_corte:%b %Y}"
 
-    # --- Propiedades dinámicas -----------------------------------------
+    # --- Propiedades (leen los saldos persistidos) ----------------------
+    def _calc(self, campo):
+        # Sin valor persistido (periodo nuevo) → calcular una vez en memoria;
+        # el cálculo llena los cuatro campos y las demás propiedades lo reutilizan
+        if getattr(self, campo) is None:
+            from .services.periodos import calcular_periodo
+            calcular_periodo(self)
+        return getattr(self, campo)
+
     @property
     def total_cargos(self):
-        # v0.6.0: Actualizar para usar cuenta_origen y cuenta_destino
-        if self.cuenta.naturaleza == "ACREEDORA":
-            # Para tarjetas (pasivo): cargos = pagos hacia esta cuenta (disminuye deuda)
-            base_pagos = self.transacciones.filter(cuenta_destino=self.cuenta)
-            return base_pagos.aggregate(Sum("monto"))["monto__sum"] or 0
-        else:
-            # Para cuentas deudoras (activo): cargos = dinero que sale de esta cuenta
-            base_salidas = self.transacciones.filter(cuenta_origen=self.cuenta)
-            return base_salidas.aggregate(Sum("monto"))["monto__sum"] or 0
+        return self._calc('total_cargos_calc')
 
     @property
     def total_abonos(self):
-        # v0.6.0: Actualizar para usar cuenta_origen y cuenta_destino
-        if self.cuenta.naturaleza == "ACREEDORA":
-            # Para tarjetas: abonos = dinero que sale de esta cuenta (aumenta deuda)
-            base_compras = self.transacciones.filter(cuenta_origen=self.cuenta)
-            return base_compras.aggregate(Sum("monto"))["monto__sum"] or 0
-        else:
-            # Para cuentas deudoras: abonos = dinero que entra a esta cuenta
-            base_entradas = self.transacciones.filter(cuenta_destino=self.cuenta)
-            return base_entradas.aggregate(Sum("monto"))["monto__sum"] or 0
+        return self._calc('total_abonos_calc')
 
     @property
     def saldo(self):
-        # El saldo final debe ser: saldo_inicial + (total_abonos - total_cargos) para acreedoras
-        # o saldo_inicial + (total_cargos - total_abonos) para deudoras
-        if self.cuenta.naturaleza == "ACREEDORA":
-            return self.saldo_inicial + (self.total_abonos - self.total_cargos)
-        else:
-            return self.saldo_inicial + (self.total_cargos - self.total_abonos)
-
+        return self.saldo_final
 
     @property
     def saldo_inicial(self):
         """Devuelve el saldo inicial del periodo."""
-        # 1) Valor manual prevalece
-        if self.saldo_inicial_manual is not None:
-            return self.saldo_inicial_manual
-
-        # 2) Si se decidió no usar saldo previo → 0
-        if not self.usar_saldo_prev:
-            return 0
-
-        # 3) Tomar saldo final del periodo anterior, si existe
-        if self.periodo_anterior_id:
-            return self.periodo_anterior.saldo_final
-
-        # 4) Primer periodo → calcula histórico v0.6.0
-        from django.db.models import Q
-        return (
-            Transaccion.objects
-            .filter(Q(cuenta_origen=self.cuenta) | Q(cuenta_destino=self.cuenta), fecha__lt=self.fecha_corte)
-            .aggregate(total=Sum("monto"))["total"] or 0
-        )
+        return self._calc('saldo_inicial_calc')
 
     @property
     def saldo_final(self):
         """Saldo al cierre del periodo."""
-        if self.cuenta.naturaleza == "ACREEDORA":
-            return self.saldo_inicial + (self.total_abonos - self.total_cargos)
-        else:
-            return self.saldo_inicial + (self.total_cargos - self.total_abonos)
+        return self._calc('saldo_final_calc')
 
     def save(self, *args, **kwargs):
         # Fecha_inicio siempre = fecha_corte
@@ -972,6 +1242,81 @@ class Periodo(models.Model):
 
 # === MODELOS DE DOBLE PARTIDA (CAPA SUBYACENTE) ======================
 
+# Asientos tocados dentro del ``lote_contable()`` activo (None = sin lote)
+_lote_contable = ContextVar("lote_contable", default=None)
+
+
+@contextmanager
+def lote_contable(using=None):
+    """
+    Modo de validación diferida para registrar muchos asientos.
+
+    Dentro del bloque ``AsientoContable.save()`` y ``PartidaContable.save()``
+    omiten ``full_clean()`` (consultas de existencia de FKs y unicidad por
+    fila); al salir se valida una sola vez el balance de todos los asientos
+    tocados. Si alguno no cuadra se lanza ``ValidationError`` y el lote
+    completo se revierte. Los bloques anidados se unen al lote externo.
+    """
+    if _lote_contable.get() is not None:
+        yield _lote_contable.get()
+        return
+
+    asientos = set()
+    token = _lote_contable.set(asientos)
+    try:
+        with transaction.atomic(using=using):
+            yield asientos
+            _validar_lote_contable(asientos, using)
+    finally:
+        _lote_contable.reset(token)
+
+
+def _registrar_en_lote(*asiento_ids):
+    asientos = _lote_contable.get()
+    if asientos is not None:
+        asientos.update(asiento_ids)
+    return asientos is not None
+
+
+def _validar_lote_contable(asiento_ids, using=None, tamano=500):
+    """Asientos descuadrados o con partidas inválidas (una consulta por cada 500 ids)."""
+    importe = models.DecimalField(max_digits=14, decimal_places=2)
+    cero = Value(Decimal('0.00'), output_field=importe)
+    invalida = (
+        Q(partidas__debito__gt=0, partidas__credito__gt=0)
+        | Q(partidas__debito__lt=0) | Q(partidas__credito__lt=0)
+        | (Q(partidas__debito__isnull=True) | Q(partidas__debito=0))
+        & (Q(partidas__credito__isnull=True) | Q(partidas__credito=0))
+    )
+    ids = sorted(asiento_ids)
+    malos = []
+    for inicio in range(0, len(ids), tamano):
+        malos += (
+            AsientoContable.objects.db_manager(using)
+            .filter(pk__in=ids[inicio:inicio + tamano])
+            .annotate(
+                debitos=Coalesce(Sum('partidas__debito'), cero),
+                creditos=Coalesce(Sum('partidas__credito'), cero),
+                invalidas=Count('partidas', filter=invalida),
+            )
+            .filter(
+                Q(invalidas__gt=0)
+                # Los ajustes llevan una sola partida sin contrapartida
+                | ~Q(transaccion_origen__ajuste=True) & (
+                    Q(debitos__gt=F('creditos') + Decimal('0.005'))
+                    | Q(debitos__lt=F('creditos') - Decimal('0.005'))
+                )
+            )
+            .values_list('pk', 'debitos', 'creditos', 'invalidas')
+        )
+    if malos:
+        raise ValidationError([
+            f"Asiento {pk}: Débitos={debitos}, Créditos={creditos}"
+            + (f", {invalidas} partidas inválidas" if invalidas else "")
+            for pk, debitos, creditos, invalidas in malos[:20]
+        ])
+
+
 class AsientoContable(models.Model):
     """
     Asiento contable que agrupa las partidas de doble entrada.
@@ -1029,8 +1374,12 @@ class AsientoContable(models.Model):
                 )
 
     def save(self, *args, **kwargs):
-        self.full_clean()
+        en_lote = _lote_contable.get() is not None
+        if not en_lote:
+            self.full_clean()
         super().save(*args, **kwargs)
+        if en_lote:
+            _registrar_en_lote(self.pk)
 
     def __str__(self):
         return f"Asiento {self.fecha}: {self.descripcion[:50]}"
@@ -1113,7 +1462,11 @@ class PartidaContable(models.Model):
             raise ValidationError("El crédito debe ser mayor a cero")
 
     def save(self, *args, **kwargs):
-        self.full_clean()
+        if _registrar_en_lote(self.asiento_id):
+            # Reglas de la fila sin consultas; el balance se valida al cerrar el lote
+            self.clean()
+        else:
+            self.full_clean()
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -1132,6 +1485,32 @@ class PartidaContable(models.Model):
         return self.debito if self.debito else self.credito
 
 
+class SaldoDiario(models.Model):
+    """
+    Snapshot diario del saldo de una cuenta.
+    Se actualiza con señales de ``PartidaContable``; ``saldo_acumulado`` es
+    Σ(débito − crédito) hasta ``fecha`` inclusive, sin aplicar naturaleza.
+    """
+    cuenta = models.ForeignKey(
+        'Cuenta',
+        on_delete=models.CASCADE,
+        related_name='saldos_diarios'
+    )
+    fecha = models.DateField()
+    debitos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    creditos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    saldo_acumulado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('cuenta', 'fecha')
+        ordering = ['cuenta', 'fecha']
+        verbose_name = "saldo diario"
+        verbose_name_plural = "saldos diarios"
+
+    def __str__(self):
+        return f"{self.cuenta_id} {self.fecha}: {self.saldo_acumulado}"
+
+
 # === MODELOS PARA CONCILIACIÓN AUTOMÁTICA =============================
 
 class ImportacionBancaria(models.Model):
@@ -1211,75 +1590,59 @@ class MovimientoBancario(models.Model):
         signo = "+" if self.monto >= 0 else ""
         return f"{self.fecha}: {signo}${self.monto} - {self.descripcion[:50]}"
     
-    def buscar_coincidencias(self):
-        """Busca transacciones internas que coincidan con este movimiento bancario"""
-        cuenta = self.importacion.cuenta
-        
-        # Criterios de búsqueda con diferentes niveles de confianza
-        candidatos = []
-        
+    def _niveles_coincidencia(self):
+        """
+        ``(confianza, score, criterios, queryset)`` de cada nivel de búsqueda,
+        del más estricto al más laxo; se usa el primero que tenga resultados.
+        """
+        cuenta_id = self.importacion.cuenta_id
+        monto = abs(self.monto)
+        pendientes = Transaccion.objects.filter(
+            cuenta_origen_id=cuenta_id,
+            estado=TransaccionEstado.PENDIENTE,
+        ).select_related('categoria')
+
         # 1. Coincidencia EXACTA: fecha, monto y cuenta
-        exactas = Transaccion.objects.filter(
-            fecha=self.fecha,
-            monto=abs(self.monto),
-            cuenta_origen=cuenta,
-            estado=TransaccionEstado.PENDIENTE
-        )
-        
-        for t in exactas:
-            candidatos.append({
-                'transaccion': t,
-                'confianza': 'EXACTA',
-                'score': 99,
-                'criterios': ['fecha_exacta', 'monto_exacto', 'cuenta_correcta']
-            })
-        
+        yield ('EXACTA', 99, ['fecha_exacta', 'monto_exacto', 'cuenta_correcta'],
+               pendientes.filter(fecha=self.fecha, monto=monto))
+
         # 2. Coincidencia ALTA: ±1 día, monto exacto
-        if not candidatos:
-            rango_fechas = Transaccion.objects.filter(
-                fecha__range=[
-                    self.fecha - timedelta(days=1),
-                    self.fecha + timedelta(days=1)
-                ],
-                monto=abs(self.monto),
-                cuenta_origen=cuenta,
-                estado=TransaccionEstado.PENDIENTE
-            )
-            
-            for t in rango_fechas:
-                candidatos.append({
-                    'transaccion': t,
-                    'confianza': 'ALTA',
-                    'score': 95,
-                    'criterios': ['fecha_cercana', 'monto_exacto', 'cuenta_correcta']
-                })
-        
+        yield ('ALTA', 95, ['fecha_cercana', 'monto_exacto', 'cuenta_correcta'],
+               pendientes.filter(
+                   fecha__range=[self.fecha - timedelta(days=1), self.fecha + timedelta(days=1)],
+                   monto=monto,
+               ))
+
         # 3. Coincidencia MEDIA: ±3 días, monto similar (±5%)
-        if not candidatos:
-            tolerancia_monto = abs(self.monto) * Decimal('0.05')  # 5% tolerancia
-            monto_min = abs(self.monto) - tolerancia_monto
-            monto_max = abs(self.monto) + tolerancia_monto
-            
-            similares = Transaccion.objects.filter(
-                fecha__range=[
-                    self.fecha - timedelta(days=3),
-                    self.fecha + timedelta(days=3)
-                ],
-                monto__range=[monto_min, monto_max],
-                cuenta_origen=cuenta,
-                estado=TransaccionEstado.PENDIENTE
-            )
-            
-            for t in similares:
-                candidatos.append({
-                    'transaccion': t,
-                    'confianza': 'MEDIA',
-                    'score': 90,
-                    'criterios': ['fecha_aproximada', 'monto_similar', 'cuenta_correcta']
-                })
-        
-        return candidatos
-    
+        tolerancia_monto = monto * Decimal('0.05')  # 5% tolerancia
+        yield ('MEDIA', 90, ['fecha_aproximada', 'monto_similar', 'cuenta_correcta'],
+               pendientes.filter(
+                   fecha__range=[self.fecha - timedelta(days=3), self.fecha + timedelta(days=3)],
+                   monto__range=[monto - tolerancia_monto, monto + tolerancia_monto],
+               ))
+
+    def buscar_coincidencias(self):
+        """Busca transacciones internas que coincidan con este movimiento bancario"""
+        for confianza, score, criterios, transacciones in self._niveles_coincidencia():
+            candidatos = [
+                {'transaccion': t, 'confianza': confianza, 'score': score, 'criterios': criterios}
+                for t in transacciones
+            ]
+            if candidatos:
+                return candidatos
+        return []
+
+    async def abuscar_coincidencias(self):
+        """``buscar_coincidencias`` con el ORM async (``importacion`` ya cargada)."""
+        for confianza, score, criterios, transacciones in self._niveles_coincidencia():
+            candidatos = [
+                {'transaccion': t, 'confianza': confianza, 'score': score, 'criterios': criterios}
+                async for t in transacciones
+            ]
+            if candidatos:
+                return candidatos
+        return []
+
     def aplicar_match_automatico(self, umbral_confianza=95):
         """Aplica matching automático si la confianza es suficiente"""
         candidatos = self.buscar_coincidencias()
@@ -0,0 +1,78 @@
+"""
+Asignación uno a uno de peso máximo (método húngaro).
+
+``asignar(pesos)`` recibe una matriz ``filas × columnas`` de pesos no
+negativos (0 = pareja imposible) y devuelve las parejas que maximizan la
+suma de pesos sin repetir fila ni columna. Es la variante de caminos
+aumentantes más cortos con potenciales (Jonker-Volgenant), O(n²·m), con el
+recorrido de columnas vectorizado en NumPy: pensada para los bloques
+pequeños que arma ``conciliacion.emparejar_global``, no para matrices de
+miles de filas.
+
+El resultado depende solo de la matriz: ante empates gana la columna de
+menor índice, así que el mismo orden de entrada da siempre las mismas
+parejas.
+"""
+import numpy as np
+
+
+def _minimizar(costos):
+    """``columna[i]`` de costo total mínimo para cada fila; requiere filas <= columnas."""
+    n, m = costos.shape
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    # fila (base 1) asignada a cada columna (base 1); la columna 0 es auxiliar
+    dueno = np.zeros(m + 1, dtype=np.intp)
+    camino = np.zeros(m + 1, dtype=np.intp)
+    for i in range(1, n + 1):
+        dueno[0] = i
+        j0 = 0
+        minimo = np.full(m + 1, np.inf)
+        usada = np.zeros(m + 1, dtype=bool)
+        while True:
+            usada[j0] = True
+            i0 = dueno[j0]
+            libres = ~usada[1:]
+            reducido = costos[i0 - 1] - u[i0] - v[1:]
+            mejora = libres & (reducido < minimo[1:])
+            minimo[1:][mejora] = reducido[mejora]
+            camino[1:][mejora] = j0
+            candidatas = np.where(libres, minimo[1:], np.inf)
+            j1 = int(np.argmin(candidatas)) + 1
+            delta = candidatas[j1 - 1]
+            u[dueno[usada]] += delta
+            v[usada] -= delta
+            minimo[1:][libres] -= delta
+            j0 = j1
+            if dueno[j0] == 0:
+                break
+        # Invertir el camino aumentante
+        while j0:
+            j1 = camino[j0]
+            dueno[j0] = dueno[j1]
+            j0 = j1
+    columna = np.full(n, -1, dtype=np.intp)
+    asignadas = np.nonzero(dueno[1:])[0]
+    columna[dueno[asignadas + 1] - 1] = asignadas
+    return columna
+
+
+def asignar(pesos):
+    """
+    ``[(fila, columna)]`` de peso máximo, ordenadas por fila; las parejas
+    con peso 0 no se devuelven.
+    """
+    pesos = np.asarray(pesos, dtype=float)
+    if not pesos.size:
+        return []
+    transpuesta = pesos.shape[0] > pesos.shape[1]
+    if transpuesta:
+        pesos = pesos.T
+    columnas = _minimizar(-pesos)
+    parejas = [
+        (fila, int(columna)) for fila, columna in enumerate(columnas)
+        if pesos[fila, columna] > 0
+    ]
+    if transpuesta:
+        parejas = sorted((columna, fila) for fila, columna in parejas)
+    return parejas
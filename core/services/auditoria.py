@@ -0,0 +1,248 @@
+"""
+Auditoría de integridad del libro contable.
+
+En lugar de validar objeto por objeto (``AsientoContable.clean()``, los
+scripts ``fix_*.py``), cada bloque de fechas se revisa con unas cuantas
+consultas ``GROUP BY … HAVING``:
+
+- ``asiento_descuadrado``: Σ débitos ≠ Σ créditos (los ajustes de una sola
+  partida se aceptan)
+- ``asiento_vacio``: asiento sin partidas
+- ``monto_inconsistente``: el asiento no mueve el monto de su transacción
+- ``asiento_sin_transaccion``: asiento cuya transacción ya no existe
+- ``partida_invalida``: débito y crédito a la vez, ninguno, o negativos
+- ``partida_referencia_inconsistente``: ``transaccion_referencia`` distinta
+  de la transacción del asiento
+- ``transaccion_sin_asiento``: transacción sin asiento contable
+
+Los bloques son independientes y pueden procesarse en paralelo.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connections, transaction
+from django.db.models import Count, DecimalField, F, Max, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from ..models import AsientoContable, PartidaContable, Transaccion
+
+# SQLite suma decimales como flotantes: tolerancia de medio centavo
+TOLERANCIA = Decimal('0.005')
+
+REPARABLES = {
+    'transaccion_sin_asiento',
+    'asiento_descuadrado',
+    'monto_inconsistente',
+    'asiento_vacio',
+    'partida_invalida',
+    'partida_referencia_inconsistente',
+}
+
+
+def bloques(desde, hasta, dias=90):
+    """Divide [desde, hasta] en rangos de ``dias`` días."""
+    inicio = desde
+    while inicio <= hasta:
+        fin = min(inicio + timedelta(days=dias - 1), hasta)
+        yield inicio, fin
+        inicio = fin + timedelta(days=1)
+
+
+def _anomalia(tipo, fecha, asiento_id=None, transaccion_id=None, partida_id=None, **detalle):
+    return {
+        'tipo': tipo,
+        'fecha': fecha.isoformat() if fecha else None,
+        'asiento_id': asiento_id,
+        'transaccion_id': transaccion_id,
+        'partida_id': partida_id,
+        'detalle': {k: str(v) if isinstance(v, Decimal) else v for k, v in detalle.items()},
+    }
+
+
+def _asientos(desde, hasta):
+    """Asientos descuadrados, vacíos, sin transacción o con monto distinto."""
+    importe = DecimalField(max_digits=14, decimal_places=2)
+    cero = Value(Decimal('0.00'), output_field=importe)
+    filas = (
+        AsientoContable.objects.filter(fecha__range=(desde, hasta))
+        .annotate(
+            debitos=Coalesce(Sum('partidas__debito'), cero),
+            creditos=Coalesce(Sum('partidas__credito'), cero),
+            n_partidas=Count('partidas'),
+        )
+        .filter(
+            Q(n_partidas=0)
+            | Q(transaccion_origen__isnull=True)
+            # Ajuste: una sola partida por el monto de la transacción
+            | Q(transaccion_origen__ajuste=True) & (
+                ~Q(n_partidas=1)
+                | Q(debitos__gt=F('transaccion_origen__monto') + TOLERANCIA)
+                | Q(creditos__gt=F('transaccion_origen__monto') + TOLERANCIA)
+                | Q(debitos__lt=F('transaccion_origen__monto') - TOLERANCIA,
+                    creditos__lt=F('transaccion_origen__monto') - TOLERANCIA)
+            )
+            # Partida doble: débitos = créditos = monto
+            | Q(transaccion_origen__ajuste=False) & (
+                Q(debitos__gt=F('creditos') + TOLERANCIA)
+                | Q(debitos__lt=F('creditos') - TOLERANCIA)
+                | Q(debitos__gt=F('transaccion_origen__monto') + TOLERANCIA)
+                | Q(debitos__lt=F('transaccion_origen__monto') - TOLERANCIA)
+            )
+        )
+        .values(
+            'id', 'fecha', 'transaccion_origen_id', 'transaccion_origen__ajuste',
+            'transaccion_origen__monto', 'debitos', 'creditos', 'n_partidas',
+        )
+        .order_by('fecha', 'id')
+    )
+
+    for fila in filas:
+        debitos = Decimal(fila['debitos']).quantize(Decimal('0.01'))
+        creditos = Decimal(fila['creditos']).quantize(Decimal('0.01'))
+        monto = fila['transaccion_origen__monto']
+        comunes = dict(
+            fecha=fila['fecha'], asiento_id=fila['id'],
+            transaccion_id=fila['transaccion_origen_id'],
+            debitos=debitos, creditos=creditos, partidas=fila['n_partidas'],
+        )
+        if not fila['n_partidas']:
+            yield _anomalia('asiento_vacio', **comunes)
+        elif fila['transaccion_origen_id'] is None:
+            yield _anomalia('asiento_sin_transaccion', **comunes)
+        elif not fila['transaccion_origen__ajuste'] and abs(debitos - creditos) > TOLERANCIA:
+            yield _anomalia('asiento_descuadrado', **comunes)
+        else:
+            yield _anomalia('monto_inconsistente', monto=monto, **comunes)
+
+
+def _partidas(desde, hasta):
+    base = PartidaContable.objects.filter(asiento__fecha__range=(desde, hasta))
+    sin_debito = Q(debito__isnull=True) | Q(debito=0)
+    sin_credito = Q(credito__isnull=True) | Q(credito=0)
+    invalidas = base.filter(
+        Q(debito__gt=0, credito__gt=0)
+        | (sin_debito & sin_credito)
+        | Q(debito__lt=0)
+        | Q(credito__lt=0)
+    ).values('id', 'asiento_id', 'asiento__fecha', 'debito', 'credito', 'asiento__transaccion_origen_id')
+    for fila in invalidas:
+        yield _anomalia(
+            'partida_invalida', fila['asiento__fecha'], asiento_id=fila['asiento_id'],
+            transaccion_id=fila['asiento__transaccion_origen_id'], partida_id=fila['id'],
+            debito=fila['debito'], credito=fila['credito'],
+        )
+
+    referencias = base.filter(transaccion_referencia__isnull=False).filter(
+        Q(asiento__transaccion_origen__isnull=True)
+        | ~Q(transaccion_referencia_id=F('asiento__transaccion_origen_id'))
+    ).values('id', 'asiento_id', 'asiento__fecha', 'transaccion_referencia_id', 'asiento__transaccion_origen_id')
+    for fila in referencias:
+        yield _anomalia(
+            'partida_referencia_inconsistente', fila['asiento__fecha'],
+            asiento_id=fila['asiento_id'], transaccion_id=fila['asiento__transaccion_origen_id'],
+            partida_id=fila['id'], transaccion_referencia=fila['transaccion_referencia_id'],
+        )
+
+
+def _transacciones(desde, hasta):
+    filas = (
+        Transaccion.objects.filter(fecha__range=(desde, hasta), asiento_contable__isnull=True)
+        .values('id', 'fecha', 'monto')
+        .order_by('fecha', 'id')
+    )
+    for fila in filas:
+        yield _anomalia('transaccion_sin_asiento', fila['fecha'], transaccion_id=fila['id'], monto=fila['monto'])
+
+
+def auditar_bloque(desde, hasta):
+    """Todas las anomalías con fecha en [desde, hasta] (5 consultas)."""
+    return [
+        *_asientos(desde, hasta),
+        *_partidas(desde, hasta),
+        *_transacciones(desde, hasta),
+    ]
+
+
+def _auditar_en_hilo(rango):
+    try:
+        return auditar_bloque(*rango)
+    finally:
+        # Cada hilo abre su propia conexión: cerrarla al terminar el bloque
+        connections.close_all()
+
+
+def auditar(desde, hasta, dias=90, hilos=1):
+    """Audita [desde, hasta] por bloques de ``dias``, con ``hilos`` en paralelo."""
+    rangos = list(bloques(desde, hasta, dias))
+    if hilos <= 1:
+        resultados = [auditar_bloque(*rango) for rango in rangos]
+    else:
+        with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+            resultados = list(ejecutor.map(_auditar_en_hilo, rangos))
+    return rangos, [anomalia for bloque in resultados for anomalia in bloque]
+
+
+def rango_del_libro():
+    """Primera y última fecha con asientos o transacciones."""
+    fechas = [
+        f for f in (
+            *AsientoContable.objects.aggregate(a=Min('fecha'), b=Max('fecha')).values(),
+            *Transaccion.objects.aggregate(a=Min('fecha'), b=Max('fecha')).values(),
+        ) if f
+    ]
+    return (min(fechas), max(fechas)) if fechas else (None, None)
+
+
+def reparar(anomalias, tipos=REPARABLES):
+    """
+    Aplica las reparaciones seguras y devuelve lo hecho:
+
+    - transacción sin asiento → se genera su asiento
+    - asiento descuadrado, monto inconsistente o partida inválida → se
+      regenera el asiento desde su transacción
+    - asiento vacío sin transacción → se elimina
+    - referencia inconsistente → la partida apunta a la transacción del asiento
+
+    Al final se reconstruyen los saldos diarios de las cuentas tocadas: las
+    partidas dañadas pudieron escribirse sin pasar por las señales.
+    """
+    from .saldos import reconstruir_saldos
+
+    acciones = []
+    regenerar = set()
+    for anomalia in anomalias:
+        if anomalia['tipo'] not in tipos:
+            continue
+        if anomalia['tipo'] == 'asiento_vacio' and anomalia['transaccion_id'] is None:
+            AsientoContable.objects.filter(pk=anomalia['asiento_id'], partidas__isnull=True).delete()
+            acciones.append({'accion': 'eliminar_asiento', 'asiento_id': anomalia['asiento_id']})
+        elif anomalia['tipo'] == 'partida_referencia_inconsistente':
+            if anomalia['transaccion_id'] is not None:
+                PartidaContable.objects.filter(pk=anomalia['partida_id']).update(
+                    transaccion_referencia_id=anomalia['transaccion_id']
+                )
+                acciones.append({'accion': 'corregir_referencia', 'partida_id': anomalia['partida_id']})
+        elif anomalia['transaccion_id'] is not None:
+            regenerar.add(anomalia['transaccion_id'])
+
+    cuentas = set()
+    for t in Transaccion.objects.filter(pk__in=regenerar).select_related(
+        'cuenta_origen__tipo', 'cuenta_destino__tipo', 'categoria'
+    ):
+        partidas = PartidaContable.objects.filter(asiento__transaccion_origen=t)
+        try:
+            with transaction.atomic():
+                cuentas.update(partidas.values_list('cuenta_id', flat=True))
+                AsientoContable.objects.filter(transaccion_origen=t).delete()
+                t.validar_para_asiento()
+                t._crear_asiento_contable()
+                cuentas.update(partidas.values_list('cuenta_id', flat=True))
+            acciones.append({'accion': 'regenerar_asiento', 'transaccion_id': t.pk})
+        except Exception as exc:
+            acciones.append({'accion': 'error', 'transaccion_id': t.pk, 'error': str(exc)})
+
+    if cuentas:
+        reconstruir_saldos(sorted(cuentas))
+        acciones.append({'accion': 'reconstruir_saldos', 'cuentas': sorted(cuentas)})
+    return acciones
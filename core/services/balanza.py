@@ -0,0 +1,113 @@
+"""
+Balanza de comprobación.
+
+Para cada cuenta calcula, en una sola consulta agrupada sobre
+``PartidaContable`` unida a ``AsientoContable.fecha``:
+
+- ``saldo_apertura``: ``saldo_inicial`` + movimientos previos a ``desde``
+- ``debitos_periodo`` / ``creditos_periodo``: movimientos en [desde, hasta]
+- ``saldo_cierre``: apertura ± movimientos del periodo
+
+Los saldos llevan el signo de la naturaleza de la cuenta (mismo criterio que
+``Cuenta.saldo()`` y ``Cuenta.objects.with_saldos()``).
+"""
+from decimal import Decimal
+
+from django.db import models
+from django.db.models import Case, ExpressionWrapper, F, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from ..models import Cuenta
+from .exportacion import escritor_csv
+
+CERO = Decimal('0.00')
+CENTAVO = Decimal('0.01')
+CAMPOS_IMPORTE = ['saldo_apertura', 'debitos_periodo', 'creditos_periodo', 'saldo_cierre']
+
+COLUMNAS_CSV = [
+    "Cuenta", "Tipo", "Naturaleza", "Saldo apertura",
+    "Débitos", "Créditos", "Saldo cierre",
+]
+
+
+def _con_signo(debitos, creditos):
+    """(débitos − créditos) para DEUDORA, (créditos − débitos) para ACREEDORA."""
+    return Case(
+        When(naturaleza="ACREEDORA", then=F(creditos) - F(debitos)),
+        default=F(debitos) - F(creditos),
+    )
+
+
+def balanza_comprobacion(desde, hasta, cuenta_ids=None, solo_con_movimientos=False):
+    """QuerySet de ``Cuenta`` anotado con las columnas de la balanza."""
+    importe = models.DecimalField(max_digits=14, decimal_places=2)
+    cero = Value(CERO, output_field=importe)
+    antes = Q(partidas_contables__asiento__fecha__lt=desde)
+    en_rango = Q(partidas_contables__asiento__fecha__range=(desde, hasta))
+
+    qs = Cuenta.objects.select_related('tipo')
+    if cuenta_ids is not None:
+        qs = qs.filter(pk__in=cuenta_ids)
+    qs = qs.annotate(
+        debitos_previos=Coalesce(Sum('partidas_contables__debito', filter=antes), cero),
+        creditos_previos=Coalesce(Sum('partidas_contables__credito', filter=antes), cero),
+        debitos_periodo=Coalesce(Sum('partidas_contables__debito', filter=en_rango), cero),
+        creditos_periodo=Coalesce(Sum('partidas_contables__credito', filter=en_rango), cero),
+    ).annotate(
+        saldo_apertura=ExpressionWrapper(
+            F('saldo_inicial') + _con_signo('debitos_previos', 'creditos_previos'),
+            output_field=importe,
+        ),
+    ).annotate(
+        saldo_cierre=ExpressionWrapper(
+            F('saldo_apertura') + _con_signo('debitos_periodo', 'creditos_periodo'),
+            output_field=importe,
+        ),
+    )
+    if solo_con_movimientos:
+        qs = qs.exclude(saldo_apertura=0, debitos_periodo=0, creditos_periodo=0)
+    return qs.order_by('tipo__grupo', 'nombre')
+
+
+def _redondear(cuenta):
+    # SQLite suma decimales como flotantes: normalizar a centavos
+    for campo in CAMPOS_IMPORTE:
+        setattr(cuenta, campo, Decimal(getattr(cuenta, campo)).quantize(CENTAVO))
+    return cuenta
+
+
+def totales_balanza(cuentas):
+    """Suma las columnas de una balanza ya evaluada."""
+    totales = dict.fromkeys(CAMPOS_IMPORTE, CERO)
+    for cuenta in cuentas:
+        _redondear(cuenta)
+        for campo in CAMPOS_IMPORTE:
+            totales[campo] += getattr(cuenta, campo)
+    # En partida doble el debe y el haber del periodo deben coincidir
+    totales['diferencia'] = totales['debitos_periodo'] - totales['creditos_periodo']
+    return totales
+
+
+def filas_csv(cuentas):
+    """
+    Genera la balanza como líneas CSV, una cuenta a la vez, para usarse con
+    ``StreamingHttpResponse`` sin armar el archivo en memoria.
+    """
+    writer = escritor_csv()
+    yield writer.writerow(COLUMNAS_CSV)
+
+    debitos = creditos = CERO
+    for cuenta in cuentas.iterator(chunk_size=2000):
+        _redondear(cuenta)
+        debitos += cuenta.debitos_periodo
+        creditos += cuenta.creditos_periodo
+        yield writer.writerow([
+            cuenta.nombre,
+            cuenta.tipo.nombre,
+            cuenta.naturaleza,
+            cuenta.saldo_apertura,
+            cuenta.debitos_periodo,
+            cuenta.creditos_periodo,
+            cuenta.saldo_cierre,
+        ])
+    yield writer.writerow(["Totales", "", "", "", debitos, creditos, ""])
@@ -7,6 +7,7 @@ from decimal import Decimal
 from datetime import datetime
 from django.db import transaction as db_transaction
 from django.core.exceptions import ValidationError
+from django.db.models import Count, Q, Sum
 from django.utils import timezone
 from difflib import SequenceMatcher
 
@@ -514,11 +515,11 @@ class AsistenteBBVA:
             ignorar=False
         )
         
-        transacciones_creadas = []
+        pendientes = []
         errores = []
         cuentas_creadas = 0
         
-        for mov in movimientos_procesados:
+        for mov in movimientos_procesados.select_related('cuenta_destino_confirmada'):
             try:
                 # Determinar cuenta relacionada (origen o destino según el caso)
                 cuenta_relacionada = mov.cuenta_destino_confirmada
@@ -530,48 +531,53 @@ class AsistenteBBVA:
                         # Es una cuenta nueva
                         cuentas_creadas += 1
                 
-                # Crear transacción con doble entrada
+                # Preparar transacción con doble entrada
                 if mov.es_gasto:
                     # ABONO contable: Sale dinero de BBVA (disminuye cuenta DEUDORA)
                     # Nota: El banco lo llama "CARGO" pero contablemente es ABONO
-                    transaccion = Transaccion.objects.create(
-                        monto=mov.monto_calculado,
-                        fecha=mov.fecha_original,
-                        descripcion=mov.descripcion_limpia,
-                        cuenta_origen=importacion.cuenta_bbva,  # Sale de BBVA
-                        cuenta_destino=cuenta_relacionada,      # Llega a otra cuenta
-                        categoria=mov.categoria_confirmada,
-                        referencia_bbva=mov.descripcion_original,
-                        saldo_posterior_bbva=mov.saldo_original,
-                        importacion_bbva=importacion,
-                        estado=TransaccionEstado.LIQUIDADA
-                    )
+                    cuenta_origen = importacion.cuenta_bbva      # Sale de BBVA
+                    cuenta_destino = cuenta_relacionada          # Llega a otra cuenta
                 else:
                     # CARGO contable: Entra dinero a BBVA (aumenta cuenta DEUDORA)
                     # Nota: El banco lo llama "ABONO" pero contablemente es CARGO
-                    transaccion = Transaccion.objects.create(
-                        monto=mov.monto_calculado,
-                        fecha=mov.fecha_original,
-                        descripcion=mov.descripcion_limpia,
-                        cuenta_origen=cuenta_relacionada,       # Sale de otra cuenta
-                        cuenta_destino=importacion.cuenta_bbva, # Llega a BBVA
-                        categoria=mov.categoria_confirmada,
-                        referencia_bbva=mov.descripcion_original,
-                        saldo_posterior_bbva=mov.saldo_original,
-                        importacion_bbva=importacion,
-                        estado=TransaccionEstado.LIQUIDADA
-                    )
+                    cuenta_origen = cuenta_relacionada           # Sale de otra cuenta
+                    cuenta_destino = importacion.cuenta_bbva     # Llega a BBVA
                 
-                # Vincular movimiento temporal con transacción creada
-                mov.transaccion_creada = transaccion
-                mov.save()
-                
-                transacciones_creadas.append(transaccion)
-                importacion.movimientos_nuevos += 1
+                transaccion = Transaccion(
+                    monto=mov.monto_calculado,
+                    fecha=mov.fecha_original,
+                    descripcion=mov.descripcion_limpia,
+                    cuenta_origen=cuenta_origen,
+                    cuenta_destino=cuenta_destino,
+                    categoria_id=mov.categoria_confirmada_id,
+                    referencia_bbva=mov.descripcion_original,
+                    saldo_posterior_bbva=mov.saldo_original,
+                    importacion_bbva=importacion,
+                    estado=TransaccionEstado.LIQUIDADA
+                )
+                pendientes.append((mov, transaccion))
                 
             except Exception as e:
                 errores.append(f"Fila {mov.fila_excel}: {str(e)}")
         
+        # Validar en memoria y crear todas las transacciones en bloque
+        movs_por_transaccion = {id(t): mov for mov, t in pendientes}
+        validas, invalidas = Transaccion.objects.validar_lote([t for _, t in pendientes])
+        for transaccion, error in invalidas:
+            mov = movs_por_transaccion[id(transaccion)]
+            errores.append(f"Fila {mov.fila_excel}: {'; '.join(error.messages)}")
+        
+        transacciones_creadas = Transaccion.objects.bulk_create_con_asientos(validas)
+        
+        # Vincular movimientos temporales con las transacciones creadas
+        movs_vinculados = []
+        for transaccion in transacciones_creadas:
+            mov = movs_por_transaccion[id(transaccion)]
+            mov.transaccion_creada = transaccion
+            movs_vinculados.append(mov)
+        MovimientoBBVATemporal.objects.bulk_update(movs_vinculados, ['transaccion_creada'])
+        importacion.movimientos_nuevos += len(transacciones_creadas)
+        
         # Finalizar importación
         importacion.estado = EstadoCuentaBBVA.COMPLETADO
         importacion.fecha_completado = timezone.now()
@@ -587,22 +593,38 @@ class AsistenteBBVA:
             'errores': errores
         }
 
+    # Conteos y montos del resumen en un solo aggregate condicional
+    AGREGADOS_RESUMEN = {
+        'total_movimientos': Count('id'),
+        'validados': Count('id', filter=Q(validado_por_usuario=True)),
+        'ignorados': Count('id', filter=Q(ignorar=True)),
+        'duplicados': Count('id', filter=Q(es_duplicado=True)),
+        'gastos': Count('id', filter=Q(es_gasto=True)),
+        'ingresos': Count('id', filter=Q(es_gasto=False)),
+        'monto_total_gastos': Sum('monto_calculado', filter=Q(es_gasto=True)),
+        'monto_total_ingresos': Sum('monto_calculado', filter=Q(es_gasto=False)),
+        'categorias_detectadas': Count('categoria_sugerida', distinct=True, filter=~Q(categoria_sugerida='')),
+    }
+
     @classmethod
-    def obtener_resumen_importacion(cls, importacion):
-        """Obtiene resumen completo de una importación"""
-        movimientos = importacion.movimientos_temporales.all()
-        
+    def _resumen(cls, importacion, totales):
         return {
-            'total_movimientos': movimientos.count(),
-            'validados': movimientos.filter(validado_por_usuario=True).count(),
-            'ignorados': movimientos.filter(ignorar=True).count(),
-            'duplicados': movimientos.filter(es_duplicado=True).count(),
-            'gastos': movimientos.filter(es_gasto=True).count(),
-            'ingresos': movimientos.filter(es_gasto=False).count(),
-            'monto_total_gastos': sum(m.monto_calculado for m in movimientos.filter(es_gasto=True)),
-            'monto_total_ingresos': sum(m.monto_calculado for m in movimientos.filter(es_gasto=False)),
-            'categorias_detectadas': len(set(m.categoria_sugerida for m in movimientos if m.categoria_sugerida)),
+            **totales,
+            'monto_total_gastos': totales['monto_total_gastos'] or 0,
+            'monto_total_ingresos': totales['monto_total_ingresos'] or 0,
             'periodo': f"{importacion.fecha_primer_movimiento} - {importacion.fecha_ultimo_movimiento}",
             'estado': importacion.estado,
             'paso_actual': importacion.paso_actual
-        }
\ No newline at end of file
+        }
+
+    @classmethod
+    def obtener_resumen_importacion(cls, importacion):
+        """Obtiene resumen completo de una importación"""
+        totales = importacion.movimientos_temporales.aggregate(**cls.AGREGADOS_RESUMEN)
+        return cls._resumen(importacion, totales)
+
+    @classmethod
+    async def aobtener_resumen_importacion(cls, importacion):
+        """``obtener_resumen_importacion`` con el ORM async"""
+        totales = await importacion.movimientos_temporales.aaggregate(**cls.AGREGADOS_RESUMEN)
+        return cls._resumen(importacion, totales)
\ No newline at end of file
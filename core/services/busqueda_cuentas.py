@@ -0,0 +1,128 @@
+"""
+Búsqueda de cuentas mientras se escribe (type-ahead).
+
+Cada proceso guarda en memoria un índice de todas las cuentas: sus filas
+(nombre, referencia, no. de cliente, tipo) y una lista ordenada de
+``(palabra, posición)`` con las palabras normalizadas (sin acentos ni
+mayúsculas) de esos campos. Un prefijo se resuelve con ``bisect`` sobre esa
+lista, sin recorrer todas las cuentas; solo si no se llena el límite se
+buscan coincidencias por subcadena en el texto de cada cuenta.
+
+El índice se reconstruye (una consulta) cuando cambia la versión de
+cuentas o de tipos de cuenta (señales, ver ``estadisticas.versiones``).
+Los saldos salen de un mapa ``{cuenta: saldo}`` de todas las cuentas leído
+de ``SaldoDiario`` en una sola consulta (``with_saldo_diario``) y que se
+renueva cuando cambia la versión de transacciones. Con todo vigente, una
+búsqueda solo lee las versiones de la caché: no consulta la base.
+"""
+import heapq
+import unicodedata
+from bisect import bisect_left
+
+from ..models import Cuenta
+from .estadisticas import versiones
+from .referencias import CUENTAS
+
+LIMITE = 10
+LIMITE_MAXIMO = 50
+
+# (versiones, filas, textos, palabras, posiciones) del último índice construido
+_indice = None
+# (versiones, {cuenta_id: saldo}) del último mapa de saldos
+_saldos = None
+
+
+def normalizar(texto):
+    """Minúsculas y sin acentos: "Crédito" → "credito"."""
+    texto = unicodedata.normalize("NFKD", texto or "")
+    return "".join(c for c in texto if not unicodedata.combining(c)).casefold()
+
+
+def _construir():
+    filas = list(
+        Cuenta.objects.order_by("nombre").values(
+            "id", "nombre", "referencia", "no_cliente", "naturaleza",
+            "tipo__nombre", "tipo__grupo",
+        )
+    )
+    textos = []
+    pares = []
+    for posicion, fila in enumerate(filas):
+        texto = normalizar(" ".join(
+            filter(None, (fila["nombre"], fila["referencia"], fila["no_cliente"]))
+        ))
+        textos.append(texto)
+        fila["_nombre"] = normalizar(fila["nombre"])
+        pares.extend((palabra, posicion) for palabra in set(texto.split()))
+    pares.sort()
+    return filas, textos, [palabra for palabra, _ in pares], [posicion for _, posicion in pares]
+
+
+def indice():
+    """``(filas, textos, palabras, posiciones, saldos)`` vigentes de este proceso."""
+    global _indice, _saldos
+    *version_cuentas, version_transacciones = versiones(*CUENTAS, "transacciones")
+    if _indice is None or _indice[0] != version_cuentas:
+        _indice = (version_cuentas, *_construir())
+    version_saldos = (*version_cuentas, version_transacciones)
+    if _saldos is None or _saldos[0] != version_saldos:
+        _saldos = (version_saldos, dict(Cuenta.objects.with_saldo_diario().values_list("pk", "saldo_actual")))
+    return (*_indice[1:], _saldos[1])
+
+
+def _con_prefijo(palabras, posiciones, prefijo):
+    """Posiciones de las cuentas con alguna palabra que empieza con ``prefijo``."""
+    encontradas = set()
+    i = bisect_left(palabras, prefijo)
+    while i < len(palabras) and palabras[i].startswith(prefijo):
+        encontradas.add(posiciones[i])
+        i += 1
+    return encontradas
+
+
+def buscar_cuentas(consulta, grupo=None, limite=LIMITE):
+    """
+    Hasta ``limite`` cuentas cuyo nombre, referencia o no. de cliente
+    contienen todas las palabras de ``consulta``. Primero las que empiezan
+    por la consulta, luego las que tienen una palabra con ese prefijo y al
+    final las coincidencias por subcadena; dentro de cada grupo, por nombre.
+    """
+    terminos = normalizar(consulta).split()
+    if not terminos:
+        return []
+    filas, textos, palabras, posiciones, saldos = indice()
+    consulta = " ".join(terminos)
+
+    def coincide(posicion):
+        texto = textos[posicion]
+        return (
+            all(t in texto for t in terminos)
+            and (not grupo or filas[posicion]["tipo__grupo"] == grupo)
+        )
+
+    # El término más largo es el más selectivo para el prefijo
+    candidatas = _con_prefijo(palabras, posiciones, max(terminos, key=len))
+    elegidas = heapq.nsmallest(
+        limite,
+        (p for p in candidatas if coincide(p)),
+        key=lambda p: (not filas[p]["_nombre"].startswith(consulta), p),
+    )
+    if len(elegidas) < limite:
+        vistas = set(elegidas)
+        for posicion in range(len(textos)):
+            if posicion not in vistas and coincide(posicion):
+                elegidas.append(posicion)
+                if len(elegidas) == limite:
+                    break
+
+    resultado = [filas[p] for p in elegidas]
+    return [{
+        "id": fila["id"],
+        "text": f"{fila['nombre']} ({fila['tipo__nombre']})",
+        "nombre": fila["nombre"],
+        "numero": fila["referencia"],
+        "naturaleza": fila["naturaleza"],
+        "grupo": fila["tipo__grupo"],
+        "tipo": fila["tipo__nombre"],
+        "saldo": float(saldos.get(fila["id"]) or 0),
+    } for fila in resultado]
@@ -0,0 +1,352 @@
+"""
+Conciliación por lotes de una importación bancaria.
+
+``MovimientoBancario.aplicar_match_automatico`` busca candidatas con hasta
+tres consultas por movimiento y guarda cada match con dos ``save()`` (la
+transacción y su asiento). ``conciliar_importacion`` da el mismo resultado
+para toda una importación con una consulta de candidatas: trae las
+transacciones pendientes de la cuenta en la ventana de fechas de los
+movimientos, las indexa en memoria por (monto, fecha), recorre los
+movimientos en el mismo orden y con los mismos niveles (``NIVELES``) y
+guarda todo con un ``UPDATE`` parametrizado por tabla (``executemany``).
+
+Como en la versión por movimiento, una transacción emparejada deja de estar
+pendiente y ya no la puede tomar otro movimiento de la importación; entre
+candidatas del mismo nivel gana la de fecha más reciente y luego la de menor
+id (``ORDEN``). Así, dos movimientos del mismo monto en días contiguos
+pueden pelear por la misma transacción y el orden decide cuál se la queda.
+
+``modo=GLOBAL`` resuelve todos los movimientos a la vez (``emparejar_global``):
+una matriz de scores por bloque de montos y fechas compatibles y una
+asignación uno a uno de peso máximo (``asignacion.asignar``).
+"""
+from collections import defaultdict, deque
+from datetime import timedelta
+from decimal import Decimal
+import re
+
+import numpy as np
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from ..models import AsientoContable, MovimientoBancario, Transaccion, TransaccionEstado
+from .asignacion import asignar
+from .estadisticas import invalidar_transacciones
+from .periodos import recalcular_periodos
+
+SECUENCIAL = 'secuencial'
+GLOBAL = 'global'
+MODOS = (SECUENCIAL, GLOBAL)
+
+UMBRAL = 95
+LOTE = 1000
+ORDEN = ('-fecha', 'pk')
+
+# (confianza, score, días de tolerancia, tolerancia relativa del monto),
+# del más estricto al más laxo, igual que MovimientoBancario._niveles_coincidencia
+NIVELES = (
+    ('EXACTA', 99, 0, None),
+    ('ALTA', 95, 1, None),
+    ('MEDIA', 90, 3, Decimal('0.05')),
+)
+
+# Peso de cada criterio en el score de emparejar_global (suman 1)
+PESOS = {'fecha': 0.5, 'monto': 0.3, 'descripcion': 0.2}
+# Se suma a toda pareja posible para que primero se maximice el número de
+# matches y, entre asignaciones con el mismo número, la suma de scores
+BONO_MATCH = 1000
+# Filas (movimientos + transacciones) por matriz de asignación
+MAX_BLOQUE = 400
+
+
+class IndiceCandidatas:
+    """
+    Transacciones pendientes en memoria: por (monto, fecha) para los niveles
+    de monto exacto y por fecha para los de monto aproximado, cada lista en
+    el orden de la consulta (``ORDEN``: dentro de una fecha, por id). Las
+    que se toman se marcan y se saltan.
+    """
+
+    def __init__(self, transacciones):
+        self.por_clave = defaultdict(deque)
+        self.por_fecha = defaultdict(list)
+        self.tomadas = set()
+        for t in transacciones:
+            self.por_clave[(t.monto, t.fecha)].append(t)
+            self.por_fecha[t.fecha].append(t)
+
+    def _exacta(self, monto, dia):
+        filas = self.por_clave.get((monto, dia))
+        # Las tomadas se quitan del frente al encontrarlas
+        while filas and filas[0].pk in self.tomadas:
+            filas.popleft()
+        return filas[0] if filas else None
+
+    def _aproximada(self, dia, monto_min, monto_max):
+        for t in self.por_fecha.get(dia, ()):
+            if t.pk not in self.tomadas and monto_min <= t.monto <= monto_max:
+                return t
+        return None
+
+    def buscar(self, fecha, monto, dias, tolerancia):
+        """Primera candidata libre (``ORDEN``) a ``dias`` de ``fecha`` con ese monto."""
+        # Fecha más reciente primero, como ORDER BY -fecha
+        for delta in range(dias, -dias - 1, -1):
+            dia = fecha + timedelta(days=delta)
+            if tolerancia is None:
+                t = self._exacta(monto, dia)
+            else:
+                margen = monto * tolerancia
+                t = self._aproximada(dia, monto - margen, monto + margen)
+            if t is not None:
+                return t
+        return None
+
+    def tomar(self, t):
+        self.tomadas.add(t.pk)
+
+
+def emparejar(movimientos, indice, umbral=UMBRAL):
+    """
+    ``[(movimiento, transaccion, confianza)]`` en el orden de ``movimientos``.
+    Para cada uno vale el primer nivel con alguna candidata libre; si su score
+    no llega a ``umbral`` el movimiento queda sin match (ver
+    ``aplicar_match_automatico``), así que basta con probar esos niveles.
+    """
+    niveles = [nivel for nivel in NIVELES if nivel[1] >= umbral]
+    matches = []
+    for movimiento in movimientos:
+        monto = abs(movimiento.monto)
+        for confianza, _, dias, tolerancia in niveles:
+            t = indice.buscar(movimiento.fecha, monto, dias, tolerancia)
+            if t is not None:
+                indice.tomar(t)
+                matches.append((movimiento, t, confianza))
+                break
+    return matches
+
+
+def _tokens(texto):
+    return set(re.findall(r'\w{3,}', (texto or '').lower()))
+
+
+def _similitud(textos_a, textos_b):
+    """Jaccard de palabras entre cada par de textos, como matriz ``len(a) × len(b)``."""
+    tokens_a = [_tokens(t) for t in textos_a]
+    tokens_b = [_tokens(t) for t in textos_b]
+    vocabulario = {p: i for i, p in enumerate(set().union(*tokens_a, *tokens_b))}
+    if not vocabulario:
+        return np.zeros((len(textos_a), len(textos_b)))
+
+    def matriz(tokens):
+        m = np.zeros((len(tokens), len(vocabulario)))
+        for fila, palabras in enumerate(tokens):
+            m[fila, [vocabulario[p] for p in palabras]] = 1
+        return m
+
+    a, b = matriz(tokens_a), matriz(tokens_b)
+    comunes = a @ b.T
+    union = a.sum(axis=1)[:, None] + b.sum(axis=1)[None, :] - comunes
+    return np.divide(comunes, union, out=np.zeros_like(comunes), where=union > 0)
+
+
+def _bloques(fechas, centavos, dias, tolerancia):
+    """
+    Etiqueta de bloque de cada fila (movimientos y transacciones juntos): se
+    ordena por monto y se corta donde el salto supera la tolerancia; dentro
+    de cada monto, por fecha, donde el salto supera ``dias``. Dos filas de
+    bloques distintos nunca pueden emparejarse.
+    """
+    orden = np.argsort(centavos, kind='stable')
+    montos = centavos[orden]
+    # |a - b| <= a·t implica un salto entre vecinos <= b·t / (1 - t)
+    limite = montos[1:] * tolerancia / (1 - tolerancia)
+    grupo = np.empty(len(centavos), dtype=np.intp)
+    grupo[orden] = np.concatenate([[0], np.cumsum(np.diff(montos) > limite)])
+
+    orden = np.lexsort((fechas, grupo))
+    cortes = (np.diff(grupo[orden]) != 0) | (np.diff(fechas[orden]) > dias)
+    bloque = np.empty(len(fechas), dtype=np.intp)
+    bloque[orden] = np.concatenate([[0], np.cumsum(cortes)])
+    return bloque
+
+
+def _puntuar(movimientos, transacciones, niveles):
+    """
+    ``(pesos, confianzas)`` de cada pareja movimiento × transacción de un
+    bloque. La confianza es la del primer nivel que admite la pareja (como en
+    ``buscar_coincidencias``); el score combina cercanía de fecha, diferencia
+    de monto y parecido de descripciones según ``PESOS``.
+    """
+    fm = np.array([m.fecha.toordinal() for m in movimientos])[:, None]
+    ft = np.array([t.fecha.toordinal() for t in transacciones])[None, :]
+    cm = np.array([int(abs(m.monto) * 100) for m in movimientos])[:, None]
+    ct = np.array([int(t.monto * 100) for t in transacciones])[None, :]
+    dias = np.abs(fm - ft)
+    diferencia = np.abs(cm - ct)
+
+    confianzas = np.full(dias.shape, '', dtype=object)
+    for confianza, _, dias_nivel, tolerancia in reversed(niveles):
+        # diferencia <= monto·tolerancia, en enteros para no redondear
+        numerador, denominador = (tolerancia or Decimal(0)).as_integer_ratio()
+        admite = (dias <= dias_nivel) & (diferencia * denominador <= cm * numerador)
+        confianzas[admite] = confianza
+
+    dias_max = max(nivel[2] for nivel in niveles)
+    tolerancia_max = float(max((nivel[3] or 0) for nivel in niveles))
+    relativa = diferencia / np.maximum(cm, 1)
+    score = (
+        PESOS['fecha'] * (1 - dias / (dias_max + 1))
+        + PESOS['monto'] * (1 - relativa / tolerancia_max if tolerancia_max else 1)
+        + PESOS['descripcion'] * _similitud(
+            [m.descripcion for m in movimientos], [t.descripcion for t in transacciones]
+        )
+    )
+    pesos = np.where(confianzas != '', BONO_MATCH + 100 * score, 0)
+    return pesos, confianzas
+
+
+def emparejar_global(movimientos, transacciones, umbral=UMBRAL):
+    """
+    ``[(movimiento, transaccion, confianza)]`` sin transacciones repetidas y
+    con el mayor número posible de matches (y, a igualdad, el mayor score
+    total), en el orden de ``movimientos``. No depende del orden en que se
+    procesen los movimientos: con la misma entrada (``ORDEN``) el resultado
+    es siempre el mismo.
+
+    Un bloque de más de ``MAX_BLOQUE`` filas (montos muy encadenados por la
+    tolerancia) se resuelve por tramos de montos consecutivos; lo que queda
+    sin match con monto cercano al del siguiente tramo pasa a él. Ahí el
+    óptimo es por tramo y no de todo el bloque.
+    """
+    niveles = [nivel for nivel in NIVELES if nivel[1] >= umbral]
+    transacciones = list(transacciones)
+    if not niveles or not movimientos or not transacciones:
+        return []
+    filas = movimientos + transacciones
+    fechas = np.array([f.fecha.toordinal() for f in filas])
+    centavos = np.array([int(abs(f.monto) * 100) for f in filas])
+    tolerancia = float(max((nivel[3] or 0) for nivel in niveles))
+    bloque = _bloques(fechas, centavos, max(nivel[2] for nivel in niveles), tolerancia)
+    total = len(movimientos)
+    matches = []
+
+    def resolver(indices):
+        """Asigna las filas ``indices``; devuelve las que quedaron libres."""
+        indices = np.sort(indices)
+        ms = [movimientos[i] for i in indices[indices < total]]
+        ts = [transacciones[i - total] for i in indices[indices >= total]]
+        if not ms or not ts:
+            return indices
+        pesos, confianzas = _puntuar(ms, ts, niveles)
+        parejas = asignar(pesos)
+        matches.extend((ms[i], ts[j], confianzas[i, j]) for i, j in parejas)
+        tomadas = {i for i, _ in parejas} | {len(ms) + j for _, j in parejas}
+        return np.array([fila for k, fila in enumerate(indices) if k not in tomadas], dtype=np.intp)
+
+    for etiqueta in np.unique(bloque):
+        indices = np.nonzero(bloque == etiqueta)[0]
+        indices = indices[np.lexsort((fechas[indices], centavos[indices]))]
+        libres = np.array([], dtype=np.intp)
+        for inicio in range(0, len(indices), MAX_BLOQUE):
+            libres = resolver(np.concatenate([libres, indices[inicio:inicio + MAX_BLOQUE]]))
+            siguiente = indices[inicio + MAX_BLOQUE:inicio + MAX_BLOQUE + 1]
+            if len(siguiente):
+                # Solo siguen las que aún pueden emparejarse con montos del siguiente tramo
+                minimo = centavos[siguiente[0]]
+                libres = libres[centavos[libres] >= minimo - minimo * tolerancia / (1 - tolerancia)]
+    posicion = {id(m): i for i, m in enumerate(movimientos)}
+    return sorted(matches, key=lambda match: posicion[id(match[0])])
+
+
+def _candidatas(cuenta_id, movimientos, umbral):
+    dias = max((nivel[2] for nivel in NIVELES if nivel[1] >= umbral), default=0)
+    fechas = [m.fecha for m in movimientos]
+    return (
+        Transaccion.objects
+        .filter(
+            cuenta_origen_id=cuenta_id,
+            estado=TransaccionEstado.PENDIENTE,
+            fecha__range=(min(fechas) - timedelta(days=dias), max(fechas) + timedelta(days=dias)),
+        )
+        .only('id', 'fecha', 'monto', 'descripcion', 'saldo_posterior', 'periodo_id')
+    )
+
+
+def _actualizar(modelo, campos, objetos):
+    """
+    ``UPDATE tabla SET campos WHERE id = %s`` con ``executemany``. Hace lo
+    mismo que ``bulk_update``, que con miles de filas tarda más en armar su
+    ``CASE WHEN`` por fila que la base en escribirlas.
+    """
+    conexion = connections[router.db_for_write(modelo)]
+    nombre = conexion.ops.quote_name
+    campos = [modelo._meta.get_field(campo) for campo in campos]
+    sql = 'UPDATE {} SET {} WHERE {} = %s'.format(
+        nombre(modelo._meta.db_table),
+        ', '.join(f'{nombre(campo.column)} = %s' for campo in campos),
+        nombre(modelo._meta.pk.column),
+    )
+    filas = [
+        [campo.get_db_prep_save(getattr(obj, campo.attname), conexion) for campo in campos] + [obj.pk]
+        for obj in objetos
+    ]
+    with conexion.cursor() as cursor:
+        cursor.executemany(sql, filas)
+
+
+def aplicar(matches):
+    """
+    Guarda los matches como ``marcar_liquidada`` + el ``save()`` del
+    movimiento, en lotes, y después lo que harían las señales de cada
+    ``save()`` de ``Transaccion``: recalcular sus periodos e invalidar las
+    estadísticas.
+    """
+    if not matches:
+        return
+    ahora = timezone.now()
+    transacciones = []
+    for movimiento, t, confianza in matches:
+        t.estado = TransaccionEstado.LIQUIDADA
+        t.referencia_bancaria = movimiento.referencia
+        if movimiento.saldo_posterior is not None:
+            t.saldo_posterior = movimiento.saldo_posterior
+        movimiento.transaccion_conciliada = t
+        movimiento.confianza_match = confianza
+        movimiento.conciliado = True
+        movimiento.fecha_conciliacion = ahora
+        transacciones.append(t)
+
+    ids = [t.pk for t in transacciones]
+    with transaction.atomic():
+        _actualizar(Transaccion, ['estado', 'referencia_bancaria', 'saldo_posterior'], transacciones)
+        for inicio in range(0, len(ids), LOTE):
+            AsientoContable.objects.filter(
+                transaccion_origen_id__in=ids[inicio:inicio + LOTE]
+            ).update(estado=TransaccionEstado.LIQUIDADA)
+        _actualizar(
+            MovimientoBancario,
+            ['transaccion_conciliada', 'confianza_match', 'conciliado', 'fecha_conciliacion'],
+            [movimiento for movimiento, _, _ in matches],
+        )
+        recalcular_periodos({t.periodo_id for t in transacciones})
+    invalidar_transacciones()
+
+
+def conciliar_importacion(importacion, umbral=UMBRAL, modo=SECUENCIAL):
+    """
+    Empareja y guarda los movimientos sin conciliar de ``importacion``;
+    devuelve ``(conciliados, procesados)``. ``modo`` es ``SECUENCIAL`` (el
+    mismo resultado que ``aplicar_match_automatico`` uno por uno) o
+    ``GLOBAL`` (``emparejar_global``).
+    """
+    movimientos = list(importacion.movimientos.filter(conciliado=False).order_by(*ORDEN))
+    if not movimientos:
+        return 0, 0
+    candidatas = _candidatas(importacion.cuenta_id, movimientos, umbral).order_by(*ORDEN)
+    if modo == GLOBAL:
+        matches = emparejar_global(movimientos, candidatas, umbral)
+    else:
+        matches = emparejar(movimientos, IndiceCandidatas(candidatas), umbral)
+    aplicar(matches)
+    return len(matches), len(movimientos)
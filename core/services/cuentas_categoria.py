@@ -0,0 +1,96 @@
+"""
+Resolución memoizada de las cuentas contables derivadas de una categoría
+("Gastos - <categoría>" / "Ingresos - <categoría>").
+
+Cada gasto o ingreso necesita la cuenta de su categoría; en lugar de
+consultar ``TipoCuenta`` y ``Cuenta`` en cada alta, el resultado se guarda
+en una caché de proceso indexada por (código, categoría, moneda). Las
+señales de ``Categoria`` y ``Cuenta`` la invalidan al renombrar o eliminar.
+"""
+import copy
+import threading
+
+from django.db import transaction
+
+from ..models import Cuenta, TipoCuenta
+
+CUENTAS_DERIVADAS = {
+    'GAST': {'prefijo': 'Gastos', 'grupo': 'SER', 'naturaleza': 'DEUDORA'},
+    'ING': {'prefijo': 'Ingresos', 'grupo': 'ING', 'naturaleza': 'ACREEDORA'},
+}
+
+# (codigo, categoria_id, moneda) -> (nombre de la categoría, Cuenta)
+_cache = {}
+_lock = threading.Lock()
+
+
+def resolver_cuenta_categoria(codigo, categoria, moneda):
+    """
+    Devuelve (creándola si hace falta) la cuenta ``codigo`` ('GAST'/'ING')
+    de ``categoria``. Guardar el nombre de la categoría junto a la cuenta
+    detecta renombres hechos por otro proceso sin esperar a la señal.
+    """
+    clave = (codigo, categoria.pk, moneda)
+    with _lock:
+        entrada = _cache.get(clave)
+    if entrada and entrada[0] == categoria.nombre:
+        return copy.copy(entrada[1])
+
+    cuenta, creada = _obtener_o_crear(codigo, categoria.nombre, moneda)
+    entrada = (categoria.nombre, cuenta)
+
+    def guardar():
+        with _lock:
+            _cache[clave] = entrada
+
+    if creada:
+        # Si la transacción externa se revierte la cuenta no existirá
+        transaction.on_commit(guardar)
+    else:
+        guardar()
+    return copy.copy(cuenta)
+
+
+def _obtener_o_crear(codigo, nombre_categoria, moneda):
+    """
+    ``get_or_create`` sobre ``Cuenta.nombre`` (único): si dos procesos la
+    crean a la vez, el perdedor recibe ``IntegrityError`` y Django reintenta
+    el ``get`` en lugar de duplicarla. El tipo sólo se consulta al crear.
+    """
+    config = CUENTAS_DERIVADAS[codigo]
+    return Cuenta.objects.get_or_create(
+        nombre=f"{config['prefijo']} - {nombre_categoria}",
+        defaults={
+            'tipo': lambda: _tipo_cuenta(codigo),
+            'naturaleza': config['naturaleza'],
+            'moneda': moneda,
+        },
+    )
+
+
+def _tipo_cuenta(codigo):
+    config = CUENTAS_DERIVADAS[codigo]
+    tipo, _ = TipoCuenta.objects.get_or_create(
+        codigo=codigo,
+        defaults={'nombre': config['prefijo'], 'grupo': config['grupo']},
+    )
+    return tipo
+
+
+def invalidar_categoria(categoria_id):
+    """Olvida las cuentas resueltas para ``categoria_id``."""
+    with _lock:
+        for clave in [c for c in _cache if c[1] == categoria_id]:
+            del _cache[clave]
+
+
+def invalidar_cuenta(cuenta_id):
+    """Olvida las entradas que apuntan a ``cuenta_id`` (renombrada o eliminada)."""
+    with _lock:
+        for clave in [c for c, (_, cuenta) in _cache.items() if cuenta.pk == cuenta_id]:
+            del _cache[clave]
+
+
+def limpiar_cache():
+    with _lock:
+        _cache.clear()
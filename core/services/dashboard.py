@@ -0,0 +1,100 @@
+"""
+Instantánea del dashboard.
+
+Todo lo que muestra la página de inicio se calcula una vez y se guarda en
+la caché bajo una clave que incluye las versiones de transacciones,
+cuentas, periodos y categorías (ver ``estadisticas.versiones``). Las
+señales de esos modelos rotan su versión, así que la siguiente visita
+recalcula; mientras nada cambie, la página cuesta dos lecturas de caché
+(versiones con ``get_many`` e instantánea).
+"""
+import os
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from ..models import Categoria, Cuenta, Periodo, Transaccion
+from .estadisticas import versiones, vigencia
+
+# El tamaño de la base no tiene señal: se refresca al vencer la instantánea
+TTL_DASHBOARD = 300
+CONJUNTOS = ('transacciones', 'cuentas', 'periodos', 'categorias')
+
+
+def _tamano_base():
+    """Tamaño legible del archivo de la base (solo SQLite)."""
+    try:
+        size_bytes = os.path.getsize(settings.DATABASES['default']['NAME'])
+    except (OSError, TypeError):
+        return "N/A"
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size_bytes < 1024.0:
+            return f"{size_bytes:.1f} {unit}"
+        size_bytes /= 1024.0
+    return f"{size_bytes:.1f} TB"
+
+
+def _conteo(campo):
+    """Subconsulta con el número de transacciones donde la cuenta es ``campo``."""
+    return Coalesce(
+        Subquery(
+            Transaccion.objects.filter(**{campo: OuterRef('pk')})
+            .order_by()
+            .values(campo)
+            .annotate(n=Count('pk'))
+            .values('n')
+        ),
+        Value(0),
+    )
+
+
+def _calcular():
+    ultimas_transacciones = list(
+        Transaccion.objects.select_related('categoria', 'cuenta_origen', 'cuenta_destino')
+        .order_by('-fecha')[:10]
+    )
+    for trans in ultimas_transacciones:
+        trans.monto_abs = abs(trans.monto)
+
+    # Resumen de saldos por naturaleza (una sola consulta agrupada)
+    saldos_por_naturaleza = {}
+    for naturaleza, saldo_total in Cuenta.objects.with_saldos().values_list('naturaleza', 'saldo_actual'):
+        naturaleza = naturaleza if naturaleza else "Sin naturaleza"
+        saldos_por_naturaleza.setdefault(naturaleza, Decimal('0.00'))
+        saldos_por_naturaleza[naturaleza] += saldo_total
+
+    return {
+        'total_cuentas': Cuenta.objects.count(),
+        'total_transacciones': Transaccion.objects.count(),
+        'total_periodos': Periodo.objects.count(),
+        'total_categorias': Categoria.objects.count(),
+        'db_size': _tamano_base(),
+        # Dos subconsultas en lugar de Count() sobre dos JOINs, que multiplica
+        # las filas (origen × destino) y además infla los conteos
+        'cuentas_movimientos': list(
+            Cuenta.objects.select_related('tipo')
+            .annotate(num_movimientos=_conteo('cuenta_origen') + _conteo('cuenta_destino'))
+            .order_by('-num_movimientos')[:5]
+        ),
+        'ultimas_transacciones': ultimas_transacciones,
+        'ultimos_periodos': list(
+            Periodo.objects.select_related('cuenta').order_by('-fecha_fin_periodo')[:5]
+        ),
+        'saldos_naturaleza': [
+            {'naturaleza': key, 'total_saldo': value}
+            for key, value in saldos_por_naturaleza.items()
+        ],
+    }
+
+
+def instantanea_dashboard(ttl=TTL_DASHBOARD):
+    """Contexto del dashboard (cacheado por versión de los datos que muestra)."""
+    clave = 'dashboard:' + ':'.join(versiones(*CONJUNTOS))
+    datos = cache.get(clave)
+    if datos is None:
+        datos = _calcular()
+        cache.set(clave, datos, vigencia(ttl))
+    return datos
@@ -0,0 +1,102 @@
+"""
+Estadísticas de transacciones con caché.
+
+Los conteos se guardan por firma de consulta (el SQL con sus parámetros)
+durante unos segundos. Cada alta, cambio o baja de una transacción rota
+la versión global (señales de ``Transaccion``), así que lo cacheado
+antes del cambio deja de usarse sin tener que borrar clave por clave.
+Cuentas, categorías y periodos tienen su propia versión (``versiones``).
+
+Las versiones solo sirven si todos los procesos ven la misma caché. Con la
+memoria local (``locmemcache://``, el valor por defecto) un cambio rota el
+token únicamente en el worker que lo hizo; por eso ahí los tokens vencen a
+los ``CACHE_VERSION_TTL`` segundos y cada worker toma uno nuevo (y deja de
+usar lo cacheado con el viejo). Con una caché compartida no vencen.
+"""
+import hashlib
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import Count, Q
+
+from ..models import TransaccionEstado
+
+TTL_ESTADOS = 60
+
+# Clave de contexto -> estado contado
+ESTADOS = {
+    'pendientes': TransaccionEstado.PENDIENTE,
+    'liquidadas': TransaccionEstado.LIQUIDADA,
+    'conciliadas': TransaccionEstado.CONCILIADA,
+    'verificadas': TransaccionEstado.VERIFICADA,
+}
+
+
+def _clave_version(nombre):
+    return f'{nombre}:version'
+
+
+def _ttl_version():
+    if isinstance(caches['default'], LocMemCache):
+        return settings.CACHE_VERSION_TTL
+    return None
+
+
+def vigencia(ttl):
+    """``ttl`` recortado a la vida de los tokens de versión (para lo cacheado con ellos)."""
+    ttl_version = _ttl_version()
+    return ttl if ttl_version is None else min(ttl, ttl_version)
+
+
+def versiones(*nombres):
+    """
+    Tokens de versión de los conjuntos ``nombres`` ('transacciones',
+    'cuentas', …) leídos con un solo ``get_many``. Cada token cambia cuando
+    cambia algún registro de su conjunto (ver ``invalidar``).
+    """
+    claves = [_clave_version(nombre) for nombre in nombres]
+    tokens = cache.get_many(claves)
+    for clave in claves:
+        if clave not in tokens:
+            token = uuid4().hex
+            cache.add(clave, token, _ttl_version())
+            tokens[clave] = cache.get(clave, token)
+    return tuple(tokens[clave] for clave in claves)
+
+
+def invalidar(*nombres):
+    cache.set_many({_clave_version(nombre): uuid4().hex for nombre in nombres}, _ttl_version())
+
+
+def version_transacciones():
+    """Token que cambia cada vez que cambia alguna transacción."""
+    return versiones('transacciones')[0]
+
+
+def invalidar_transacciones():
+    invalidar('transacciones')
+
+
+def firma_consulta(queryset):
+    """Huella estable del SQL (con parámetros) de ``queryset``."""
+    sql, params = queryset.query.sql_with_params()
+    return hashlib.sha1(repr((sql, params)).encode()).hexdigest()
+
+
+def conteo_estados(queryset, ttl=TTL_ESTADOS):
+    """
+    Conteo por estado de ``queryset`` con un solo ``aggregate`` condicional
+    (una pasada sobre la tabla), cacheado ``ttl`` segundos.
+    """
+    queryset = queryset.order_by()
+    clave = f'transacciones:estados:{version_transacciones()}:{firma_consulta(queryset)}'
+    conteos = cache.get(clave)
+    if conteos is None:
+        conteos = queryset.aggregate(**{
+            nombre: Count('pk', filter=Q(estado=estado))
+            for nombre, estado in ESTADOS.items()
+        })
+        cache.set(clave, conteos, ttl)
+    return conteos
@@ -0,0 +1,88 @@
+"""
+Resumen del estado de cuenta.
+
+Saldo inicial, cargos, abonos, saldo final y totales por categoría salen
+de una sola consulta agrupada por categoría sobre los movimientos de la
+cuenta hasta ``hasta`` (índices ``(cuenta_*, fecha)``): cada grupo trae sus
+sumas condicionales antes y dentro del rango, y los totales generales son
+la suma de los grupos.
+
+El resultado se cachea por (cuenta, desde, hasta, versión de
+transacciones), así que paginar o exportar no lo recalcula.
+"""
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import models
+from django.db.models import Count, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from ..models import Transaccion
+from .estadisticas import version_transacciones
+
+TTL_RESUMEN = 300
+CENTAVO = Decimal('0.01')
+
+
+def _calcular(cuenta_id, desde, hasta):
+    importe = models.DecimalField(max_digits=14, decimal_places=2)
+    cero = Value(Decimal('0.00'), output_field=importe)
+    previo = Q(fecha__lt=desde)
+    en_rango = Q(fecha__gte=desde)
+    filas = (
+        Transaccion.objects
+        .de_cuenta(cuenta_id, hasta=hasta)
+        .order_by()
+        .values('categoria__nombre')
+        .annotate(
+            previo=Coalesce(Sum('monto', filter=previo), cero),
+            delta=Coalesce(Sum('monto', filter=en_rango), cero),
+            cargos=Coalesce(Sum('monto', filter=en_rango & Q(monto__lt=0)), cero),
+            abonos=Coalesce(Sum('monto', filter=en_rango & Q(monto__gt=0)), cero),
+            movimientos=Count('pk', filter=en_rango),
+        )
+    )
+
+    # SQLite suma decimales como flotantes: normalizar a centavos
+    def centavos(valor):
+        return Decimal(valor).quantize(CENTAVO)
+
+    saldo_inicial = delta = cargos = abonos = Decimal('0.00')
+    movimientos = 0
+    categorias = []
+    for fila in filas:
+        saldo_inicial += centavos(fila['previo'])
+        delta += centavos(fila['delta'])
+        cargos += centavos(fila['cargos'])
+        abonos += centavos(fila['abonos'])
+        movimientos += fila['movimientos']
+        if fila['movimientos']:
+            categorias.append({
+                'categoria__nombre': fila['categoria__nombre'],
+                'total': centavos(fila['delta']),
+            })
+    categorias.sort(key=lambda c: c['total'], reverse=True)
+
+    return {
+        'saldo_inicial': saldo_inicial,
+        'delta_periodo': delta,
+        'saldo_final': saldo_inicial + delta,
+        'total_cargos': -cargos,
+        'total_abonos': abonos,
+        'movimientos': movimientos,
+        'totales_categoria': categorias,
+    }
+
+
+def resumen_estado_cuenta(cuenta, desde, hasta, ttl=TTL_RESUMEN):
+    """Totales del estado de cuenta de ``cuenta`` en [desde, hasta] (cacheados)."""
+    cuenta_id = getattr(cuenta, 'pk', cuenta)
+    clave = (
+        f'estado_cuenta:{version_transacciones()}:{cuenta_id}:'
+        f'{desde.isoformat()}:{hasta.isoformat()}'
+    )
+    resumen = cache.get(clave)
+    if resumen is None:
+        resumen = _calcular(cuenta_id, desde, hasta)
+        cache.set(clave, resumen, ttl)
+    return resumen
@@ -0,0 +1,211 @@
+"""
+Exportaciones CSV y Excel.
+
+Cada exportación CSV es un generador de líneas para
+``StreamingHttpResponse``: el encabezado sale antes de ejecutar la consulta
+y las filas se leen con ``values_list(...).iterator(chunk_size=...)``
+(cursor del servidor en PostgreSQL), así que la memoria no crece con el
+número de filas.
+
+Los Excel usan el modo ``write_only`` de openpyxl: las filas pasan del
+iterador a la hoja sin armar listas ni DataFrames, el libro se escribe en
+un archivo temporal y se sirve con ``FileResponse``.
+
+Bajo ASGI Django no itera un iterador síncrono mientras envía: lo junta
+todo con ``sync_to_async(list)`` y recién entonces manda el primer byte.
+``en_bloques_async`` lo convierte en uno async que pide al hilo de la
+petición ~``BLOQUE_ASGI`` bytes a la vez; ``StreamingASGIMiddleware`` lo
+aplica a toda respuesta en streaming (CSV, Excel y PDF con ``FileResponse``).
+"""
+import csv
+import tempfile
+
+from asgiref.sync import sync_to_async
+
+from django.http import FileResponse, StreamingHttpResponse
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+from ..models import PartidaContable, Transaccion
+
+TAMANO_BLOQUE = 2000
+BLOQUE_ASGI = 64 * 1024
+
+
+class _Eco:
+    """Pseudo-archivo para ``csv.writer``: devuelve la línea en vez de escribirla."""
+
+    def write(self, valor):
+        return valor
+
+
+def escritor_csv():
+    """``csv.writer`` cuyo ``writerow`` devuelve la línea lista para enviar."""
+    return csv.writer(_Eco())
+
+
+def _lineas(encabezado, filas):
+    writer = escritor_csv()
+    yield writer.writerow(encabezado)
+    for fila in filas:
+        yield writer.writerow(fila)
+
+
+def respuesta_csv(lineas, nombre_archivo):
+    response = StreamingHttpResponse(lineas, content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{nombre_archivo}"'
+    return response
+
+
+def _siguiente_bloque(partes):
+    """Une partes de ``partes`` hasta juntar ``BLOQUE_ASGI`` bytes; ``b""`` al terminar."""
+    bloque, tamano = [], 0
+    for parte in partes:
+        bloque.append(parte)
+        tamano += len(parte)
+        if tamano >= BLOQUE_ASGI:
+            break
+    return b"".join(bloque)
+
+
+async def en_bloques_async(partes):
+    """
+    Iterador async sobre el iterador síncrono de bytes ``partes``. Cada
+    bloque se lee en el hilo ``thread_sensitive`` de la petición, el mismo
+    que abrió la conexión y el cursor de ``iterator()``.
+    """
+    siguiente = sync_to_async(_siguiente_bloque)
+    while bloque := await siguiente(partes):
+        yield bloque
+
+
+# --- Estado de cuenta ---------------------------------------------------------
+
+def lineas_estado_cuenta(cuenta, desde, hasta, saldo_inicial, saldo_final):
+    writer = escritor_csv()
+    yield writer.writerow(["Cuenta", cuenta.nombre])
+    yield writer.writerow(["Desde", desde, "Hasta", hasta])
+    yield writer.writerow([])
+
+    filas = (
+        Transaccion.objects.de_cuenta(cuenta, desde, hasta)
+        .order_by("fecha", "id")
+        .values_list("fecha", "descripcion", "categoria__nombre", "monto")
+        .iterator(chunk_size=TAMANO_BLOQUE)
+    )
+    yield from _lineas(["Fecha", "Descripción", "Categoría", "Monto"], filas)
+
+    yield writer.writerow([])
+    yield writer.writerow(["Saldo inicial", saldo_inicial])
+    yield writer.writerow(["Saldo final", saldo_final])
+
+
+def _encabezado(hoja, titulos):
+    celdas = []
+    for titulo in titulos:
+        celda = WriteOnlyCell(hoja, value=titulo)
+        celda.font = Font(bold=True)
+        celdas.append(celda)
+    return celdas
+
+
+def excel_estado_cuenta(cuenta, desde, hasta, saldo_inicial, saldo_final):
+    """Libro con hojas "Movimientos" y "Resumen" en un archivo temporal (abierto, al inicio)."""
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet("Movimientos")
+    hoja.column_dimensions["A"].width = 12
+    hoja.column_dimensions["B"].width = 50
+    hoja.column_dimensions["C"].width = 25
+    hoja.column_dimensions["D"].width = 14
+    hoja.append(_encabezado(hoja, ["Fecha", "Descripción", "Categoría", "Monto"]))
+    filas = (
+        Transaccion.objects.de_cuenta(cuenta, desde, hasta)
+        .order_by("fecha", "id")
+        .values_list("fecha", "descripcion", "categoria__nombre", "monto")
+        .iterator(chunk_size=TAMANO_BLOQUE)
+    )
+    for fecha, descripcion, categoria, monto in filas:
+        hoja.append([fecha, descripcion, categoria or "", monto])
+
+    resumen = libro.create_sheet("Resumen")
+    resumen.append(_encabezado(resumen, ["Concepto", "Valor"]))
+    resumen.append(["Cuenta", cuenta.nombre])
+    resumen.append(["Desde", desde])
+    resumen.append(["Hasta", hasta])
+    resumen.append(["Saldo inicial", saldo_inicial])
+    resumen.append(["Saldo final", saldo_final])
+
+    archivo = tempfile.TemporaryFile()
+    libro.save(archivo)
+    archivo.seek(0)
+    return archivo
+
+
+def respuesta_excel(archivo, nombre_archivo):
+    """``FileResponse`` que envía (y al cerrar, borra) el archivo temporal."""
+    return FileResponse(
+        archivo,
+        as_attachment=True,
+        filename=nombre_archivo,
+        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    )
+
+
+# --- Transacciones (resultado filtrado) -----------------------------------------
+
+COLUMNAS_TRANSACCIONES = [
+    ("id", "ID"),
+    ("fecha", "Fecha"),
+    ("descripcion", "Descripción"),
+    ("monto", "Monto"),
+    ("moneda", "Moneda"),
+    ("tipo", "Tipo"),
+    ("estado", "Estado"),
+    ("cuenta_origen__nombre", "Cuenta origen"),
+    ("cuenta_destino__nombre", "Cuenta destino"),
+    ("categoria__nombre", "Categoría"),
+    ("conciliado", "Conciliado"),
+    ("ajuste", "Ajuste"),
+]
+
+
+def lineas_transacciones(queryset):
+    filas = (
+        queryset.order_by("-fecha", "-id")
+        .values_list(*(campo for campo, _ in COLUMNAS_TRANSACCIONES))
+        .iterator(chunk_size=TAMANO_BLOQUE)
+    )
+    return _lineas([titulo for _, titulo in COLUMNAS_TRANSACCIONES], filas)
+
+
+# --- Libro completo (asientos con sus partidas) ---------------------------------
+
+COLUMNAS_LIBRO = [
+    ("asiento__fecha", "Fecha"),
+    ("asiento_id", "Asiento"),
+    ("asiento__descripcion", "Descripción asiento"),
+    ("asiento__estado", "Estado"),
+    ("asiento__transaccion_origen_id", "Transacción"),
+    ("id", "Partida"),
+    ("cuenta_id", "Cuenta ID"),
+    ("cuenta__nombre", "Cuenta"),
+    ("debito", "Débito"),
+    ("credito", "Crédito"),
+    ("descripcion", "Descripción partida"),
+]
+
+
+def lineas_libro(desde=None, hasta=None):
+    """Una línea por partida, en orden de fecha y asiento."""
+    partidas = PartidaContable.objects.all()
+    if desde:
+        partidas = partidas.filter(asiento__fecha__gte=desde)
+    if hasta:
+        partidas = partidas.filter(asiento__fecha__lte=hasta)
+    filas = (
+        partidas.order_by("asiento__fecha", "asiento_id", "id")
+        .values_list(*(campo for campo, _ in COLUMNAS_LIBRO))
+        .iterator(chunk_size=TAMANO_BLOQUE)
+    )
+    return _lineas([titulo for _, titulo in COLUMNAS_LIBRO], filas)
@@ -0,0 +1,176 @@
+"""
+Paginación por cursor (keyset).
+
+En vez de ``OFFSET`` + ``COUNT(*)`` (``Paginator``), cada página se pide con
+``WHERE (fecha, id) < (última fecha, último id) ORDER BY -fecha, -id LIMIT n``,
+así que la página 500 cuesta lo mismo que la primera. Los cursores son
+tokens opacos (JSON en base64) con la dirección y la llave de la fila
+frontera; un cursor inválido o viejo regresa a la primera página.
+
+Las columnas del orden deben ser no nulas y, juntas, únicas (por eso el
+orden termina siempre en ``id``).
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+
+ORDEN_MOVIMIENTOS = ('-fecha', '-id')
+POR_PAGINA_MAXIMO = 500
+LIMITE_CONTEO = 1000
+
+# Direcciones del cursor: filas después / antes de la llave, o última página
+SIGUIENTE, ANTERIOR, ULTIMA = 's', 'a', 'u'
+
+
+def _codificar(datos):
+    crudo = json.dumps(datos, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip('=')
+
+
+def _decodificar(token):
+    try:
+        crudo = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        datos = json.loads(crudo)
+    except (binascii.Error, ValueError):
+        return None
+    return datos if isinstance(datos, dict) else None
+
+
+def _campos(modelo, orden):
+    """[(campo del modelo, descendente), ...] para un orden tipo ('-fecha', '-id')."""
+    return [
+        (modelo._meta.get_field(nombre.lstrip('-')), nombre.startswith('-'))
+        for nombre in orden
+    ]
+
+
+def _llave(obj, campos):
+    return [campo.value_to_string(obj) for campo, _ in campos]
+
+
+def _valores(llave, campos):
+    if not isinstance(llave, list) or len(llave) != len(campos):
+        return None
+    try:
+        return [campo.to_python(valor) for (campo, _), valor in zip(campos, llave)]
+    except (ValidationError, TypeError, ValueError):
+        return None
+
+
+def _despues_de(campos, valores, hacia_atras):
+    """
+    Filas estrictamente posteriores a ``valores`` en el orden dado (o
+    anteriores si ``hacia_atras``): comparación de tuplas expandida en ORs.
+    """
+    filtro = Q()
+    for i, (campo, descendente) in enumerate(campos):
+        iguales = {c.name: v for (c, _), v in zip(campos[:i], valores[:i])}
+        lookup = 'lt' if descendente != hacia_atras else 'gt'
+        filtro |= Q(**iguales, **{f'{campo.name}__{lookup}': valores[i]})
+    return filtro
+
+
+def total_aproximado(queryset, limite=LIMITE_CONTEO):
+    """
+    ``(total, exacto)`` sin recorrer toda la consulta: en PostgreSQL, la
+    estimación del planificador; en otros motores, un conteo que se detiene
+    en ``limite`` (``exacto`` es falso si se alcanzó).
+    """
+    queryset = queryset.order_by()
+    conexion = connections[queryset.db]
+    if conexion.vendor == 'postgresql':
+        sql, params = queryset.query.sql_with_params()
+        with conexion.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows']), False
+    contadas = queryset[:limite + 1].count()
+    return min(contadas, limite), contadas <= limite
+
+
+class PaginaKeyset:
+    """
+    Página de resultados con la interfaz mínima de ``Page`` que usan las
+    plantillas (iterable, ``has_next``, ``has_previous``,
+    ``has_other_pages``) más los cursores para navegar.
+    """
+
+    ultima_cursor = _codificar({'d': ULTIMA})
+
+    def __init__(self, object_list, por_pagina, next_cursor=None, previous_cursor=None,
+                 total=None, total_exacto=False):
+        self.object_list = object_list
+        self.por_pagina = por_pagina
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.total = total
+        self.total_exacto = total_exacto
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, indice):
+        return self.object_list[indice]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def paginar(queryset, cursor=None, por_pagina=50, orden=ORDEN_MOVIMIENTOS, contar=False):
+    """
+    Una página de ``queryset`` según ``cursor`` (o la primera si no hay).
+    Hace una sola consulta de ``por_pagina + 1`` filas; con ``contar`` añade
+    ``total_aproximado``.
+    """
+    por_pagina = max(1, min(int(por_pagina), POR_PAGINA_MAXIMO))
+    campos = _campos(queryset.model, orden)
+    datos = _decodificar(cursor) if cursor else None
+    direccion = datos.get('d') if datos else None
+    valores = _valores(datos.get('v'), campos) if direccion in (SIGUIENTE, ANTERIOR) else None
+    if valores is None and direccion != ULTIMA:
+        direccion = None
+    hacia_atras = direccion in (ANTERIOR, ULTIMA)
+
+    if hacia_atras:
+        invertido = [nombre[1:] if nombre.startswith('-') else f'-{nombre}' for nombre in orden]
+        qs = queryset.order_by(*invertido)
+    else:
+        qs = queryset.order_by(*orden)
+    if valores is not None:
+        qs = qs.filter(_despues_de(campos, valores, hacia_atras))
+
+    filas = list(qs[:por_pagina + 1])
+    hay_mas = len(filas) > por_pagina
+    filas = filas[:por_pagina]
+    if hacia_atras:
+        filas.reverse()
+        hay_siguiente, hay_anterior = direccion == ANTERIOR, hay_mas
+    else:
+        hay_siguiente, hay_anterior = hay_mas, direccion == SIGUIENTE
+
+    pagina = PaginaKeyset(
+        filas,
+        por_pagina,
+        next_cursor=_codificar({'d': SIGUIENTE, 'v': _llave(filas[-1], campos)})
+        if hay_siguiente and filas else None,
+        previous_cursor=_codificar({'d': ANTERIOR, 'v': _llave(filas[0], campos)})
+        if hay_anterior and filas else None,
+    )
+    if contar:
+        pagina.total, pagina.total_exacto = total_aproximado(queryset)
+    return pagina
@@ -0,0 +1,265 @@
+"""
+Estados de cuenta en PDF con caché en disco.
+
+Cada PDF se guarda como ``<huella>.pdf`` en ``settings.PDF_CACHE_DIR``; la
+huella es un SHA-256 de lo que se imprime (encabezado, saldos persistidos
+del periodo y sus movimientos), así que dos periodos con el mismo
+contenido comparten archivo y cualquier cambio en los datos produce otro
+nombre: no hay que invalidar nada.
+
+Para un periodo abierto se leen sus movimientos (una consulta) y, si el
+archivo de su huella ya existe, se sirve sin dibujar. Un periodo cerrado
+está congelado: al generarlo se deja un apuntador ``cerrados/<pk>`` con
+``VERSION_FORMATO``, su ``fecha_cierre`` y su huella, y las descargas
+siguientes van directo al archivo sin consultar los movimientos. Reabrir y
+volver a cerrar (cambia ``fecha_cierre``) o cambiar ``VERSION_FORMATO``
+obliga a generarlo de nuevo.
+
+Desalojo LRU por tamaño: cada acierto actualiza la fecha de modificación
+del archivo y, tras escribir uno nuevo, si el directorio pasa de
+``settings.PDF_CACHE_MAX_MB`` se borran los menos usados.
+"""
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.units import inch
+from reportlab.pdfgen import canvas
+
+from ..models import Periodo, Transaccion
+
+# Cambiar al modificar el dibujo para no servir PDFs con el formato anterior
+VERSION_FORMATO = "2"
+
+
+def directorio():
+    ruta = Path(settings.PDF_CACHE_DIR)
+    (ruta / "cerrados").mkdir(parents=True, exist_ok=True)
+    return ruta
+
+
+def _movimientos(periodo):
+    """Movimientos del periodo con su saldo corrido (``con_saldo_corrido``)."""
+    return list(
+        Transaccion.objects.de_cuenta(
+            periodo.cuenta_id,
+            periodo.fecha_inicio or periodo.fecha_corte,
+            periodo.fecha_fin_periodo or periodo.fecha_corte,
+        )
+        # Mismo criterio que Periodo.saldo_final: las salidas suman y las
+        # entradas restan, sea cual sea la naturaleza de la cuenta
+        .con_saldo_corrido(periodo.cuenta, periodo.saldo_inicial, naturaleza="ACREEDORA")
+        .order_by("fecha", "id")
+        .values_list("fecha", "descripcion", "monto", "saldo_corrido")
+    )
+
+
+def _encabezado(periodo):
+    """Todo lo que el PDF imprime fuera de la tabla de movimientos."""
+    return (
+        VERSION_FORMATO,
+        periodo.cuenta.nombre,
+        periodo.fecha_corte,
+        periodo.fecha_fin_periodo,
+        periodo.usar_saldo_prev,
+        periodo.saldo_inicial,
+        periodo.total_cargos,
+        periodo.total_abonos,
+        periodo.saldo,
+    )
+
+
+def huella(encabezado, movimientos):
+    h = hashlib.sha256(repr(encabezado).encode())
+    for fila in movimientos:
+        h.update(repr(fila).encode())
+    return h.hexdigest()
+
+
+def dibujar(destino, encabezado, movimientos):
+    """Dibuja el estado de cuenta en ``destino`` (archivo o respuesta)."""
+    _, cuenta, fecha_corte, fecha_fin, usar_saldo_prev, saldo_inicial, cargos, abonos, saldo = encabezado
+    p = canvas.Canvas(destino, pagesize=letter)
+    width, height = letter
+
+    # Encabezado
+    p.setFont("Helvetica-Bold", 16)
+    p.drawString(1*inch, height-1*inch, f"Estado de Cuenta: {cuenta}")
+    p.setFont("Helvetica", 12)
+    p.drawString(1*inch, height-1.2*inch, f"Periodo: {fecha_corte} - {fecha_fin}")
+    if usar_saldo_prev:
+        p.drawString(1*inch, height-1.4*inch, f"Saldo inicial: ${saldo_inicial:.2f}")
+
+    # Encabezados de tabla
+    p.setFont("Helvetica-Bold", 10)
+    p.drawString(1*inch, height-1.6*inch, "Fecha")
+    p.drawString(2.0*inch, height-1.6*inch, "Descripción")
+    p.drawString(5.0*inch, height-1.6*inch, "Cargos")
+    p.drawString(6.0*inch, height-1.6*inch, "Abonos")
+    p.drawString(7.0*inch, height-1.6*inch, "Saldo")
+    p.line(1*inch, height-1.65*inch, 7.5*inch, height-1.65*inch)
+
+    y_position = height - 1.8*inch
+    p.setFont("Helvetica", 10)
+
+    for fecha, descripcion, monto, saldo_corrido in movimientos:
+        p.drawString(1*inch, y_position, fecha.strftime("%d/%m/%Y"))
+
+        # Descripción (limitada a 40 caracteres)
+        desc = descripcion[:40] + "..." if len(descripcion) > 40 else descripcion
+        p.drawString(2.0*inch, y_position, desc)
+
+        # Cargos y abonos en columnas separadas, alineados a la derecha
+        if monto < 0:
+            p.drawRightString(5.5*inch, y_position, f"${abs(monto):.2f}")
+        else:
+            p.drawRightString(6.5*inch, y_position, f"${monto:.2f}")
+        p.drawRightString(7.5*inch, y_position, f"${saldo_corrido:.2f}")
+
+        y_position -= 0.2*inch
+
+        # Nueva página si se acaba el espacio
+        if y_position < 1*inch:
+            p.showPage()
+            p.setFont("Helvetica-Bold", 10)
+            p.drawString(1*inch, height-0.2*inch, "Fecha")
+            p.drawString(2.0*inch, height-0.2*inch, "Descripción")
+            p.drawString(5.0*inch, height-0.2*inch, "Cargos")
+            p.drawString(6.0*inch, height-0.2*inch, "Abonos")
+            p.drawString(7.0*inch, height-0.2*inch, "Saldo")
+            p.line(1*inch, height-0.25*inch, 7.5*inch, height-0.25*inch)
+            p.setFont("Helvetica", 10)
+            y_position = height - 0.4*inch
+
+    # Totales
+    p.setFont("Helvetica-Bold", 12)
+    p.drawString(1*inch, y_position - 0.4*inch, f"Total Cargos: ${abs(cargos):.2f}")
+    p.drawString(1*inch, y_position - 0.6*inch, f"Total Abonos: ${abonos:.2f}")
+    p.drawString(1*inch, y_position - 0.8*inch, f"Saldo Final: ${saldo:.2f}")
+    p.line(1*inch, y_position - 0.35*inch, 7.5*inch, y_position - 0.35*inch)
+
+    p.showPage()
+    p.save()
+
+
+def _apuntador(periodo):
+    return directorio() / "cerrados" / str(periodo.pk)
+
+
+def _leer_apuntador(periodo):
+    """Archivo del periodo cerrado si el apuntador corresponde a su cierre actual."""
+    try:
+        version, cierre, clave = _apuntador(periodo).read_text().split()
+    except (FileNotFoundError, ValueError):
+        # Apuntadores sin versión (formato anterior) cuentan como fallo
+        return None
+    if version != VERSION_FORMATO or cierre != periodo.fecha_cierre.isoformat():
+        return None
+    return directorio() / f"{clave}.pdf"
+
+
+def _escribir_atomico(ruta, escribir):
+    """Escribe en un temporal del mismo directorio y lo renombra (visible completo o nada)."""
+    fd, temporal = tempfile.mkstemp(dir=ruta.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            escribir(f)
+        os.replace(temporal, ruta)
+    except BaseException:
+        os.unlink(temporal)
+        raise
+
+
+def _tocar(ruta):
+    """Marca el archivo como recién usado; False si ya no existe (desalojado)."""
+    try:
+        os.utime(ruta)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def podar(maximo=None):
+    """Borra los PDFs menos usados hasta quedar en el 90% de ``maximo`` bytes."""
+    if maximo is None:
+        maximo = settings.PDF_CACHE_MAX_MB * 1024 * 1024
+    archivos = []
+    for ruta in directorio().glob("*.pdf"):
+        try:
+            info = ruta.stat()
+        except FileNotFoundError:
+            continue
+        archivos.append((info.st_mtime, info.st_size, ruta))
+    total = sum(tamano for _, tamano, _ in archivos)
+    if total <= maximo:
+        return 0
+    borrados = 0
+    for _, tamano, ruta in sorted(archivos):
+        if total <= maximo * 0.9:
+            break
+        try:
+            ruta.unlink()
+        except FileNotFoundError:
+            pass
+        total -= tamano
+        borrados += 1
+    return borrados
+
+
+def pdf_periodo(periodo):
+    """
+    Ruta del PDF del periodo en la caché y si hubo que generarlo
+    (``(ruta, generado)``).
+    """
+    if periodo.cerrado and periodo.fecha_cierre:
+        ruta = _leer_apuntador(periodo)
+        if ruta and _tocar(ruta):
+            return ruta, False
+
+    encabezado = _encabezado(periodo)
+    movimientos = _movimientos(periodo)
+    ruta = directorio() / f"{huella(encabezado, movimientos)}.pdf"
+    generado = not _tocar(ruta)
+    if generado:
+        _escribir_atomico(ruta, lambda f: dibujar(f, encabezado, movimientos))
+        podar()
+
+    if periodo.cerrado and periodo.fecha_cierre:
+        _escribir_atomico(
+            _apuntador(periodo),
+            lambda f: f.write(f"{VERSION_FORMATO} {periodo.fecha_cierre.isoformat()} {ruta.stem}".encode()),
+        )
+    return ruta, generado
+
+
+def abrir_pdf_periodo(periodo):
+    """
+    PDF del periodo abierto para lectura. Otro proceso puede desalojarlo
+    (``podar``) entre ``pdf_periodo`` y la apertura: si ya no está, se genera
+    de nuevo una vez. Ya abierto, borrarlo no corta la descarga.
+    """
+    ruta, _ = pdf_periodo(periodo)
+    try:
+        return open(ruta, "rb")
+    except FileNotFoundError:
+        ruta, _ = pdf_periodo(periodo)
+        return open(ruta, "rb")
+
+
+# --- Generación por lotes (procesos) ------------------------------------------
+
+def inicializar_proceso():
+    """``initializer`` de los procesos de trabajo (con ``spawn`` Django no viene cargado)."""
+    import django
+
+    django.setup()
+
+
+def generar_periodo(periodo_id):
+    """Trabajo de un proceso: ``(periodo_id, nombre de archivo, generado)``."""
+    periodo = Periodo.objects.select_related("cuenta").get(pk=periodo_id)
+    ruta, generado = pdf_periodo(periodo)
+    return periodo_id, ruta.name, generado
@@ -0,0 +1,122 @@
+"""
+Perfil de SQL por petición.
+
+``RegistroSQL`` se instala como ``execute_wrapper`` de la conexión durante
+una petición (ver ``core.middleware.PresupuestoSQLMiddleware``) y cuenta
+las consultas, el tiempo en la base y cuántas veces se repite cada
+sentencia. La huella de una sentencia es su SQL con los literales y las
+listas ``IN (...)`` colapsados, así que la misma consulta ejecutada fila
+por fila (N+1) se acumula en una sola huella.
+
+El resumen por vista (peticiones, consultas, tiempo total y máximo,
+peticiones fuera de presupuesto) se guarda en la caché para la página
+``diagnostico/sql/``; es aproximado si varios procesos escriben a la vez.
+"""
+import re
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+CLAVE_RESUMEN = 'perfil_sql:resumen'
+# Peticiones que no resolvieron a una vista (404): una sola fila en el resumen,
+# para que rutas al azar no lo hagan crecer sin límite
+SIN_RESOLVER = '<sin resolver>'
+
+_LISTA_IN = re.compile(r"\((?:\s*%s\s*,)+\s*%s\s*\)")
+_CADENA = re.compile(r"'(?:[^']|'')*'")
+_NUMERO = re.compile(r"\b\d+(?:\.\d+)?\b")
+_COLUMNAS = re.compile(r"^SELECT .*? FROM ", re.DOTALL)
+
+
+def huella(sql):
+    """SQL normalizado: misma huella para la misma consulta con otros valores."""
+    sql = _LISTA_IN.sub("(...)", sql)
+    sql = _CADENA.sub("?", sql)
+    return _NUMERO.sub("?", sql)
+
+
+def abreviar(sql, largo=300):
+    """Huella legible para el log: sin la lista de columnas del SELECT."""
+    return _COLUMNAS.sub("SELECT … FROM ", sql, count=1)[:largo]
+
+
+def presupuesto():
+    """``(consultas, milisegundos, repeticiones)`` máximos por petición."""
+    return (
+        getattr(settings, 'SQL_PRESUPUESTO_CONSULTAS', 50),
+        getattr(settings, 'SQL_PRESUPUESTO_MS', 500),
+        getattr(settings, 'SQL_PRESUPUESTO_REPETICIONES', 10),
+    )
+
+
+class RegistroSQL:
+    """``execute_wrapper`` que acumula conteo, tiempo y huellas de las consultas."""
+
+    def __init__(self):
+        self.consultas = 0
+        self.segundos = 0.0
+        self.huellas = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.segundos += time.perf_counter() - inicio
+            self.consultas += 1
+            self.huellas[huella(sql)] += 1
+
+    @property
+    def milisegundos(self):
+        return self.segundos * 1000
+
+    def repetidas(self, minimo):
+        """``[(huella, veces)]`` ejecutadas al menos ``minimo`` veces, de más a menos."""
+        return [(sql, veces) for sql, veces in self.huellas.most_common() if veces >= minimo]
+
+    def excesos(self):
+        """Motivos por los que la petición se sale del presupuesto (vacío si no)."""
+        max_consultas, max_ms, max_repeticiones = presupuesto()
+        motivos = []
+        if self.consultas > max_consultas:
+            motivos.append(f"{self.consultas} consultas > {max_consultas}")
+        if self.milisegundos > max_ms:
+            motivos.append(f"{self.milisegundos:.0f} ms en BD > {max_ms}")
+        if self.repetidas(max_repeticiones):
+            motivos.append(f"sentencias repetidas ≥ {max_repeticiones} veces (posible N+1)")
+        return motivos
+
+
+def registrar(vista, registro, excedida):
+    """Suma la petición al resumen de ``vista``."""
+    resumen = cache.get(CLAVE_RESUMEN) or {}
+    fila = resumen.setdefault(vista, {
+        'peticiones': 0, 'consultas': 0, 'tiempo_ms': 0.0, 'max_ms': 0.0,
+        'max_consultas': 0, 'excedidas': 0,
+    })
+    fila['peticiones'] += 1
+    fila['consultas'] += registro.consultas
+    fila['tiempo_ms'] += registro.milisegundos
+    fila['max_ms'] = max(fila['max_ms'], registro.milisegundos)
+    fila['max_consultas'] = max(fila['max_consultas'], registro.consultas)
+    fila['excedidas'] += bool(excedida)
+    cache.set(CLAVE_RESUMEN, resumen, None)
+
+
+def resumen():
+    """Vistas ordenadas por tiempo total en la base, con promedios."""
+    filas = []
+    for vista, fila in (cache.get(CLAVE_RESUMEN) or {}).items():
+        filas.append({
+            'vista': vista,
+            **fila,
+            'prom_consultas': fila['consultas'] / fila['peticiones'],
+            'prom_ms': fila['tiempo_ms'] / fila['peticiones'],
+        })
+    return sorted(filas, key=lambda f: f['tiempo_ms'], reverse=True)
+
+
+def reiniciar():
+    cache.delete(CLAVE_RESUMEN)
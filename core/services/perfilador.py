@@ -0,0 +1,133 @@
+"""
+Perfilado de peticiones con cProfile (bajo demanda, solo staff).
+
+Con ``?perfilar=1`` o la cabecera ``X-Perfilar: 1`` una petición de un
+usuario staff corre bajo ``cProfile`` (ver
+``core.middleware.PerfilPythonMiddleware``). Se guardan dos archivos en
+``settings.PERFIL_DIR`` con el mismo nombre base:
+
+- ``.prof``: estadísticas de ``pstats`` (snakeviz, ``python -m pstats``…)
+- ``.folded``: pilas colapsadas ``a;b;c muestras`` para ``flamegraph.pl``
+  o speedscope, tomadas por ``Muestreo`` cada ``INTERVALO`` mientras corre
+  cProfile (las pilas reflejan su sobrecosto, igual que el ``.prof``).
+
+Retención: se conservan los ``PERFIL_MAX_ARCHIVOS`` perfiles más recientes
+que tengan menos de ``PERFIL_DIAS`` días.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+
+PARAMETRO = 'perfilar'
+CABECERA = 'X-Perfilar'
+PROFUNDIDAD_MAXIMA = 200
+# Segundos entre muestras de la pila para el .folded
+INTERVALO = 0.001
+_NOMBRE_VALIDO = re.compile(r"^[\w.-]+\.(prof|folded)$")
+
+
+def directorio():
+    ruta = Path(settings.PERFIL_DIR)
+    ruta.mkdir(parents=True, exist_ok=True)
+    return ruta
+
+
+def solicitado(request):
+    """La petición pide perfilarse (el permiso se comprueba aparte)."""
+    return request.GET.get(PARAMETRO) == '1' or request.headers.get(CABECERA) == '1'
+
+
+def _etiqueta(codigo):
+    return f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})".replace(";", ",")
+
+
+class Muestreo(threading.Thread):
+    """
+    Hilo que cada ``INTERVALO`` segundos toma la pila del hilo que atiende la
+    petición (``sys._current_frames``) y cuenta cuántas veces aparece cada
+    una: las pilas colapsadas del ``.folded``. cProfile solo guarda pares
+    llamador → llamado, no pilas completas, así que de él no se puede sacar
+    una gráfica de llamas fiel.
+    """
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.objetivo = threading.get_ident()
+        self.pilas = Counter()
+        self._detener = threading.Event()
+
+    def run(self):
+        while not self._detener.wait(INTERVALO):
+            marco = sys._current_frames().get(self.objetivo)
+            pila = []
+            while marco is not None and len(pila) < PROFUNDIDAD_MAXIMA:
+                pila.append(_etiqueta(marco.f_code))
+                marco = marco.f_back
+            if pila:
+                self.pilas[";".join(reversed(pila))] += 1
+
+    def detener(self):
+        self._detener.set()
+        self.join()
+
+    def colapsadas(self):
+        """Líneas ``pila;de;llamadas muestras`` para flamegraph.pl/speedscope."""
+        return [f"{pila} {veces}" for pila, veces in sorted(self.pilas.items())]
+
+
+def guardar(perfil, muestreo, vista, segundos):
+    """Escribe ``.prof`` y ``.folded``; devuelve el nombre base."""
+    base = "{}_{}_{}ms".format(
+        datetime.now().strftime("%Y%m%d-%H%M%S-%f"),
+        re.sub(r"[^\w.-]+", "-", vista).strip("-")[:60] or "peticion",
+        round(segundos * 1000),
+    )
+    carpeta = directorio()
+    perfil.dump_stats(carpeta / f"{base}.prof")
+    (carpeta / f"{base}.folded").write_text(
+        "".join(f"{linea}\n" for linea in muestreo.colapsadas()), encoding="utf-8"
+    )
+    podar()
+    return base
+
+
+def podar():
+    """Aplica la retención (cantidad máxima y antigüedad) a los perfiles."""
+    limite = time.time() - settings.PERFIL_DIAS * 86400
+    perfiles = sorted(directorio().glob("*.prof"), key=lambda r: r.stat().st_mtime, reverse=True)
+    for posicion, ruta in enumerate(perfiles):
+        if posicion >= settings.PERFIL_MAX_ARCHIVOS or ruta.stat().st_mtime < limite:
+            ruta.unlink(missing_ok=True)
+            ruta.with_suffix(".folded").unlink(missing_ok=True)
+
+
+def listar():
+    """Perfiles guardados, del más reciente al más antiguo."""
+    perfiles = []
+    for ruta in sorted(directorio().glob("*.prof"), reverse=True):
+        try:
+            info = ruta.stat()
+        except FileNotFoundError:
+            continue
+        perfiles.append({
+            'nombre': ruta.stem,
+            'fecha': datetime.fromtimestamp(info.st_mtime),
+            'tamano': info.st_size,
+            'folded': ruta.with_suffix(".folded").exists(),
+        })
+    return perfiles
+
+
+def ruta_archivo(nombre):
+    """Ruta de un archivo de perfil por nombre, o ``None`` si no es válido o no existe."""
+    if not _NOMBRE_VALIDO.match(nombre):
+        return None
+    ruta = directorio() / nombre
+    return ruta if ruta.is_file() else None
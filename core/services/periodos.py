@@ -0,0 +1,174 @@
+"""
+Saldos persistidos de los periodos (estados de cuenta).
+
+Cada ``Periodo`` guarda su saldo inicial, totales y saldo final en los
+campos ``*_calc``. Como el saldo inicial de un periodo es el final del
+anterior, en lugar de recorrer la cadena hacia atrás en cada lectura los
+valores se recalculan hacia adelante cuando cambia algo en un periodo
+abierto. Los periodos cerrados quedan congelados.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Sum
+
+from ..models import Periodo, Transaccion
+
+CERO = Decimal('0.00')
+CAMPOS_CALC = ['saldo_inicial_calc', 'total_cargos_calc', 'total_abonos_calc', 'saldo_final_calc']
+
+
+def _totales(periodo_ids):
+    """``{periodo_id: (cargos, abonos)}`` en una sola consulta (``with_totales``)."""
+    return {
+        pk: (cargos, abonos)
+        for pk, cargos, abonos in Periodo.objects.filter(pk__in=periodo_ids)
+        .with_totales()
+        .values_list('pk', 'cargos_periodo', 'abonos_periodo')
+    }
+
+
+def _saldo_historico(periodo):
+    """Primer periodo de la cadena: suma de movimientos previos al corte."""
+    if not periodo.fecha_corte:
+        return CERO
+    return (
+        Transaccion.objects
+        .de_cuenta(periodo.cuenta_id, antes_de=periodo.fecha_corte)
+        .aggregate(total=Sum('monto'))['total'] or CERO
+    )
+
+
+def _aplicar(periodo, saldo_anterior, totales):
+    """Rellena (sin guardar) los campos ``*_calc`` del periodo."""
+    if periodo.saldo_inicial_manual is not None:
+        inicial = periodo.saldo_inicial_manual
+    elif not periodo.usar_saldo_prev:
+        inicial = CERO
+    elif periodo.periodo_anterior_id:
+        inicial = saldo_anterior() or CERO
+    else:
+        inicial = _saldo_historico(periodo)
+
+    cargos, abonos = totales.get(periodo.pk, (CERO, CERO))
+    periodo.saldo_inicial_calc = inicial
+    periodo.total_cargos_calc = cargos
+    periodo.total_abonos_calc = abonos
+    if periodo.cuenta.naturaleza == 'ACREEDORA':
+        periodo.saldo_final_calc = inicial + (abonos - cargos)
+    else:
+        periodo.saldo_final_calc = inicial + (cargos - abonos)
+
+
+def calcular_periodo(periodo):
+    """Calcula en memoria un solo periodo (usa el saldo final ya guardado del anterior)."""
+    if hasattr(periodo, 'cargos_periodo'):
+        # Ya anotado con ``with_totales()``: no volver a consultar
+        totales = {periodo.pk: (periodo.cargos_periodo, periodo.abonos_periodo)}
+    else:
+        totales = _totales([periodo.pk]) if periodo.pk else {}
+    _aplicar(periodo, lambda: periodo.periodo_anterior.saldo_final, totales)
+
+
+def _es_congelado(periodo):
+    return periodo.cerrado and periodo.saldo_final_calc is not None
+
+
+def _profundidad(periodo, por_id, memo):
+    """Número de anteriores de ``periodo`` en su cadena (``memo`` se reutiliza)."""
+    camino, actual = [], periodo
+    while actual is not None and actual.pk not in memo and actual not in camino:
+        camino.append(actual)
+        actual = por_id.get(actual.periodo_anterior_id)
+    nivel = memo.get(actual.pk, -1) if actual is not None else -1
+    for p in reversed(camino):
+        nivel += 1
+        memo[p.pk] = nivel
+    return memo[periodo.pk]
+
+
+def _recorrer(inicios, por_id, hijos, incluir_cerrados):
+    """
+    Recalcula los periodos ``inicios`` y sus sucesores en orden (anterior
+    antes que siguiente) y los guarda con un solo ``bulk_update``. Un
+    periodo cerrado corta el recorrido: sus sucesores parten de su saldo
+    congelado, que no cambia.
+    """
+    cadena, vistos, pendientes = [], set(), list(inicios)
+    while pendientes:
+        actual = pendientes.pop(0)
+        if actual.pk in vistos:
+            continue
+        vistos.add(actual.pk)
+        if _es_congelado(actual) and not incluir_cerrados:
+            continue
+        cadena.append(actual)
+        pendientes.extend(sorted(hijos.get(actual.pk, ()), key=lambda p: (p.fecha_corte is None, p.fecha_corte)))
+
+    if not cadena:
+        return 0
+    # Con varios inicios en la misma cadena el recorrido puede llegar a un
+    # periodo antes que a su anterior: ordenar por profundidad
+    memo = {}
+    cadena.sort(key=lambda p: _profundidad(p, por_id, memo))
+
+    totales = _totales([p.pk for p in cadena])
+    for periodo in cadena:
+        anterior = por_id.get(periodo.periodo_anterior_id)
+        if anterior is not None:
+            saldo_anterior = lambda anterior=anterior: anterior.saldo_final_calc
+        else:
+            saldo_anterior = lambda periodo=periodo: periodo.periodo_anterior.saldo_final
+        _aplicar(periodo, saldo_anterior, totales)
+
+    Periodo.objects.bulk_update(cadena, CAMPOS_CALC)
+    return len(cadena)
+
+
+def _cargar(cuenta_ids):
+    periodos = Periodo.objects.filter(cuenta_id__in=cuenta_ids).select_related('cuenta')
+    por_id = {p.pk: p for p in periodos}
+    hijos = defaultdict(list)
+    for periodo in por_id.values():
+        hijos[periodo.periodo_anterior_id].append(periodo)
+    return por_id, hijos
+
+
+def recalcular_periodos(periodo_ids):
+    """
+    Recalcula hacia adelante las cadenas que contienen ``periodo_ids``.
+    Un periodo cerrado no se toca (ni sus sucesores, que dependen de él).
+    """
+    periodo_ids = {pk for pk in periodo_ids if pk}
+    if not periodo_ids:
+        return 0
+    cuenta_ids = set(
+        Periodo.objects.filter(pk__in=periodo_ids).values_list('cuenta_id', flat=True)
+    )
+    por_id, hijos = _cargar(cuenta_ids)
+    inicios = sorted(
+        (por_id[pk] for pk in periodo_ids if pk in por_id),
+        key=lambda p: (p.fecha_corte is None, p.fecha_corte),
+    )
+    return _recorrer(inicios, por_id, hijos, incluir_cerrados=False)
+
+
+def recalcular_cadena(periodo):
+    """Recalcula ``periodo`` y sus sucesores abiertos."""
+    return recalcular_periodos([periodo.pk])
+
+
+def recalcular_cuentas(cuenta_ids=None, incluir_cerrados=False):
+    """
+    Recalcula en una pasada iterativa todas las cadenas de ``cuenta_ids``
+    (o de todas las cuentas con periodos). ``incluir_cerrados`` vuelve a
+    congelar también los periodos cerrados.
+    """
+    if cuenta_ids is None:
+        cuenta_ids = set(Periodo.objects.values_list('cuenta_id', flat=True))
+    por_id, hijos = _cargar(cuenta_ids)
+    raices = sorted(
+        (p for p in por_id.values() if p.periodo_anterior_id not in por_id),
+        key=lambda p: (p.fecha_corte is None, p.fecha_corte),
+    )
+    return _recorrer(raices, por_id, hijos, incluir_cerrados)
@@ -0,0 +1,125 @@
+"""
+Catálogos JSON (cuentas, categorías) con caché y validación condicional.
+
+Cada respuesta se identifica por las versiones de los datos de los que
+depende (ver ``estadisticas.versiones``; las señales de ``Cuenta``,
+``Categoria`` y ``TipoCuenta`` las rotan). Con esas versiones se arma el
+ETag: si el navegador manda el mismo en ``If-None-Match`` se contesta 304
+sin cuerpo; si no, el JSON sale ya serializado de la caché. Cuando falta,
+se construye con una sola consulta (``select_related`` o el árbol de
+categorías completo en memoria, sin un acceso por fila a ``tipo`` o
+``padre``).
+"""
+import hashlib
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from ..models import Categoria, Cuenta
+from .estadisticas import versiones, vigencia
+
+TTL_REFERENCIAS = 24 * 60 * 60
+CUENTAS = ('cuentas', 'tipos_cuenta')
+CATEGORIAS = ('categorias',)
+
+
+def _etag(clave, tokens):
+    return hashlib.sha1(f"{clave}:{':'.join(tokens)}".encode()).hexdigest()
+
+
+def _empaquetar(datos):
+    return json.dumps(datos, cls=DjangoJSONEncoder).encode(), int(time.time())
+
+
+def _responder(request, etag, entrada):
+    cuerpo, modificado = entrada
+    response = get_conditional_response(request, etag=quote_etag(etag), last_modified=modificado)
+    if response is None:
+        response = HttpResponse(cuerpo, content_type='application/json')
+    response.headers['ETag'] = quote_etag(etag)
+    response.headers['Last-Modified'] = http_date(modificado)
+    # El navegador guarda la respuesta pero revalida en cada uso (304 si no cambió)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _entrada(clave, conjuntos, construir, ttl):
+    """``(etag, (cuerpo, modificado))`` de la caché, o construido y guardado."""
+    etag = _etag(clave, versiones(*conjuntos))
+    clave_cache = f'referencias:{clave}:{etag}'
+    entrada = cache.get(clave_cache)
+    if entrada is None:
+        entrada = _empaquetar(construir())
+        cache.set(clave_cache, entrada, vigencia(ttl))
+    return etag, entrada
+
+
+def respuesta_referencia(request, clave, conjuntos, construir, ttl=TTL_REFERENCIAS):
+    """
+    ``HttpResponse`` JSON (o 304) con la lista que devuelve ``construir()``,
+    cacheada por ``clave`` y las versiones de ``conjuntos``.
+    """
+    return _responder(request, *_entrada(clave, conjuntos, construir, ttl))
+
+
+async def arespuesta_referencia(request, clave, conjuntos, construir, ttl=TTL_REFERENCIAS):
+    """
+    ``respuesta_referencia`` para vistas async. Versiones, caché y
+    ``construir`` (ORM) van en un solo ``sync_to_async``: la API async de
+    los backends de caché de Django también salta a un hilo en cada llamada.
+    """
+    etag, entrada = await sync_to_async(_entrada)(clave, conjuntos, construir, ttl)
+    return _responder(request, etag, entrada)
+
+
+def lista_cuentas(cuentas):
+    """``[{id, text, naturaleza}]`` de ``cuentas`` (una consulta, con su tipo)."""
+    return [
+        {"id": c.id, "text": str(c), "naturaleza": c.naturaleza}
+        for c in cuentas.select_related('tipo').order_by('nombre')
+    ]
+
+
+def lista_categorias():
+    """``[{id, text}]`` de todas las categorías con el mismo texto que ``str()``."""
+    categorias = list(Categoria.objects.order_by('nombre'))
+    por_id = {cat.pk: cat for cat in categorias}
+    textos = {}
+
+    def texto(cat):
+        # Igual que Categoria.__str__, resolviendo el padre desde memoria
+        if cat.pk not in textos:
+            padre = por_id.get(cat.padre_id)
+            base = f"{texto(padre)} › {cat.nombre}" if padre else cat.nombre
+            textos[cat.pk] = f"{base} ({cat.get_tipo_display()})"
+        return textos[cat.pk]
+
+    return [{"id": cat.id, "text": texto(cat)} for cat in categorias]
+
+
+def lista_autocomplete(grupo):
+    """Cuentas de un grupo con su tipo y saldo actual (``cuentas_autocomplete``)."""
+    if not grupo:
+        return []
+    cuentas = (
+        Cuenta.objects.filter(tipo__grupo=grupo)
+        .select_related('tipo')
+        .with_saldos()
+        .order_by('nombre')
+    )
+    return [{
+        'id': c.id,
+        'text': f"{c.nombre} ({c.tipo.nombre})",
+        'nombre': c.nombre,
+        'numero': c.referencia,
+        'naturaleza': c.naturaleza,
+        'grupo': c.tipo.grupo,
+        'tipo': c.tipo.nombre,
+        'saldo': float(c.saldo_actual) if c.saldo_actual else 0.0
+    } for c in cuentas]
@@ -0,0 +1,257 @@
+"""
+Servicio de saldos diarios (snapshots) por cuenta.
+
+Mantiene la tabla ``SaldoDiario`` sincronizada con las partidas contables:
+cada fila guarda los débitos/créditos del día y el acumulado
+Σ(débito − crédito) hasta esa fecha, de modo que ``Cuenta.saldo()`` lee una
+sola fila en lugar de sumar todo el historial.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Sum
+
+from ..models import PartidaContable, SaldoDiario, Transaccion, importe_en_cuenta
+
+CERO = Decimal('0.00')
+
+
+def aplicar_movimiento(cuenta_id, fecha, debito=CERO, credito=CERO):
+    """
+    Aplica un movimiento (positivo o negativo) al snapshot de ``fecha``
+    y desplaza el acumulado de todos los días posteriores.
+    """
+    debito = debito or CERO
+    credito = credito or CERO
+    delta = debito - credito
+    if not debito and not credito:
+        return
+
+    with transaction.atomic():
+        fila = (
+            SaldoDiario.objects.select_for_update()
+            .filter(cuenta_id=cuenta_id, fecha=fecha)
+            .first()
+        )
+        if fila:
+            SaldoDiario.objects.filter(pk=fila.pk).update(
+                debitos=F('debitos') + debito,
+                creditos=F('creditos') + credito,
+                saldo_acumulado=F('saldo_acumulado') + delta,
+            )
+            if debito < 0 or credito < 0:
+                # Reversión: si el día quedó sin movimientos ya no aporta nada
+                SaldoDiario.objects.filter(pk=fila.pk, debitos=0, creditos=0).delete()
+        else:
+            previo = (
+                SaldoDiario.objects
+                .filter(cuenta_id=cuenta_id, fecha__lt=fecha)
+                .order_by('-fecha')
+                .values_list('saldo_acumulado', flat=True)
+                .first()
+            ) or CERO
+            SaldoDiario.objects.create(
+                cuenta_id=cuenta_id,
+                fecha=fecha,
+                debitos=debito,
+                creditos=credito,
+                saldo_acumulado=previo + delta,
+            )
+
+        SaldoDiario.objects.filter(cuenta_id=cuenta_id, fecha__gt=fecha).update(
+            saldo_acumulado=F('saldo_acumulado') + delta
+        )
+
+
+def aplicar_movimientos(movimientos, batch_size=1000):
+    """
+    Aplica en bloque una lista de ``(cuenta_id, fecha, debito, credito)``.
+
+    Por cada cuenta lee una sola vez los snapshots a partir de la fecha más
+    antigua afectada, recalcula en memoria y guarda con ``bulk_update`` /
+    ``bulk_create``: un lote grande cuesta unas pocas consultas por cuenta
+    en lugar de varias por partida.
+    """
+    por_cuenta = defaultdict(lambda: defaultdict(lambda: [CERO, CERO]))
+    for cuenta_id, fecha, debito, credito in movimientos:
+        acumulado = por_cuenta[cuenta_id][fecha]
+        acumulado[0] += debito or CERO
+        acumulado[1] += credito or CERO
+
+    with transaction.atomic():
+        for cuenta_id in sorted(por_cuenta):
+            por_fecha = por_cuenta[cuenta_id]
+            desde = min(por_fecha)
+            existentes = {
+                fila.fecha: fila
+                for fila in SaldoDiario.objects.select_for_update()
+                .filter(cuenta_id=cuenta_id, fecha__gte=desde)
+            }
+            anterior = saldo_acumulado(cuenta_id, desde - timedelta(days=1))
+
+            desplazamiento = CERO
+            modificados, nuevos, vacios = [], [], []
+            for fecha in sorted(set(existentes) | set(por_fecha)):
+                debito, credito = por_fecha.get(fecha, (CERO, CERO))
+                desplazamiento += debito - credito
+                fila = existentes.get(fecha)
+                if fila:
+                    fila.debitos += debito
+                    fila.creditos += credito
+                    fila.saldo_acumulado += desplazamiento
+                    if fila.debitos or fila.creditos:
+                        modificados.append(fila)
+                    else:
+                        vacios.append(fila.pk)
+                else:
+                    fila = SaldoDiario(
+                        cuenta_id=cuenta_id,
+                        fecha=fecha,
+                        debitos=debito,
+                        creditos=credito,
+                        saldo_acumulado=anterior + debito - credito,
+                    )
+                    nuevos.append(fila)
+                anterior = fila.saldo_acumulado
+
+            SaldoDiario.objects.bulk_update(
+                modificados, ['debitos', 'creditos', 'saldo_acumulado'], batch_size=batch_size
+            )
+            SaldoDiario.objects.bulk_create(nuevos, batch_size=batch_size)
+            if vacios:
+                SaldoDiario.objects.filter(pk__in=vacios).delete()
+
+
+def saldo_acumulado(cuenta_id, as_of_date=None):
+    """Σ(débito − crédito) de la cuenta hasta ``as_of_date`` (sin signo de naturaleza)."""
+    qs = SaldoDiario.objects.filter(cuenta_id=cuenta_id)
+    if as_of_date:
+        qs = qs.filter(fecha__lte=as_of_date)
+    return qs.order_by('-fecha').values_list('saldo_acumulado', flat=True).first() or CERO
+
+
+def saldo_antes_de(cuenta, fecha, pk):
+    """
+    Saldo de ``cuenta`` justo antes del movimiento ``(fecha, pk)``: el
+    snapshot del día anterior más los movimientos del mismo día con id menor.
+    """
+    mismo_dia = (
+        Transaccion.objects.de_cuenta(cuenta, desde=fecha, hasta=fecha)
+        .filter(pk__lt=pk)
+        .aggregate(total=Sum(importe_en_cuenta(cuenta)))['total'] or CERO
+    )
+    return cuenta.saldo(fecha - timedelta(days=1)) + mismo_dia
+
+
+def con_saldo_corrido(cuenta, movimientos):
+    """
+    Anota ``importe_cuenta`` y ``saldo_corrido`` en una página de
+    movimientos (en cualquier orden). La suma acumulada se hace en la base
+    solo sobre las filas de la página, partiendo de ``saldo_antes_de`` la
+    más antigua: el costo no depende de cuántos movimientos hay detrás.
+    """
+    movimientos = list(movimientos)
+    if not movimientos:
+        return movimientos
+    primero = min(movimientos, key=lambda m: (m.fecha, m.pk))
+    saldos = {
+        pk: (importe, saldo)
+        for pk, importe, saldo in Transaccion.objects
+        .filter(pk__in=[m.pk for m in movimientos])
+        .con_saldo_corrido(cuenta, saldo_antes_de(cuenta, primero.fecha, primero.pk))
+        .values_list('pk', 'importe_cuenta', 'saldo_corrido')
+    }
+    for movimiento in movimientos:
+        movimiento.importe_cuenta, movimiento.saldo_corrido = saldos[movimiento.pk]
+    return movimientos
+
+
+def _totales_por_dia(cuenta_ids=None):
+    """Débitos y créditos por (cuenta, fecha) calculados desde las partidas."""
+    qs = PartidaContable.objects.all()
+    if cuenta_ids is not None:
+        qs = qs.filter(cuenta_id__in=cuenta_ids)
+    return (
+        qs.values('cuenta_id', 'asiento__fecha')
+        .annotate(debitos=Sum('debito'), creditos=Sum('credito'))
+        .order_by('cuenta_id', 'asiento__fecha')
+    )
+
+
+def _snapshots_esperados(cuenta_ids=None):
+    """Genera los ``SaldoDiario`` que deberían existir según las partidas."""
+    cuenta_actual = None
+    acumulado = CERO
+    for fila in _totales_por_dia(cuenta_ids):
+        if fila['cuenta_id'] != cuenta_actual:
+            cuenta_actual = fila['cuenta_id']
+            acumulado = CERO
+        debitos = fila['debitos'] or CERO
+        creditos = fila['creditos'] or CERO
+        acumulado += debitos - creditos
+        yield SaldoDiario(
+            cuenta_id=cuenta_actual,
+            fecha=fila['asiento__fecha'],
+            debitos=debitos,
+            creditos=creditos,
+            saldo_acumulado=acumulado,
+        )
+
+
+@transaction.atomic
+def reconstruir_saldos(cuenta_ids=None, batch_size=1000):
+    """Borra y regenera los snapshots (de todas las cuentas o de ``cuenta_ids``)."""
+    existentes = SaldoDiario.objects.all()
+    if cuenta_ids is not None:
+        existentes = existentes.filter(cuenta_id__in=cuenta_ids)
+    existentes.delete()
+
+    nuevos = list(_snapshots_esperados(cuenta_ids))
+    SaldoDiario.objects.bulk_create(nuevos, batch_size=batch_size)
+    return len(nuevos)
+
+
+def verificar_saldos(cuenta_ids=None):
+    """
+    Compara los snapshots guardados contra las partidas.
+
+    Devuelve una lista de diferencias ``{cuenta_id, fecha, campo, esperado,
+    guardado}``; una lista vacía significa que la tabla está consistente.
+    """
+    guardados = SaldoDiario.objects.all()
+    if cuenta_ids is not None:
+        guardados = guardados.filter(cuenta_id__in=cuenta_ids)
+    guardados = {
+        (s.cuenta_id, s.fecha): s
+        for s in guardados.only('cuenta_id', 'fecha', 'debitos', 'creditos', 'saldo_acumulado')
+    }
+
+    diferencias = []
+    for esperado in _snapshots_esperados(cuenta_ids):
+        clave = (esperado.cuenta_id, esperado.fecha)
+        guardado = guardados.pop(clave, None)
+        for campo in ('debitos', 'creditos', 'saldo_acumulado'):
+            valor_esperado = getattr(esperado, campo)
+            valor_guardado = getattr(guardado, campo) if guardado else None
+            if valor_guardado != valor_esperado:
+                diferencias.append({
+                    'cuenta_id': esperado.cuenta_id,
+                    'fecha': esperado.fecha,
+                    'campo': campo,
+                    'esperado': valor_esperado,
+                    'guardado': valor_guardado,
+                })
+
+    # Snapshots sin partidas que los respalden
+    for (cuenta_id, fecha), sobrante in guardados.items():
+        diferencias.append({
+            'cuenta_id': cuenta_id,
+            'fecha': fecha,
+            'campo': 'sobrante',
+            'esperado': None,
+            'guardado': sobrante.saldo_acumulado,
+        })
+
+    return diferencias
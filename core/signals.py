@@ -0,0 +1,164 @@
+"""
+Señales de la app core.
+
+Mantienen la tabla ``SaldoDiario`` al día cuando se crean, modifican o
+eliminan partidas contables (o cambia la fecha de su asiento), recalculan
+los saldos persistidos de los periodos abiertos e invalidan la caché de
+cuentas derivadas de categorías, la de estadísticas de transacciones y
+las versiones de cuentas, tipos de cuenta, categorías y periodos
+(dashboard y catálogos JSON).
+"""
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import AsientoContable, Categoria, Cuenta, PartidaContable, Periodo, TipoCuenta, Transaccion
+from .services.cuentas_categoria import invalidar_categoria, invalidar_cuenta
+from .services.estadisticas import invalidar, invalidar_transacciones
+from .services.periodos import CAMPOS_CALC, recalcular_cadena, recalcular_periodos
+from .services.saldos import aplicar_movimiento
+
+
+def _fecha_asiento(partida):
+    try:
+        return partida.asiento.fecha
+    except AsientoContable.DoesNotExist:
+        return None
+
+
+@receiver(pre_save, sender=PartidaContable)
+def partida_pre_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Guarda los valores previos para poder revertirlos al actualizar."""
+    instance._saldo_previo = None
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not {'cuenta', 'debito', 'credito', 'asiento'} & set(update_fields):
+        return
+    previo = (
+        PartidaContable.objects
+        .filter(pk=instance.pk)
+        .values_list('cuenta_id', 'asiento__fecha', 'debito', 'credito')
+        .first()
+    )
+    instance._saldo_previo = previo
+
+
+@receiver(post_save, sender=PartidaContable)
+def partida_post_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previo = getattr(instance, '_saldo_previo', None)
+    if previo:
+        cuenta_id, fecha, debito, credito = previo
+        aplicar_movimiento(cuenta_id, fecha, -(debito or 0), -(credito or 0))
+    fecha = _fecha_asiento(instance)
+    if fecha is not None:
+        aplicar_movimiento(instance.cuenta_id, fecha, instance.debito, instance.credito)
+
+
+@receiver(post_delete, sender=PartidaContable)
+def partida_post_delete(sender, instance, **kwargs):
+    fecha = _fecha_asiento(instance)
+    if fecha is not None:
+        aplicar_movimiento(
+            instance.cuenta_id, fecha,
+            -(instance.debito or 0), -(instance.credito or 0)
+        )
+
+
+@receiver(pre_save, sender=AsientoContable)
+def asiento_pre_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._fecha_previa = None
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and 'fecha' not in update_fields:
+        return
+    instance._fecha_previa = (
+        AsientoContable.objects.filter(pk=instance.pk)
+        .values_list('fecha', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=AsientoContable)
+def asiento_post_save(sender, instance, created, raw=False, **kwargs):
+    """Si cambia la fecha del asiento, mueve sus partidas al nuevo día."""
+    fecha_previa = getattr(instance, '_fecha_previa', None)
+    if raw or fecha_previa is None or fecha_previa == instance.fecha:
+        return
+    for cuenta_id, debito, credito in instance.partidas.values_list('cuenta_id', 'debito', 'credito'):
+        aplicar_movimiento(cuenta_id, fecha_previa, -(debito or 0), -(credito or 0))
+        aplicar_movimiento(cuenta_id, instance.fecha, debito, credito)
+
+
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+def categoria_cambiada(sender, instance, created=False, **kwargs):
+    """Un renombre o borrado cambia la cuenta "Gastos/Ingresos - <categoría>"."""
+    invalidar('categorias')
+    if not created:
+        invalidar_categoria(instance.pk)
+
+
+@receiver(post_save, sender=Cuenta)
+@receiver(post_delete, sender=Cuenta)
+def cuenta_cambiada(sender, instance, created=False, **kwargs):
+    invalidar('cuentas')
+    if not created:
+        invalidar_cuenta(instance.pk)
+
+
+@receiver(post_save, sender=TipoCuenta)
+@receiver(post_delete, sender=TipoCuenta)
+def tipo_cuenta_cambiado(sender, instance, **kwargs):
+    """El nombre y el grupo del tipo aparecen en los catálogos de cuentas."""
+    invalidar('tipos_cuenta')
+
+
+@receiver(pre_save, sender=Transaccion)
+def transaccion_pre_save(sender, instance, raw=False, **kwargs):
+    """Recuerda el periodo previo: si la transacción cambia de periodo, ambos se recalculan."""
+    instance._periodo_previo = None
+    if raw or instance.pk is None:
+        return
+    instance._periodo_previo = (
+        Transaccion.objects.filter(pk=instance.pk).values_list('periodo_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Transaccion)
+def transaccion_post_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    recalcular_periodos({instance.periodo_id, getattr(instance, '_periodo_previo', None)})
+    invalidar_transacciones()
+
+
+@receiver(post_delete, sender=Transaccion)
+def transaccion_post_delete(sender, instance, **kwargs):
+    recalcular_periodos({instance.periodo_id})
+    invalidar_transacciones()
+
+
+# Campos de Periodo que no afectan sus saldos (o que los propios saldos escriben)
+_CAMPOS_SIN_RECALCULO = set(CAMPOS_CALC) | {'cerrado', 'cerrado_por', 'fecha_cierre', 'estado', 'generado'}
+
+
+@receiver(post_save, sender=Periodo)
+def periodo_post_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    invalidar('periodos')
+    if update_fields is not None and set(update_fields) <= _CAMPOS_SIN_RECALCULO:
+        return
+    recalcular_cadena(instance)
+
+
+@receiver(pre_delete, sender=Periodo)
+def periodo_pre_delete(sender, instance, **kwargs):
+    instance._siguientes = list(instance.periodo_siguiente.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Periodo)
+def periodo_post_delete(sender, instance, **kwargs):
+    """Los sucesores pierden su periodo anterior: su saldo inicial cambia."""
+    invalidar('periodos')
+    recalcular_periodos(getattr(instance, '_siguientes', ()))
@@ -1,3 +1,31 @@
+from datetime import date
+from decimal import Decimal
+
 from django.test import TestCase
 
-# Create your tests here.
+from .models import Cuenta, Periodo, TipoCuenta
+from .services.periodos import recalcular_periodos
+
+
+class RecalcularPeriodosTests(TestCase):
+    def setUp(self):
+        tipo = TipoCuenta.objects.create(codigo="DEB", nombre="Debito", grupo="DEB")
+        cuenta = Cuenta.objects.create(nombre="Banco", tipo=tipo)
+        self.periodos = []
+        anterior = None
+        for mes in (1, 2, 3):
+            anterior = Periodo.objects.create(
+                cuenta=cuenta, fecha_corte=date(2025, mes, 28), periodo_anterior=anterior,
+                saldo_inicial_manual=Decimal("100.00") if mes == 1 else None,
+            )
+            self.periodos.append(anterior)
+        recalcular_periodos({p.pk for p in self.periodos})
+
+    def test_varios_inicios_en_la_misma_cadena(self):
+        # El tercero se recalcula después del segundo aunque también sea inicio
+        primero, _, tercero = self.periodos
+        Periodo.objects.filter(pk=primero.pk).update(saldo_inicial_manual=Decimal("200.00"))
+        recalcular_periodos({primero.pk, tercero.pk})
+        for periodo in Periodo.objects.filter(cuenta=primero.cuenta):
+            self.assertEqual(periodo.saldo_inicial_calc, Decimal("200.00"))
+            self.assertEqual(periodo.saldo_final_calc, Decimal("200.00"))
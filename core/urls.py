@@ -72,6 +72,12 @@ urlpatterns = [
             name="transferencias_create"),
 
     path("reportes/estado-cuenta/", EstadoCuentaView.as_view(), name="reportes_estado_cuenta"),
+    path("reportes/balanza/", core_views.BalanzaComprobacionView.as_view(), name="reportes_balanza"),
+    path("reportes/libro.csv", core_views.LibroCSVView.as_view(), name="reportes_libro_csv"),
+    path("diagnostico/sql/", core_views.SQLResumenView.as_view(), name="sql_resumen"),
+    path("diagnostico/perfiles/", core_views.PerfilesView.as_view(), name="perfiles"),
+    path("diagnostico/perfiles/<str:nombre>", core_views.PerfilDescargaView.as_view(),
+         name="perfiles_descarga"),
 
     # Crear periodo CON cuenta específica
     path("cuentas/<int:cuenta_pk>/periodos/nuevo/",
@@ -1,5 +1,6 @@
 # <!-- file: core/views.py -->
-from django.contrib.auth.mixins import LoginRequiredMixin
+from asgiref.sync import sync_to_async
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.views.generic import TemplateView
 from django.urls import reverse_lazy
 from django.contrib.messages.views import SuccessMessageMixin
@@ -24,13 +25,13 @@ from django.views.generic.edit import FormView
 from .forms import TransferenciaForm, IngresoForm, forms
 from .models import Transaccion, Categoria
 
-import csv, io, pandas as pd
+import csv
 
 from django.views.generic import TemplateView
-from django.http import HttpResponse, JsonResponse
-from django.core.paginator import Paginator
+from django.http import FileResponse, HttpResponse, HttpResponseBadRequest, JsonResponse
+from django.utils.dateparse import parse_date
 from django.db.models import Sum
-from .forms import EstadoCuentaForm
+from .forms import BalanzaForm, EstadoCuentaForm
 from .models import Transaccion
 from django.http import Http404 
 from django import forms as django_forms  
@@ -49,14 +50,29 @@ from django.db.models import Sum
 from django.db.models import Count
 
 from django.views.generic import View
-from django.shortcuts import get_object_or_404, redirect
+from django.shortcuts import aget_object_or_404, get_object_or_404, redirect
 from django.utils import timezone
 from datetime import timedelta
 from .models import PeriodoEstadoLog
+from .services.balanza import balanza_comprobacion, filas_csv, totales_balanza
+from .services.busqueda_cuentas import LIMITE, LIMITE_MAXIMO, buscar_cuentas
+from .services.dashboard import instantanea_dashboard
+from .services.estadisticas import conteo_estados
+from .services.estado_cuenta import resumen_estado_cuenta
+from .services.exportacion import (
+    excel_estado_cuenta, lineas_estado_cuenta, lineas_libro, lineas_transacciones,
+    respuesta_csv, respuesta_excel,
+)
+from .services.paginacion import POR_PAGINA_MAXIMO, paginar
+from .services import conciliacion, perfil_sql, perfilador
+from .services.pdf_periodos import abrir_pdf_periodo
+from .services.periodos import recalcular_cadena
+from .services.referencias import (
+    CATEGORIAS, CUENTAS, arespuesta_referencia, lista_autocomplete, lista_categorias, lista_cuentas,
+    respuesta_referencia,
+)
+from .services.saldos import con_saldo_corrido
 
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.units import inch
 from django.http import HttpResponse
 from django.http import HttpResponseRedirect
 
@@ -65,13 +81,12 @@ import re
 logger = logging.getLogger(__name__)
 
 from django.shortcuts import render
+from django.conf import settings
+from django.template.loader import render_to_string
 from django.db.models import Count, Sum
 from django.db import connection
 from .models import Cuenta, Transaccion, Periodo, Categoria
 
-from django.conf import settings
-import os
-
 from django.views.generic.edit import UpdateView
 from .models import TipoCuenta, TransaccionEstado
 from .forms import TipoCuentaForm
@@ -89,60 +104,9 @@ class DashboardView(TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        
-        # Estadísticas de la base de datos
-        context['total_cuentas'] = Cuenta.objects.count()
-        context['total_transacciones'] = Transaccion.objects.count()
-        context['total_periodos'] = Periodo.objects.count()
-        context['total_categorias'] = Categoria.objects.count()
-        
-        # Tamaño de la base de datos (compatible con SQLite)
-        try:
-            db_path = settings.DATABASES['default']['NAME']
-            size_bytes = os.path.getsize(db_path)
-            
-            # Convertir a formato legible
-            for unit in ['B', 'KB', 'MB', 'GB']:
-                if size_bytes < 1024.0:
-                    context['db_size'] = f"{size_bytes:.1f} {unit}"
-                    break
-                size_bytes /= 1024.0
-        except Exception as e:
-            context['db_size'] = "N/A"
-        
-        # Cuentas con más movimientos (top 5) - actualizado para v0.6.0
-        context['cuentas_movimientos'] = Cuenta.objects.annotate(
-            num_movimientos=Count('transacciones_origen') + Count('transacciones_destino')
-        ).order_by('-num_movimientos')[:5]
-        
-        # Últimas transacciones (corregido para v0.6.0)
-        context['ultimas_transacciones'] = Transaccion.objects.select_related(
-            'categoria', 'cuenta_origen', 'cuenta_destino'  # Campos v0.6.0
-        ).order_by('-fecha')[:10]
-        
-        # Precalcular valores absolutos
-        for trans in context['ultimas_transacciones']:
-            trans.monto_abs = abs(trans.monto)
-        
-        # Últimos estados de cuenta con enlace
-        context['ultimos_periodos'] = Periodo.objects.select_related('cuenta').order_by('-fecha_fin_periodo')[:5]
-        
-        # Resumen de saldos por naturaleza (versión corregida)
-        saldos_por_naturaleza = {}
-        for cuenta in Cuenta.objects.all():
-            naturaleza = cuenta.naturaleza if cuenta.naturaleza else "Sin naturaleza"
-            saldo_total = cuenta.saldo_inicial + cuenta.saldo()
-            
-            if naturaleza not in saldos_por_naturaleza:
-                saldos_por_naturaleza[naturaleza] = Decimal('0.00')
-            saldos_por_naturaleza[naturaleza] += saldo_total
-        
-        # Convertir a formato para la plantilla
-        context['saldos_naturaleza'] = [
-            {'naturaleza': key, 'total_saldo': value}
-            for key, value in saldos_por_naturaleza.items()
-        ]
-        
+        # Estadísticas, últimos movimientos y saldos: instantánea en caché
+        # que se invalida con las señales de los modelos que muestra
+        context.update(instantanea_dashboard())
         return context
 
 
@@ -184,7 +148,7 @@ class CuentaListView(ListView):
             return self.paginate_by
     
     def get_queryset(self):
-        queryset = super().get_queryset()
+        queryset = super().get_queryset().select_related('tipo').with_saldos()
         
         # Filtro por búsqueda
         search_query = self.request.GET.get('nombre')
@@ -223,15 +187,7 @@ class CuentaListView(ListView):
         context['search_query'] = self.request.GET.get('nombre', '')
         
         # Obtener el valor de paginación para el template
-        paginate_by = self.request.GET.get('paginate_by', str(self.paginate_by))
-        try:
-            paginate_by_int = int(paginate_by)
-            if paginate_by_int <= 0:
-                context['paginate_by'] = 0
-            else:
-                context['paginate_by'] = paginate_by_int
-        except (ValueError, TypeError):
-            context['paginate_by'] = self.paginate_by
+        context['paginate_by'] = self.get_paginate_by(None)
         
         return context
 
@@ -290,21 +246,36 @@ class TransaccionListView(FilterView):
     template_name       = "transacciones/index.html"  # Template principal
     context_object_name = "transacciones"
     paginate_by         = 50
-    ordering            = ["-fecha"]
+    ordering            = ["-fecha", "-id"]
     
+    def get(self, request, *args, **kwargs):
+        if request.GET.get("export") == "csv":
+            # Mismo filtrado que la lista, exportado completo en streaming
+            filterset = self.get_filterset(self.get_filterset_class())
+            if not filterset.is_bound or filterset.is_valid() or not self.get_strict():
+                queryset = filterset.qs
+            else:
+                queryset = filterset.queryset.none()
+            return respuesta_csv(lineas_transacciones(queryset), "transacciones.csv")
+        return super().get(request, *args, **kwargs)
+
     def get_paginate_by(self, queryset):
         """Determinar el número de elementos por página basado en el parámetro GET"""
         paginate_by = self.request.GET.get('paginate_by', str(self.paginate_by))
         try:
             paginate_by_int = int(paginate_by)
-            if paginate_by_int <= 0:
-                # Si es 0 o menor, mostrar todas (sin paginación)
-                return None
-            else:
-                return paginate_by_int
         except (ValueError, TypeError):
             # Si hay error, usar valor por defecto
             return self.paginate_by
+        if paginate_by_int <= 0:
+            # Ya no se muestra la tabla completa: usar el valor por defecto
+            return self.paginate_by
+        return min(paginate_by_int, POR_PAGINA_MAXIMO)
+
+    def paginate_queryset(self, queryset, page_size):
+        """Paginación por cursor (fecha, id): sin OFFSET ni COUNT(*) completo"""
+        pagina = paginar(queryset, self.request.GET.get('cursor'), page_size, contar=True)
+        return None, pagina, pagina.object_list, pagina.has_other_pages()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -325,14 +296,9 @@ class TransaccionListView(FilterView):
         
         context['grupos'] = grupos
         
-        # Agregar estadísticas de estados usando el queryset completo (no paginado)
-        queryset_completo = self.get_queryset()
-        context['stats_estados'] = {
-            'pendientes': queryset_completo.filter(estado=TransaccionEstado.PENDIENTE).count(),
-            'liquidadas': queryset_completo.filter(estado=TransaccionEstado.LIQUIDADA).count(), 
-            'conciliadas': queryset_completo.filter(estado=TransaccionEstado.CONCILIADA).count(),
-            'verificadas': queryset_completo.filter(estado=TransaccionEstado.VERIFICADA).count(),
-        }
+        # Estadísticas de estados sobre el queryset filtrado (no paginado):
+        # un solo aggregate condicional, cacheado por firma de filtros
+        context['stats_estados'] = conteo_estados(self.object_list)
         
         # Transacciones que requieren atención (solo de la página actual)
         transacciones = context['transacciones']
@@ -341,15 +307,7 @@ class TransaccionListView(FilterView):
         ]
         
         # Obtener el valor de paginación para el template
-        paginate_by = self.request.GET.get('paginate_by', str(self.paginate_by))
-        try:
-            paginate_by_int = int(paginate_by)
-            if paginate_by_int <= 0:
-                context['paginate_by'] = 0
-            else:
-                context['paginate_by'] = paginate_by_int
-        except (ValueError, TypeError):
-            context['paginate_by'] = self.paginate_by
+        context['paginate_by'] = self.get_paginate_by(None)
         
         return context
 
@@ -484,9 +442,22 @@ class EstadoCuentaView(TemplateView):
     template_name = "reportes/estado_cuenta.html"
     paginate_by   = 50   # para movimientos
 
-    def get_context_data(self, **kwargs):
+    def get(self, request, *args, **kwargs):
+        form = EstadoCuentaForm(request.GET or None)
+        export = request.GET.get("export")
+        if export in ("csv", "excel") and form.is_valid():
+            cuenta = form.cleaned_data["cuenta"]
+            desde  = form.cleaned_data["desde"]
+            hasta  = form.cleaned_data["hasta"]
+            # Los saldos salen del resumen cacheado: exportar no los recalcula
+            resumen = resumen_estado_cuenta(cuenta, desde, hasta)
+            exportar = self._export_csv if export == "csv" else self._export_excel
+            return exportar(cuenta, desde, hasta, resumen["saldo_inicial"], resumen["saldo_final"])
+        return self.render_to_response(self.get_context_data(form=form, **kwargs))
+
+    def get_context_data(self, form=None, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        form = EstadoCuentaForm(self.request.GET or None)
+        form = form or EstadoCuentaForm(self.request.GET or None)
         ctx["form"] = form
 
         if form.is_valid():
@@ -494,50 +465,18 @@ class EstadoCuentaView(TemplateView):
             desde  = form.cleaned_data["desde"]
             hasta  = form.cleaned_data["hasta"]
 
-            # 1) Saldo inicial (antes de 'desde') - v0.6.0
-            saldo_inicial = (
-                Transaccion.objects
-                .filter(Q(cuenta_origen=cuenta) | Q(cuenta_destino=cuenta), fecha__lt=desde)
-                .aggregate(total=Sum("monto"))["total"] or 0
-            )
+            # 1) Saldos, cargos/abonos y totales por categoría: una consulta
+            #    agrupada, cacheada por (cuenta, rango, versión de datos)
+            resumen = resumen_estado_cuenta(cuenta, desde, hasta)
 
-            # 2) Movimientos dentro del periodo - v0.6.0
+            # 2) Movimientos dentro del periodo, una página por cursor
             movs_qs = (
                 Transaccion.objects
-                .filter(Q(cuenta_origen=cuenta) | Q(cuenta_destino=cuenta), fecha__range=(desde, hasta))
+                .de_cuenta(cuenta, desde, hasta)
                 .select_related("categoria", "cuenta_origen", "cuenta_destino")
-                .order_by("-fecha", "-id")
-            )
-
-            # Calcular totales correctamente (TODA la consulta, no solo la página)
-            total_cargos = sum(abs(m.monto) for m in movs_qs if m.monto < 0)
-            total_abonos = sum(m.monto for m in movs_qs if m.monto > 0)
-
-            # Paginación manual (porque usamos TemplateView)
-            paginator   = Paginator(movs_qs, self.paginate_by)
-            page_number = self.request.GET.get("page")
-            page_obj    = paginator.get_page(page_number)
-
-            # Anotar cada transacción en la página actual
-            for mov in page_obj:
-                mov.es_cargo = mov.monto < 0
-                mov.monto_abs = abs(mov.monto)
-
-            # 3) Saldo final
-            delta_periodo = movs_qs.aggregate(total=Sum("monto"))["total"] or 0
-            saldo_final   = saldo_inicial + delta_periodo
-
-            # 4) Totales por categoría
-            tot_cat = (
-                movs_qs.values("categoria__nombre")
-                .annotate(total=Sum("monto"))
-                .order_by("-total")
             )
-
-            # 5) Paginación manual (porque usamos TemplateView)
-            paginator   = Paginator(movs_qs, self.paginate_by)
-            page_number = self.request.GET.get("page")
-            page_obj    = paginator.get_page(page_number)
+            page_obj = paginar(movs_qs, self.request.GET.get("cursor"), self.paginate_by)
+            page_obj.total, page_obj.total_exacto = resumen["movimientos"], True
 
             # Anotar cada transacción en la página actual
             for mov in page_obj:
@@ -546,63 +485,108 @@ class EstadoCuentaView(TemplateView):
 
             ctx.update({
                 "cuenta": cuenta,
-                "saldo_inicial": saldo_inicial,
-                "saldo_final": saldo_final,
-                "total_cargos": total_cargos,
-                "total_abonos": total_abonos,
-                "delta_periodo": delta_periodo,
+                "saldo_inicial": resumen["saldo_inicial"],
+                "saldo_final": resumen["saldo_final"],
+                "total_cargos": resumen["total_cargos"],
+                "total_abonos": resumen["total_abonos"],
+                "delta_periodo": resumen["delta_periodo"],
                 "movs_page": page_obj,
-                "totales_categoria": tot_cat,
+                "totales_categoria": resumen["totales_categoria"],
                 "is_paginated": page_obj.has_other_pages(),
             })
 
-            # ----- exportación -----
-            export = self.request.GET.get("export")
-            if export == "csv":
-                return self._export_csv(cuenta, desde, hasta, movs_qs, saldo_inicial, saldo_final)
-            if export == "excel":
-                return self._export_excel(cuenta, desde, hasta, movs_qs, saldo_inicial, saldo_final)
-
         return ctx
 
     # ---------- helpers ----------
-    def _export_csv(self, cuenta, desde, hasta, movs, saldo_ini, saldo_fin):
-        response = HttpResponse(content_type="text/csv")
-        response["Content-Disposition"] = f'attachment; filename=estado_{cuenta.id}_{desde}_{hasta}.csv'
-        writer = csv.writer(response)
-        writer.writerow(["Cuenta", cuenta.nombre])
-        writer.writerow(["Desde", desde, "Hasta", hasta])
-        writer.writerow([])
-        writer.writerow(["Fecha", "Descripción", "Categoría", "Monto"])
-        for m in movs.order_by("fecha"):
-            writer.writerow([m.fecha, m.descripcion, m.categoria, m.monto])
-        writer.writerow([])
-        writer.writerow(["Saldo inicial", saldo_ini])
-        writer.writerow(["Saldo final", saldo_fin])
-        return response
+    def _export_csv(self, cuenta, desde, hasta, saldo_ini, saldo_fin):
+        # En streaming: las filas se leen por bloques mientras se envían
+        return respuesta_csv(
+            lineas_estado_cuenta(cuenta, desde, hasta, saldo_ini, saldo_fin),
+            f"estado_{cuenta.id}_{desde}_{hasta}.csv",
+        )
+
+    def _export_excel(self, cuenta, desde, hasta, saldo_ini, saldo_fin):
+        # openpyxl en modo write_only: las filas van del iterador al archivo
+        archivo = excel_estado_cuenta(cuenta, desde, hasta, saldo_ini, saldo_fin)
+        return respuesta_excel(archivo, f"estado_{cuenta.id}_{desde}_{hasta}.xlsx")
+
+
+class BalanzaComprobacionView(LoginRequiredMixin, TemplateView):
+    """Balanza de comprobación por rango de fechas (HTML o CSV en streaming)."""
+    template_name = "reportes/balanza.html"
+
+    def get(self, request, *args, **kwargs):
+        # Sin filtros: mes en curso
+        hoy = date.today()
+        datos = request.GET if "desde" in request.GET else {
+            "desde": hoy.replace(day=1), "hasta": hoy, "solo_con_movimientos": True,
+        }
+        form = BalanzaForm(datos)
+        ctx = self.get_context_data(form=form, **kwargs)
+        if not form.is_valid():
+            return self.render_to_response(ctx)
+
+        desde = form.cleaned_data["desde"]
+        hasta = form.cleaned_data["hasta"]
+        cuentas = balanza_comprobacion(
+            desde, hasta, solo_con_movimientos=form.cleaned_data["solo_con_movimientos"]
+        )
+
+        if request.GET.get("export") == "csv":
+            return respuesta_csv(filas_csv(cuentas), f"balanza_{desde}_{hasta}.csv")
+
+        cuentas = list(cuentas)
+        ctx.update({
+            "desde": desde,
+            "hasta": hasta,
+            "cuentas": cuentas,
+            "totales": totales_balanza(cuentas),
+        })
+        return self.render_to_response(ctx)
+
+class LibroCSVView(LoginRequiredMixin, View):
+    """Libro completo (asientos con sus partidas) en CSV, opcionalmente por rango."""
+
+    def get(self, request):
+        fechas = []
+        for nombre in ("desde", "hasta"):
+            valor = request.GET.get(nombre) or ""
+            try:
+                fecha = parse_date(valor)
+            except ValueError:
+                fecha = None
+            # parse_date da None con texto mal formado: no exportar todo el libro
+            if valor and fecha is None:
+                return HttpResponseBadRequest("Fechas inválidas (AAAA-MM-DD).")
+            fechas.append(fecha)
+        desde, hasta = fechas
+        sufijo = f"_{desde or 'inicio'}_{hasta or 'hoy'}" if desde or hasta else ""
+        return respuesta_csv(lineas_libro(desde, hasta), f"libro{sufijo}.csv")
 
-    def _export_excel(self, cuenta, desde, hasta, movs, saldo_ini, saldo_fin):
-        # Requiere pandas & openpyxl
-        data = [{
-            "Fecha": m.fecha,
-            "Descripción": m.descripcion,
-            "Categoría": m.categoria.nombre if m.categoria else "",
-            "Monto": m.monto,
-        } for m in movs.order_by("fecha")]
-        df = pd.DataFrame(data)
-        buf = io.BytesIO()
-        with pd.ExcelWriter(buf, engine="openpyxl") as writer:
-            df.to_excel(writer, index=False, sheet_name="Movimientos")
-            resumen = pd.DataFrame({
-                "Concepto": ["Saldo inicial", "Saldo final"],
-                "Valor":    [saldo_ini, saldo_fin],
-            })
-            resumen.to_excel(writer, index=False, sheet_name="Resumen")
-        buf.seek(0)
-        response = HttpResponse(buf.read(),
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-        response["Content-Disposition"] = f'attachment; filename=estado_{cuenta.id}_{desde}_{hasta}.xlsx'
-        return response
+
+class SQLResumenView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
+    """Vistas ordenadas por tiempo en la base (PresupuestoSQLMiddleware). Solo staff."""
+    template_name = "core/sql_resumen.html"
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def post(self, request):
+        perfil_sql.reiniciar()
+        messages.success(request, "Resumen de SQL reiniciado.")
+        return redirect("core:sql_resumen")
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        max_consultas, max_ms, max_repeticiones = perfil_sql.presupuesto()
+        context.update(
+            filas=perfil_sql.resumen(),
+            max_consultas=max_consultas,
+            max_ms=max_ms,
+            max_repeticiones=max_repeticiones,
+            archivo_log=settings.SQL_LOG_FILE,
+        )
+        return context
 
 
 class PeriodoCreateView(CreateView):
@@ -717,15 +701,12 @@ class PeriodoCreateView(CreateView):
 
         # 2) Solo si tenemos al menos fecha de fin determinar, asignamos
         if fin:
-            # v0.6.0: Actualizar filtros para nuevos campos
-            filtros = Q(cuenta_origen=periodo.cuenta) | Q(cuenta_destino=periodo.cuenta)
-            if inicio:
-                filtros &= Q(fecha__gte=inicio)
-                filtros &= ~Q(fecha__lt=inicio) # Excluir explícitamente fechas < inicio
-            filtros &= Q(fecha__lte=fin)
-
             # Actualizar en bloque solo transacciones sin periodo
-            Transaccion.objects.filter(filtros, periodo__isnull=True).update(periodo=periodo)
+            Transaccion.objects.de_cuenta(periodo.cuenta_id, inicio, fin).filter(
+                periodo__isnull=True
+            ).update(periodo=periodo)
+            # update() no dispara señales: recalcular saldos del periodo
+            recalcular_cadena(periodo)
 
         return response
 
@@ -747,7 +728,9 @@ class PeriodoListView(ListView):
     paginate_by = 50
 
     def get_queryset(self):
-        return super().get_queryset().filter(generado=True)
+        # Saldos persistidos en el periodo + cuenta/tipo en el mismo JOIN:
+        # número de consultas constante sin importar las filas
+        return super().get_queryset().filter(generado=True).select_related('cuenta__tipo')
 
 
 # ----------------------------------------------------------------------
@@ -759,14 +742,16 @@ class PeriodoDetailView(DetailView):
     model = Periodo
     template_name = 'periodos/detalle.html'  # Usa tu template existente
     context_object_name = 'periodo'
+    queryset = Periodo.objects.select_related('cuenta__tipo')
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
         periodo = self.object
         # v0.6.0: Usar cuenta_origen y cuenta_destino en lugar de medio_pago
-        movs = Transaccion.objects.filter(
-            Q(cuenta_origen=periodo.cuenta) | Q(cuenta_destino=periodo.cuenta),
-            fecha__range=(periodo.fecha_inicio or periodo.fecha_corte, periodo.fecha_fin_periodo or periodo.fecha_corte)
+        movs = Transaccion.objects.de_cuenta(
+            periodo.cuenta_id,
+            periodo.fecha_inicio or periodo.fecha_corte,
+            periodo.fecha_fin_periodo or periodo.fecha_corte,
         ).order_by("fecha")
         ctx["movs"] = movs
         ctx["total_cargos"] = periodo.total_cargos
@@ -816,21 +801,16 @@ class PeriodoUpdateView(UpdateView):
         inicio = periodo.fecha_corte
         fin = periodo.fecha_fin_periodo
         
-        # Construir filtro base - v0.6.0
-        filtros = Q(cuenta_origen=periodo.cuenta) | Q(cuenta_destino=periodo.cuenta)
-        
-        # Manejar casos donde inicio o fin son nulos
-        if inicio and fin:
-            filtros &= Q(fecha__range=(inicio, fin))
-        elif inicio:
-            filtros &= Q(fecha__gte=inicio)
-        elif fin:
-            filtros &= Q(fecha__lte=fin)
-
         # Liberar transacciones previamente ligadas si ya no encajan
-        Transaccion.objects.filter(periodo=periodo).exclude(filtros).update(periodo=None)
+        # (inicio o fin nulos dejan el rango abierto por ese lado)
+        Transaccion.objects.filter(periodo=periodo).fuera_de_cuenta(
+            periodo.cuenta_id, inicio, fin
+        ).update(periodo=None)
         # Vincular las que correspondan y aún no lo estén
-        Transaccion.objects.filter(filtros, periodo__isnull=True).update(periodo=periodo)
+        Transaccion.objects.de_cuenta(periodo.cuenta_id, inicio, fin).filter(
+            periodo__isnull=True
+        ).update(periodo=periodo)
+        recalcular_cadena(periodo)
 
         return response
 
@@ -859,13 +839,13 @@ class PeriodoRefreshView(View):
         inicio = periodo.fecha_corte
         fin = periodo.fecha_fin_periodo or (periodo.fecha_corte + timedelta(days=30))
 
-        # v0.6.0: Actualizar filtros para nuevos campos
-        filtros = Q(cuenta_origen=periodo.cuenta) | Q(cuenta_destino=periodo.cuenta)
-        if inicio and fin:
-            filtros &= Q(fecha__range=(inicio, fin))
-
-        Transaccion.objects.filter(periodo=periodo).exclude(filtros).update(periodo=None)
-        Transaccion.objects.filter(filtros, periodo__isnull=True).update(periodo=periodo)
+        Transaccion.objects.filter(periodo=periodo).fuera_de_cuenta(
+            periodo.cuenta_id, inicio, fin
+        ).update(periodo=None)
+        Transaccion.objects.de_cuenta(periodo.cuenta_id, inicio, fin).filter(
+            periodo__isnull=True
+        ).update(periodo=periodo)
+        recalcular_cadena(periodo)
 
         # Registrar en historial (opcional) - solo si hay usuario autenticado
         if request.user.is_authenticated:
@@ -891,10 +871,12 @@ class CerrarPeriodoView(LoginRequiredMixin, View):
         if periodo.cerrado:
             messages.info(request, "El período ya estaba cerrado.")
         else:
+            # Congelar los saldos con los movimientos actuales antes de cerrar
+            recalcular_cadena(periodo)
             periodo.cerrado = True
             periodo.cerrado_por = request.user
             periodo.fecha_cierre = timezone.now()
-            periodo.save()
+            periodo.save(update_fields=['cerrado', 'cerrado_por', 'fecha_cierre'])
             PeriodoEstadoLog.objects.create(periodo=periodo, accion="CERRAR", usuario=request.user)
             messages.success(request, "Período cerrado correctamente.")
         return redirect('core:periodo_detail', pk=pk)
@@ -964,124 +946,40 @@ class TipoCuentaDeleteView(DeleteView):
 
 
 # --- AJAX Endpoints -------------------------------------------------
-
-def cuentas_servicio_json(request):
-    cuentas = Cuenta.objects.filter(tipo__grupo="SER").order_by("nombre")
-    data = [
-        {
-            "id": c.id, 
-            "text": str(c),
-            "naturaleza": c.naturaleza  # Incluir naturaleza
-        } for c in cuentas
-    ]
-    return JsonResponse(data, safe=False)
+# Los endpoints AJAX son async: bajo ASGI (guias/despliegue-asgi.md) un
+# proceso atiende muchas llamadas a la vez sin un hilo por petición. El ORM
+# async (aget, aaggregate, async for) corre las consultas en el hilo de la
+# conexión; lo que no tiene versión async va en un solo sync_to_async.
+
+async def cuentas_servicio_json(request):
+    return await arespuesta_referencia(
+        request, 'cuentas_servicio', CUENTAS,
+        lambda: lista_cuentas(Cuenta.objects.filter(tipo__grupo="SER")),
+    )
 
 
-def categorias_json(request):
+async def categorias_json(request):
     """Devuelve todas las categorías ordenadas por nombre"""
-    categorias = Categoria.objects.order_by("nombre")
-    data = [{"id": cat.id, "text": str(cat)} for cat in categorias]
-    return JsonResponse(data, safe=False)
+    return await arespuesta_referencia(request, 'categorias', CATEGORIAS, lista_categorias)
 
 
-def medios_pago_json(request):
-    cuentas = Cuenta.objects.medios_pago().order_by("nombre")
-    data = [
-        {
-            "id": c.id, 
-            "text": str(c),
-            "naturaleza": c.naturaleza  # Incluir naturaleza
-        } for c in cuentas
-    ]
-    return JsonResponse(data, safe=False)
+async def medios_pago_json(request):
+    return await arespuesta_referencia(
+        request, 'medios_pago', CUENTAS,
+        lambda: lista_cuentas(Cuenta.objects.medios_pago()),
+    )
 
 
 class PeriodoPDFView(LoginRequiredMixin, View):
     def get(self, request, pk):
-        periodo = get_object_or_404(Periodo, pk=pk)
-        # v0.6.0: Actualizar filtro para nuevos campos
-        movs = Transaccion.objects.filter(
-            Q(cuenta_origen=periodo.cuenta) | Q(cuenta_destino=periodo.cuenta),
-            fecha__range=(periodo.fecha_inicio or periodo.fecha_corte, periodo.fecha_fin_periodo or periodo.fecha_corte)
-        ).order_by("fecha")
-        
-        # Crear respuesta HTTP con PDF
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="estado_cuenta_{periodo.id}.pdf"'
-        
-        # Crear PDF
-        p = canvas.Canvas(response, pagesize=letter)
-        width, height = letter
-        
-        # Encabezado
-        p.setFont("Helvetica-Bold", 16)
-        p.drawString(1*inch, height-1*inch, f"Estado de Cuenta: {periodo.cuenta.nombre}")
-        p.setFont("Helvetica", 12)
-        p.drawString(1*inch, height-1.2*inch, f"Periodo: {periodo.fecha_corte} - {periodo.fecha_fin_periodo}")
-        if periodo.usar_saldo_prev:
-            p.drawString(1*inch, height-1.4*inch, f"Saldo inicial: ${periodo.saldo_inicial:.2f}")
-        
-        # Encabezados de tabla con formato mejorado
-        p.setFont("Helvetica-Bold", 10)
-        p.drawString(1*inch, height-1.6*inch, "Fecha")
-        p.drawString(2.0*inch, height-1.6*inch, "Descripción")
-        p.drawString(5.0*inch, height-1.6*inch, "Cargos")  # Columna para cargos
-        p.drawString(6.0*inch, height-1.6*inch, "Abonos")  # Columna para abonos
-        
-        # Línea divisoria debajo de los encabezados
-        p.line(1*inch, height-1.65*inch, 7*inch, height-1.65*inch)
-        
-        y_position = height - 1.8*inch
-        p.setFont("Helvetica", 10)
-        
-        for mov in movs:
-            # Formatear fecha
-            fecha_str = mov.fecha.strftime("%d/%m/%Y")
-            p.drawString(1*inch, y_position, fecha_str)
-            
-            # Descripción (limitada a 40 caracteres)
-            desc = mov.descripcion[:40] + "..." if len(mov.descripcion) > 40 else mov.descripcion
-            p.drawString(2.0*inch, y_position, desc)
-            
-            # Mostrar cargos y abonos en columnas separadas
-            if mov.monto < 0:
-                # Cargo (valor absoluto)
-                cargo = f"${abs(mov.monto):.2f}"
-                p.drawRightString(5.5*inch, y_position, cargo)  # Alineado a la derecha
-            else:
-                # Abono
-                abono = f"${mov.monto:.2f}"
-                p.drawRightString(6.5*inch, y_position, abono)  # Alineado a la derecha
-            
-            y_position -= 0.2*inch
-            
-            # Nueva página si se acaba el espacio
-            if y_position < 1*inch:
-                p.showPage()
-                y_position = height - 1*inch
-                # Redibujar encabezados en nueva página
-                p.setFont("Helvetica-Bold", 10)
-                p.drawString(1*inch, height-0.2*inch, "Fecha")
-                p.drawString(2.0*inch, height-0.2*inch, "Descripción")
-                p.drawString(5.0*inch, height-0.2*inch, "Cargos")
-                p.drawString(6.0*inch, height-0.2*inch, "Abonos")
-                p.line(1*inch, height-0.25*inch, 7*inch, height-0.25*inch)
-                p.setFont("Helvetica", 10)
-                y_position = height - 0.4*inch
-        
-        # Totales con formato mejorado
-        p.setFont("Helvetica-Bold", 12)
-        p.drawString(1*inch, y_position - 0.4*inch, f"Total Cargos: ${abs(periodo.total_cargos):.2f}")
-        p.drawString(1*inch, y_position - 0.6*inch, f"Total Abonos: ${periodo.total_abonos:.2f}")
-        p.drawString(1*inch, y_position - 0.8*inch, f"Saldo Final: ${periodo.saldo:.2f}")
-        
-        # Línea divisoria sobre los totales
-        p.line(1*inch, y_position - 0.35*inch, 7*inch, y_position - 0.35*inch)
-        
-        p.showPage()
-        p.save()
-        return response
-    
+        periodo = get_object_or_404(Periodo.objects.select_related('cuenta'), pk=pk)
+        return FileResponse(
+            abrir_pdf_periodo(periodo),
+            as_attachment=True,
+            filename=f"estado_cuenta_{periodo.id}.pdf",
+            content_type='application/pdf',
+        )
+
 
 class CuentaSaldosView(TemplateView):
     template_name = "cuentas/saldos_simple.html"
@@ -1091,7 +989,8 @@ class CuentaSaldosView(TemplateView):
         
         # Obtener todas las cuentas agrupadas por grupo
         grupos = {}
-        for cuenta in Cuenta.objects.all().order_by('tipo__grupo', 'nombre'):
+        cuentas = Cuenta.objects.select_related('tipo').with_saldos().order_by('tipo__grupo', 'nombre')
+        for cuenta in cuentas:
             grupo = cuenta.tipo.grupo if cuenta.tipo else "Sin Grupo"
             if grupo not in grupos:
                 grupos[grupo] = []
@@ -1100,9 +999,9 @@ class CuentaSaldosView(TemplateView):
         context['grupos'] = grupos
         return context
 
-def cuenta_movimientos(request):
+async def cuenta_movimientos(request):
     cuenta_id = request.GET.get('cuenta')
-    page = request.GET.get('page', 1)
+    cursor = request.GET.get('cursor')
     
     if not cuenta_id:
         return JsonResponse({
@@ -1110,16 +1009,17 @@ def cuenta_movimientos(request):
             'pagination': ''
         })
     
-    cuenta = get_object_or_404(Cuenta, id=cuenta_id)
-    
+    cuenta = await aget_object_or_404(Cuenta, id=cuenta_id)
+    # Página y plantillas (síncronas) en un solo salto al hilo del ORM
+    return JsonResponse(await sync_to_async(_pagina_movimientos)(cuenta, cursor))
+
+
+def _pagina_movimientos(cuenta, cursor):
     # Obtener movimientos relacionados con la cuenta
-    # v0.6.0: Usar nuevos campos para movimientos de cuenta
-    movimientos = Transaccion.objects.filter(
-        Q(cuenta_origen=cuenta) | Q(cuenta_destino=cuenta)
-    ).order_by('-fecha')
+    movimientos = Transaccion.objects.de_cuenta(cuenta).select_related('categoria')
     
-    paginator = Paginator(movimientos, 50)  # 50 por página
-    page_obj = paginator.get_page(page)
+    # 50 por página, por cursor (fecha, id)
+    page_obj = paginar(movimientos, cursor, 50, contar=True)
     
     # Renderizar tabla de movimientos
     table_html = render_to_string('cuentas/_movimientos_table.html', {
@@ -1129,34 +1029,37 @@ def cuenta_movimientos(request):
     
     # Renderizar paginación
     pagination_html = render_to_string('cuentas/_pagination.html', {
-        'page_obj': page_obj
+        'page_obj': page_obj,
+        'cuenta': cuenta
     })
     
-    return JsonResponse({
+    return {
         'table': table_html,
-        'pagination': pagination_html
-    })
+        'pagination': pagination_html,
+        'next_cursor': page_obj.next_cursor,
+        'previous_cursor': page_obj.previous_cursor,
+        'last_cursor': page_obj.ultima_cursor,
+        'total': page_obj.total,
+        'total_exacto': page_obj.total_exacto,
+    }
 
 
 def cuentas_autocomplete(request):
-    grupo = request.GET.get('grupo')
-    cuentas = []
-    
-    if grupo:
-        cuentas = Cuenta.objects.filter(tipo__grupo=grupo).order_by('nombre')
-    
-    data = [{
-        'id': c.id,
-        'text': f"{c.nombre} ({c.tipo.nombre})",
-        'nombre': c.nombre,
-        'numero': c.numero,
-        'naturaleza': c.naturaleza,
-        'grupo': c.tipo.grupo,
-        'tipo': c.tipo.nombre,
-        'saldo': float(c.saldo_actual) if c.saldo_actual else 0.0
-    } for c in cuentas]
-    
-    return JsonResponse(data, safe=False)
+    grupo = request.GET.get('grupo') or ''
+    consulta = request.GET.get('q', '').strip()
+    if consulta:
+        # Type-ahead: índice en memoria, top-k y saldos de SaldoDiario
+        try:
+            limite = min(max(int(request.GET.get('limite', LIMITE)), 1), LIMITE_MAXIMO)
+        except ValueError:
+            limite = LIMITE
+        return JsonResponse(buscar_cuentas(consulta, grupo, limite), safe=False)
+
+    # Incluye el saldo actual: depende también de las transacciones
+    return respuesta_referencia(
+        request, f'cuentas_autocomplete:{grupo}', CUENTAS + ('transacciones',),
+        lambda: lista_autocomplete(grupo),
+    )
 
 
 class UserProfileView(TemplateView):
@@ -1177,34 +1080,23 @@ class CuentaDetailView(DetailView):
         saldo_inicial = getattr(cuenta, 'saldo_inicial', 0)
         context['saldo_inicial'] = saldo_inicial
         
-        # Obtener movimientos paginados - v0.6.0 
-        # Fix: SQLite doesn't support ORDER BY in union queries
-        # Use Q objects to combine conditions instead of union
-        from django.db.models import Q
-        movimientos = Transaccion.objects.filter(
-            Q(cuenta_origen=cuenta) | Q(cuenta_destino=cuenta)
-        ).order_by('-fecha')
-        paginator = Paginator(movimientos, self.paginate_by)
-        page_number = self.request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
-        
-        # Lógica corregida para determinar tipo de movimiento
-        for movimiento in page_obj:
-            # Para todas las cuentas:
-            # - Montos positivos = aumentan el saldo
-            # - Montos negativos = disminuyen el saldo
-            
-            # Determinar si es cargo o abono según naturaleza
+        # Obtener movimientos paginados (índices (cuenta_*, fecha), ver q_movimientos)
+        movimientos = Transaccion.objects.de_cuenta(cuenta)
+        page_obj = paginar(movimientos, self.request.GET.get('cursor'), self.paginate_by, contar=True)
+
+        # Saldo corrido calculado en la base (SUM ... OVER) sobre la página,
+        # partiendo del saldo anterior a su movimiento más antiguo
+        for movimiento in con_saldo_corrido(cuenta, page_obj.object_list):
+            # importe_cuenta ya trae el signo según la naturaleza: positivo
+            # aumenta el saldo (cargo en DEUDORA, abono en ACREEDORA)
             if cuenta.naturaleza == "DEUDORA":
-                movimiento.es_cargo = movimiento.monto > 0
+                movimiento.es_cargo = movimiento.importe_cuenta > 0
             else:  # Acreedora
-                movimiento.es_cargo = movimiento.monto < 0
-            
-            # Calcular saldo parcial
-            saldo_inicial += movimiento.monto
-            movimiento.saldo_parcial = saldo_inicial
+                movimiento.es_cargo = movimiento.importe_cuenta < 0
+
+            movimiento.saldo_parcial = movimiento.saldo_corrido
             movimiento.display_monto = abs(movimiento.monto)
-            movimiento.display_saldo_parcial = abs(saldo_inicial)
+            movimiento.display_saldo_parcial = abs(movimiento.saldo_corrido)
         
         context['movimientos'] = page_obj
         return context
@@ -1214,10 +1106,10 @@ class CuentaDetailView(DetailView):
 
 @require_POST
 @csrf_exempt
-def cambiar_estado_transaccion(request, transaccion_id):
+async def cambiar_estado_transaccion(request, transaccion_id):
     """Vista AJAX para cambiar el estado de una transacción"""
     try:
-        transaccion = get_object_or_404(Transaccion, id=transaccion_id)
+        transaccion = await aget_object_or_404(Transaccion, id=transaccion_id)
         data = json.loads(request.body)
         nuevo_estado = data.get('estado')
         referencia_bancaria = data.get('referencia_bancaria', '')
@@ -1234,14 +1126,15 @@ def cambiar_estado_transaccion(request, transaccion_id):
         # Aplicar cambio de estado
         estado_anterior = transaccion.estado
         
+        # Los cambios de estado guardan la transacción y su asiento (síncrono)
         if nuevo_estado == TransaccionEstado.LIQUIDADA:
-            transaccion.marcar_liquidada(referencia_bancaria, saldo_posterior)
+            await sync_to_async(transaccion.marcar_liquidada)(referencia_bancaria, saldo_posterior)
         elif nuevo_estado == TransaccionEstado.CONCILIADA:
-            transaccion.marcar_conciliada(usuario=request.user)
+            await sync_to_async(transaccion.marcar_conciliada)(usuario=await request.auser())
         elif nuevo_estado == TransaccionEstado.VERIFICADA:
-            transaccion.marcar_verificada(usuario=request.user)
+            await sync_to_async(transaccion.marcar_verificada)(usuario=await request.auser())
         elif nuevo_estado == TransaccionEstado.PENDIENTE:
-            transaccion.revertir_estado()
+            await sync_to_async(transaccion.revertir_estado)()
         
         return JsonResponse({
             'success': True,
@@ -1609,15 +1502,18 @@ def revertir_match(request):
         }, status=500)
 
 
-def buscar_transacciones_candidatas(request):
+async def buscar_transacciones_candidatas(request):
     """API para buscar transacciones candidatas para matching manual"""
     movimiento_id = request.GET.get('movimiento_id')
     
     if not movimiento_id:
         return JsonResponse({'error': 'ID de movimiento requerido'}, status=400)
     
-    movimiento = get_object_or_404(MovimientoBancario, id=movimiento_id)
-    candidatos = movimiento.buscar_coincidencias()
+    movimiento = await aget_object_or_404(
+        MovimientoBancario.objects.select_related('importacion'), id=movimiento_id
+    )
+    # Las candidatas traen su categoría (select_related)
+    candidatos = await movimiento.abuscar_coincidencias()
     
     # Formatear para JSON
     data = []
@@ -1639,19 +1535,17 @@ def buscar_transacciones_candidatas(request):
 
 
 def ejecutar_matching_masivo(request, importacion_id):
-    """Ejecuta matching automático para toda una importación"""
+    """
+    Ejecuta matching automático para toda una importación. Con ``?modo=global``
+    asigna todos los movimientos a la vez en lugar de uno por uno.
+    """
     importacion = get_object_or_404(ImportacionBancaria, id=importacion_id)
+    modo = request.GET.get('modo')
     
-    movimientos_pendientes = importacion.movimientos.filter(conciliado=False)
-    
-    matches_exitosos = 0
-    total_procesados = 0
-    
-    for movimiento in movimientos_pendientes:
-        total_procesados += 1
-        match_exitoso, mensaje = movimiento.aplicar_match_automatico()
-        if match_exitoso:
-            matches_exitosos += 1
+    # Una consulta de candidatas y un UPDATE por tabla para todos los movimientos
+    matches_exitosos, total_procesados = conciliacion.conciliar_importacion(
+        importacion, modo=modo if modo in conciliacion.MODOS else conciliacion.SECUENCIAL
+    )
     
     # Actualizar estadísticas
     importacion.registros_conciliados = importacion.movimientos.filter(
@@ -1767,29 +1661,21 @@ class BBVADetalleView(View):
         else:
             importacion = get_object_or_404(ImportacionBBVA, id=importacion_id)
         
-        # Obtener movimientos paginados
-        page = int(request.GET.get('page', 1))
-        per_page = 20
-        
-        movimientos = importacion.movimientos_temporales.all()
-        start = (page - 1) * per_page
-        end = start + per_page
-        movimientos_pagina = movimientos[start:end]
-        
-        # Calcular paginación
-        total_pages = (movimientos.count() + per_page - 1) // per_page
+        # Obtener movimientos paginados por cursor (fila_excel es única por importación)
+        movimientos = paginar(
+            importacion.movimientos_temporales.all(),
+            request.GET.get('cursor'),
+            20,
+            orden=('fila_excel', 'id'),
+        )
         
-        # Obtener resumen
+        # Obtener resumen (incluye el total de movimientos)
         resumen = AsistenteBBVA.obtener_resumen_importacion(importacion)
         
         return render(request, self.template_name, {
             'importacion': importacion,
-            'movimientos': movimientos_pagina,
+            'movimientos': movimientos,
             'resumen': resumen,
-            'page': page,
-            'total_pages': total_pages,
-            'has_next': page < total_pages,
-            'has_prev': page > 1
         })
     
     def post(self, request, importacion_id):
@@ -1864,20 +1750,21 @@ def bbva_validar_movimiento(request, movimiento_id):
         }, status=400)
 
 
-def bbva_resumen_importacion(request, importacion_id):
+async def bbva_resumen_importacion(request, importacion_id):
     """AJAX para obtener resumen actualizado"""
     try:
         # Filtrar por usuario solo si está autenticado
-        if request.user.is_authenticated:
-            importacion = get_object_or_404(
+        usuario = await request.auser()
+        if usuario.is_authenticated:
+            importacion = await aget_object_or_404(
                 ImportacionBBVA,
                 id=importacion_id,
-                usuario=request.user
+                usuario=usuario
             )
         else:
-            importacion = get_object_or_404(ImportacionBBVA, id=importacion_id)
+            importacion = await aget_object_or_404(ImportacionBBVA, id=importacion_id)
         
-        resumen = AsistenteBBVA.obtener_resumen_importacion(importacion)
+        resumen = await AsistenteBBVA.aobtener_resumen_importacion(importacion)
         
         return JsonResponse({
             'success': True,
@@ -2175,4 +2062,35 @@ class BBVAResumenFinalView(View):
             
         except Exception as e:
             messages.error(request, f'❌ Error creando transacciones: {str(e)}')
-            return redirect('core:bbva_resumen_final', importacion_id=importacion_id)
\ No newline at end of file
+            return redirect('core:bbva_resumen_final', importacion_id=importacion_id)
+
+class PerfilesView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
+    """Perfiles guardados por PerfilPythonMiddleware (?perfilar=1). Solo staff."""
+    template_name = "core/perfiles.html"
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update(
+            perfiles=perfilador.listar(),
+            habilitado=settings.PERFIL_HABILITADO,
+            directorio=settings.PERFIL_DIR,
+            max_archivos=settings.PERFIL_MAX_ARCHIVOS,
+            dias=settings.PERFIL_DIAS,
+        )
+        return context
+
+
+class PerfilDescargaView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """Descarga un ``.prof`` o ``.folded`` de PERFIL_DIR. Solo staff."""
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, nombre):
+        ruta = perfilador.ruta_archivo(nombre)
+        if ruta is None:
+            raise Http404("Perfil no encontrado.")
+        return FileResponse(open(ruta, "rb"), as_attachment=True, filename=nombre)
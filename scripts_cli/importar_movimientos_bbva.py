@@ -795,6 +795,9 @@ class ImportadorBBVA:
                 if opcion != '1':
                     return
         
+        # En modo masivo las transacciones se acumulan y se guardan en bloque al final
+        pendientes = []
+        
         for idx, movimiento in enumerate(self.movimientos, 1):
             if modo_masivo:
                 # En modo masivo, siempre mostrar encabezado
@@ -802,7 +805,7 @@ class ImportadorBBVA:
                 print(f"{Colors.BOLD}Movimiento {idx}/{total}{Colors.ENDC}")
                 print(f"{Colors.HEADER}{'='*60}{Colors.ENDC}")
                 # Procesamiento automático
-                self.procesar_movimiento_automatico(movimiento, idx)
+                self.procesar_movimiento_automatico(movimiento, idx, pendientes)
             else:
                 # En modo interactivo, el encabezado se muestra dentro de la función
                 # solo si el movimiento no es omitido
@@ -810,15 +813,29 @@ class ImportadorBBVA:
                 if resultado == 'exit':
                     print(f"\n{Colors.WARNING}Proceso interrumpido por el usuario{Colors.ENDC}")
                     break
+        
+        if pendientes:
+            print(f"\n{Colors.OKBLUE}Guardando {len(pendientes)} transacciones en bloque...{Colors.ENDC}")
+            try:
+                self.guardar_movimientos(pendientes)
+                print(f"{Colors.OKGREEN}✓ {len(pendientes)} transacciones guardadas{Colors.ENDC}")
+            except Exception as e:
+                # El guardado es atómico: no se guardó ninguna
+                self.procesados -= len(pendientes)
+                self.errores += len(pendientes)
+                print(f"{Colors.FAIL}✗ Error al guardar el lote: {e}{Colors.ENDC}")
     
-    def procesar_movimiento_automatico(self, movimiento, numero):
-        """Procesa un movimiento automáticamente"""
+    def procesar_movimiento_automatico(self, movimiento, numero, pendientes=None):
+        """Procesa un movimiento automáticamente (si se pasa ``pendientes`` se difiere el guardado)"""
         try:
             # Aplicar reglas contables y guardar
             transaccion = self.aplicar_reglas_contables(movimiento)
             
             if not self.test_mode:
-                self.guardar_movimiento(transaccion)
+                if pendientes is not None:
+                    pendientes.append(transaccion)
+                else:
+                    self.guardar_movimiento(transaccion)
             
             self.procesados += 1
             print(f"{Colors.OKGREEN}✓ Movimiento {numero} procesado{Colors.ENDC}")
@@ -1872,23 +1889,34 @@ class ImportadorBBVA:
                 
             else:
                 # Crear nueva transacción
-                transaccion = Transaccion.objects.create(**transaccion_data)
-                
-                self.log_operaciones.append({
-                    'fecha': str(transaccion_data['fecha']),
-                    'descripcion': transaccion_data['descripcion'],
-                    'monto': float(transaccion_data['monto']),
-                    'tipo': str(transaccion_data['tipo']),
-                    'id_generado': transaccion.id,
-                    'estado': 'CREADO'
-                })
-                
-                logger.info(f"Transacción guardada: ID {transaccion.id}")
+                self.guardar_movimientos([transaccion_data])
             
         except Exception as e:
             logger.error(f"Error al guardar transacción: {e}")
             raise
     
+    def guardar_movimientos(self, lista_transacciones):
+        """Crea varias transacciones nuevas (con sus asientos) en una sola operación en bloque"""
+        try:
+            creadas = Transaccion.objects.bulk_create_con_asientos(
+                Transaccion(**datos) for datos in lista_transacciones
+            )
+        except Exception as e:
+            logger.error(f"Error al guardar transacciones: {e}")
+            raise
+        
+        for transaccion in creadas:
+            self.log_operaciones.append({
+                'fecha': str(transaccion.fecha),
+                'descripcion': transaccion.descripcion,
+                'monto': float(transaccion.monto),
+                'tipo': str(transaccion.tipo),
+                'id_generado': transaccion.id,
+                'estado': 'CREADO'
+            })
+            logger.info(f"Transacción guardada: ID {transaccion.id}")
+        return creadas
+    
     def mostrar_estadisticas_finales(self):
         """Muestra estadísticas finales del proceso"""
         print(f"\n{Colors.HEADER}{'='*60}{Colors.ENDC}")